@@ -0,0 +1,374 @@
+"""
+Benchmarks for the simulator and serial protocol hot paths.
+
+Stdlib only. Each benchmark times one operation in a calibrated loop and
+reports the median and best time per operation over several repeats. The
+best time is the one compared, as it is least disturbed by other load.
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmarks/bench.py                      # run, compare with baseline.json
+    python benchmarks/bench.py --save-baseline      # run and store as the new baseline
+    python benchmarks/bench.py --filter protocol    # only names containing 'protocol'
+
+A benchmark slower than the baseline by more than --threshold (default 20%)
+is reported as a regression and makes the script exit with status 1.
+The gui.* benchmarks need a display and are skipped without one (run them
+under Xvfb on a headless machine).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src', 'gui'))
+
+from airlock_sim import AirlockSimulator, control_unit_logic  # noqa: E402
+from gates import GateArray  # noqa: E402
+from particles import ParticlePool  # noqa: E402
+from protocol import (REQUEST_CODEC, SENSOR_CODEC, FrameParser, encode_binary_frame,  # noqa: E402
+                      parse_text_frame)
+from sensor_layout import SensorElement, SensorLayout  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+
+# name -> setup function returning the operation to time (a no-argument callable)
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Raised by a setup function when the benchmark cannot run here"""
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# Protocol -----------------------------------------------------------------
+
+@benchmark('protocol.encode_text_frame')
+def bench_encode_text_frame():
+    states = AirlockSimulator().sensor_states
+    return lambda: SENSOR_CODEC.encode_text(SENSOR_CODEC.pack(states), 42).encode()
+
+
+@benchmark('protocol.encode_binary_frame')
+def bench_encode_binary_frame():
+    states = AirlockSimulator().sensor_states
+    return lambda: encode_binary_frame(42, SENSOR_CODEC.pack(states))
+
+
+@benchmark('protocol.parse_text_reply')
+def bench_parse_text_reply():
+    parser = FrameParser()
+    reply = b"<GATE_REQUEST_A:1,GATE_REQUEST_B:0,SEQ:42>\r\n"
+
+    def op():
+        for message in parser.feed(reply):
+            REQUEST_CODEC.decode_text(message)
+    return op
+
+
+@benchmark('protocol.parse_text_frame_generic')
+def bench_parse_text_frame_generic():
+    # The split-based fallback for frames not in canonical order
+    reply = "<GATE_REQUEST_B:0,GATE_REQUEST_A:1,SEQ:42>"
+    return lambda: parse_text_frame(reply)
+
+
+@benchmark('protocol.parse_binary_reply')
+def bench_parse_binary_reply():
+    parser = FrameParser()
+    reply = encode_binary_frame(42, 0b01)
+
+    def op():
+        for frame in parser.feed(reply):
+            REQUEST_CODEC.unpack(frame.bits)
+    return op
+
+
+@benchmark('protocol.parse_mixed_stream_4k')
+def bench_parse_mixed_stream():
+    # Replies, binary frames and a banner, fed in 64-byte chunks like the reader sees them
+    chunk = (b"<GATE_REQUEST_A:1,GATE_REQUEST_B:0,SEQ:7>\r\n" + encode_binary_frame(8, 0b10) +
+             b"<Arduino is ready>\r\n")
+    stream = (chunk * (4096 // len(chunk) + 1))[:4096]
+    pieces = [stream[i:i + 64] for i in range(0, len(stream), 64)]
+    parser = FrameParser()
+
+    def op():
+        for piece in pieces:
+            parser.feed(piece)
+    return op
+
+
+# Simulator ----------------------------------------------------------------
+
+@benchmark('sim.update_sensors')
+def bench_update_sensors():
+    sim = AirlockSimulator()
+    positions = [50 + i * 0.8 for i in range(1500)]
+    state = {'i': 0}
+
+    def op():
+        i = state['i']
+        sim.rover_x = positions[i]
+        sim.update_sensors()
+        state['i'] = (i + 1) % len(positions)
+    return op
+
+
+@benchmark('sim.update_sensors_1000')
+def bench_update_sensors_dense():
+    # A detailed layout: 1000 beams and spans spread over the airlock
+    elements = [SensorElement('PRESENCE_MIDDLE', i * 0.688, i * 0.688 + (i % 3) * 4.0, '') for i in range(1000)]
+    sim = AirlockSimulator(layout=SensorLayout(elements))
+    positions = [50 + i * 0.8 for i in range(1500)]
+    state = {'i': 0}
+
+    def op():
+        i = state['i']
+        sim.rover_x = positions[i]
+        sim.update_sensors()
+        state['i'] = (i + 1) % len(positions)
+    return op
+
+
+@benchmark('sim.move_rover_swept')
+def bench_move_rover_swept():
+    # Drag-sized jumps across the airlock, each swept for crossed sensors
+    sim = AirlockSimulator()
+    positions = [50 + i * 37.0 for i in range(22)]
+    positions += positions[::-1]
+    state = {'i': 0}
+
+    def op():
+        i = state['i']
+        sim.move_rover(positions[i])
+        state['i'] = (i + 1) % len(positions)
+    return op
+
+
+@benchmark('sim.process_gate_requests')
+def bench_process_gate_requests():
+    sim = AirlockSimulator()
+    requests = [{'GATE_REQUEST_A': True, 'GATE_REQUEST_B': False},
+                {'GATE_REQUEST_A': False, 'GATE_REQUEST_B': True}]
+    state = {'i': 0}
+
+    def op():
+        # Alternate requests so the direction-change branches are exercised
+        sim.gate_requests.update(requests[state['i']])
+        sim.process_gate_requests()
+        state['i'] ^= 1
+    return op
+
+
+@benchmark('sim.process_gate_requests_unchanged')
+def bench_process_gate_requests_unchanged():
+    # The common case: a reply repeating the requests the gates already follow
+    sim = AirlockSimulator()
+    sim.set_gate_requests({'GATE_REQUEST_A': True, 'GATE_REQUEST_B': False})
+    return sim.process_gate_requests
+
+
+@benchmark('sim.step_gates_moving')
+def bench_step():
+    sim = AirlockSimulator()
+
+    def op():
+        if not sim.gates.any_moving():
+            # Keep both gates in motion, reversing at each end
+            sim.set_gate_requests({name: not sim.gates.open[index]
+                                   for index, name in enumerate(sim.gate_request_names)})
+        sim.step(0.01)
+    return op
+
+
+@benchmark('gates.step_16_moving')
+def bench_gate_array():
+    # A many-gate variant: one step() over 16 gates, all in motion
+    gates = GateArray([str(i) for i in range(16)], [i * 50.0 for i in range(16)])
+
+    def op():
+        if not gates.any_moving():
+            gates.apply_requests([not is_open for is_open in gates.open])
+        gates.step(0.01)
+    return op
+
+
+@benchmark('sim.control_tick')
+def bench_control_tick():
+    # One full closed-loop tick: move, sense, controller, gates
+    sim = AirlockSimulator()
+    exit_x = sim.start_x + sim.airlock_width + sim.rover_width
+
+    def op():
+        x = sim.rover_x + 2.0
+        sim.move_rover(x if x < exit_x else 50)
+        sim.set_gate_requests(control_unit_logic(sim.sensor_states))
+        sim.step(0.01)
+    return op
+
+
+@benchmark('particles.update_full_pool')
+def bench_particles():
+    pool = ParticlePool(64)
+
+    def op():
+        while pool.count < pool.capacity:
+            pool.spawn_random(300, 110, 165)
+        pool.update()
+    return op
+
+
+# GUI (needs a display) ----------------------------------------------------
+
+def _make_gui():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:  # ImportError or TclError without a display
+        raise Skip(f"no Tk display ({e.__class__.__name__})")
+    root.withdraw()
+    from airlock_gui import AirlockGUI
+    app = AirlockGUI(root)
+    app.scheduler.stop()  # Drive everything by hand
+    return root, app
+
+
+@benchmark('gui.unified_update')
+def bench_unified_update():
+    root, app = _make_gui()
+    exit_x = app.sim.start_x + app.sim.airlock_width + app.sim.rover_width
+
+    def op():
+        # A frame with the rover moving and sensor labels changing
+        x = app.sim.rover_x + 2.0
+        app.sim.rover_x = x if x < exit_x else 50
+        app.update_sensors()
+        app._unified_update()
+        root.update_idletasks()
+    return op
+
+
+@benchmark('gui.animate_gates')
+def bench_animate_gates():
+    root, app = _make_gui()
+    app.sim.set_gate_requests({'GATE_REQUEST_A': True, 'GATE_REQUEST_B': True})
+
+    def op():
+        app.sim.step(0.01)
+        app.animate_gates()
+    return op
+
+
+# Runner -------------------------------------------------------------------
+
+def measure(op, repeat=5, min_time=0.1):
+    """Median and best seconds per call; loop count calibrated to about min_time per repeat"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 4 else 1 + int(min_time / max(elapsed, 1e-9))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            op()
+        timings.append((time.perf_counter() - start) / loops)
+    return statistics.median(timings), min(timings), loops
+
+
+def run(names, repeat, min_time):
+    results = {}
+    for name in names:
+        try:
+            op = BENCHMARKS[name]()
+        except Skip as e:
+            print(f"{name:34s} skipped: {e}")
+            continue
+        median, best, loops = measure(op, repeat, min_time)
+        results[name] = {'median_ns': median * 1e9, 'best_ns': best * 1e9, 'loops': loops}
+        print(f"{name:34s} {median * 1e9:12.0f} ns/op  (best {best * 1e9:.0f}, {loops} loops)")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print before/after for every benchmark in both runs; returns the regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':34s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['best_ns']
+        after = result['best_ns']
+        change = after / before - 1.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:34s} {before:12.0f} {after:12.0f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Airlock simulator and protocol benchmarks")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per repeat")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names, args.repeat, args.min_time)
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} - run with --save-baseline first")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
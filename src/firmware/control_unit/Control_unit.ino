@@ -1,42 +1,12 @@
-#define PRESENCE_FRONT_PIN 36
-#define PRESENCE_MIDDLE_PIN 39
-#define PRESENCE_BACK_PIN 34
-#define GATE_SAFETY_A_PIN 35
-#define GATE_SAFETY_B_PIN 32
-#define GATE_REQUEST_A_PIN 33
-#define GATE_REQUEST_B_PIN 25
-#define GATE_MOVING_A_PIN 26
-#define GATE_MOVING_B_PIN 27
-
-struct IOpins
-{
-    bool PRESENCE_FRONT=false;
-    bool PRESENCE_MIDDLE=false;
-    bool PRESENCE_BACK=false;
-    bool GATE_SAFETY_A=false;
-    bool GATE_SAFETY_B=false;
-    bool GATE_REQUEST_A=false;
-    bool GATE_REQUEST_B=false;
-    bool GATE_MOVING_A=false;
-    bool GATE_MOVING_B=false;
-};
+// Pins and IOpins are generated from src/gui/signals.py
+#include "airlock_signals.h"
 
 IOpins ioPins;
 
 void setup() {
   // put your setup code here, to run once:
   Serial.begin(115200);
-  pinMode(PRESENCE_FRONT_PIN,INPUT_PULLUP);
-  pinMode(PRESENCE_MIDDLE_PIN,INPUT_PULLUP);
-  pinMode(PRESENCE_BACK_PIN,INPUT_PULLUP);
-  pinMode(GATE_SAFETY_A_PIN, INPUT_PULLUP);
-  pinMode(GATE_SAFETY_B_PIN, INPUT_PULLUP);
-        
-
-  pinMode(GATE_REQUEST_A_PIN, OUTPUT);
-  pinMode(GATE_REQUEST_B_PIN, OUTPUT);
-  pinMode(GATE_MOVING_A_PIN, INPUT_PULLUP);
-  pinMode(GATE_MOVING_B_PIN, INPUT_PULLUP);
+  configureSignalPins();
 }
 void processPins()
 {
@@ -0,0 +1,45 @@
+// Generated by src/gui/signals.py - edit the schema there and rerun it.
+#ifndef AIRLOCK_SIGNALS_H
+#define AIRLOCK_SIGNALS_H
+
+#include <Arduino.h>
+#include <string.h>
+
+#define PRESENCE_FRONT_PIN 36
+#define PRESENCE_MIDDLE_PIN 39
+#define PRESENCE_BACK_PIN 34
+#define GATE_SAFETY_A_PIN 35
+#define GATE_SAFETY_B_PIN 32
+#define GATE_MOVING_A_PIN 26
+#define GATE_MOVING_B_PIN 27
+#define GATE_REQUEST_A_PIN 33
+#define GATE_REQUEST_B_PIN 25
+
+struct IOpins
+{
+    bool PRESENCE_FRONT=false;
+    bool PRESENCE_MIDDLE=false;
+    bool PRESENCE_BACK=false;
+    bool GATE_SAFETY_A=false;
+    bool GATE_SAFETY_B=false;
+    bool GATE_MOVING_A=false;
+    bool GATE_MOVING_B=false;
+    bool GATE_REQUEST_A=false;
+    bool GATE_REQUEST_B=false;
+};
+
+// Outputs of this board are driven, inputs read with pull-ups
+inline void configureSignalPins()
+{
+    pinMode(PRESENCE_FRONT_PIN, INPUT_PULLUP);
+    pinMode(PRESENCE_MIDDLE_PIN, INPUT_PULLUP);
+    pinMode(PRESENCE_BACK_PIN, INPUT_PULLUP);
+    pinMode(GATE_SAFETY_A_PIN, INPUT_PULLUP);
+    pinMode(GATE_SAFETY_B_PIN, INPUT_PULLUP);
+    pinMode(GATE_MOVING_A_PIN, INPUT_PULLUP);
+    pinMode(GATE_MOVING_B_PIN, INPUT_PULLUP);
+    pinMode(GATE_REQUEST_A_PIN, OUTPUT);
+    pinMode(GATE_REQUEST_B_PIN, OUTPUT);
+}
+
+#endif
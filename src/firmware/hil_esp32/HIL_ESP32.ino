@@ -2,35 +2,32 @@
 //    in Serial Input Basics   http://forum.arduino.cc/index.php?topic=396450.0
 
 #include <Arduino.h>
+// Pins, IOpins and the field dispatch are generated from src/gui/signals.py
+#include "airlock_signals.h"
 
 const byte numChars = 256;
 char receivedChars[numChars];
 
 boolean newData = false;
 
+// Binary frame: SYNC, seq, bits, crc. Every byte after SYNC has bit 7 set,
+// so binary frames never contain '<' or '>' and can share the text stream.
+const byte BINARY_SYNC = 0xA5;
+byte binaryChars[3];
+byte binaryNdx = 0;
+boolean binaryInProgress = false;
+boolean newBinaryData = false;
+
+// Request edges are reported without waiting for the next PC frame, in the
+// format of the last frame received; nothing is sent before the first frame
+boolean linkActive = false;
+boolean lastFrameBinary = false;
+byte lastSeq = 0x80;
+
+// SEQ tag of the last text frame, echoed in text replies; -1 if it had none
+int lastTextSeq = -1;
+
 byte ledPin = 25; // the onboard LED
-#define PRESENCE_FRONT_PIN 23
-#define PRESENCE_MIDDLE_PIN 22
-#define PRESENCE_BACK_PIN 21
-#define GATE_SAFETY_A_PIN 19
-#define GATE_SAFETY_B_PIN 18
-#define GATE_REQUEST_A_PIN 5
-#define GATE_REQUEST_B_PIN 4
-#define GATE_MOVING_A_PIN 2
-#define GATE_MOVING_B_PIN 15
-
-struct IOpins
-{
-    bool PRESENCE_FRONT=false;
-    bool PRESENCE_MIDDLE=false;
-    bool PRESENCE_BACK=false;
-    bool GATE_SAFETY_A=false;
-    bool GATE_SAFETY_B=false;
-    bool GATE_REQUEST_A=false;
-    bool GATE_REQUEST_B=false;
-    bool GATE_MOVING_A=false;
-    bool GATE_MOVING_B=false;
-};
 
 IOpins ioPins;
 //===============
@@ -40,17 +37,7 @@ void setup()
 
     Serial.begin(115200);
     
-    pinMode(PRESENCE_FRONT_PIN, OUTPUT);
-    pinMode(PRESENCE_MIDDLE_PIN, OUTPUT);
-    pinMode(PRESENCE_BACK_PIN, OUTPUT);
-    pinMode(GATE_SAFETY_A_PIN, OUTPUT);
-    pinMode(GATE_SAFETY_B_PIN, OUTPUT);
-        
-
-    pinMode(GATE_REQUEST_A_PIN, INPUT_PULLUP);
-    pinMode(GATE_REQUEST_B_PIN, INPUT_PULLUP);
-    pinMode(GATE_MOVING_A_PIN, OUTPUT);
-     pinMode(GATE_MOVING_B_PIN, OUTPUT);
+    configureSignalPins();
     pinMode(ledPin, OUTPUT);
 
     digitalWrite(ledPin, HIGH);
@@ -72,10 +59,33 @@ void loop()
 }
 void executeLogic()
 {
-    
+    if (newBinaryData)
+    {
+        byte seq = binaryChars[0];
+        byte bits = binaryChars[1];
+        byte crc = binaryChars[2];
+        if ((seq & bits & crc & 0x80) && (crc & 0x7F) == crc7(binaryChars, 2))
+        {
+            applySensorBits(ioPins, bits);
+            linkActive = true;
+            lastFrameBinary = true;
+            lastSeq = seq;
+            replyBinary(seq);
+        }
+        newBinaryData = false;
+    }
+
+    if (newData && strcmp(receivedChars, "PROTO:BIN") == 0)
+    {
+        // Capability probe from the PC - acknowledge binary frame support
+        Serial.println("<PROTO:BIN>");
+        newData = false;
+    }
+
     if (newData)
     {
         int i = 0;
+        lastTextSeq = -1;
 
         
         while (receivedChars[i] != '>' && receivedChars[i] != '\0' )
@@ -83,6 +93,7 @@ void executeLogic()
 
             // Character-by-character parsing
             char varName[32] = "";
+            uint32_t nameHash = SIGNAL_HASH_INIT; // Hash of varName, built while it is read
             bool varValue = false; // Variable to store the boolean value
             int nameIndex = 0;
             // Skip the '<' if it's at the beginning
@@ -92,6 +103,7 @@ void executeLogic()
             while (receivedChars[i] != ':' && receivedChars[i] != '\0' && nameIndex < 31)
             {
                 varName[nameIndex] = receivedChars[i];
+                nameHash = signalHashStep(nameHash, receivedChars[i]);
                 nameIndex++;
                 i++;
             }
@@ -101,6 +113,21 @@ void executeLogic()
             if (receivedChars[i] == ':')
             {
                 i++;
+                if (nameHash == SIGNAL_HASH_SEQ && strcmp(varName, "SEQ") == 0)
+                {
+                    // Sequence tag - multi-digit, echoed back for latency measurement
+                    lastTextSeq = 0;
+                    while (receivedChars[i] >= '0' && receivedChars[i] <= '9')
+                    {
+                        lastTextSeq = lastTextSeq * 10 + (receivedChars[i] - '0');
+                        i++;
+                    }
+                    if (receivedChars[i] == ',')
+                    {
+                        i++;
+                    }
+                    continue;
+                }
                 // Parse the next character for the value
                 if (receivedChars[i] == '1')
                 {
@@ -110,38 +137,18 @@ void executeLogic()
                 {
                     varValue = false;
                 }
-                // Set the appropriate struct member based on the key
-                if (strcmp(varName, "PRESENCE_FRONT") == 0)
-                {
-                    ioPins.PRESENCE_FRONT = varValue;
-                }
-                else if (strcmp(varName, "PRESENCE_MIDDLE") == 0)
-                {
-                    ioPins.PRESENCE_MIDDLE = varValue;
-                }
-                else if (strcmp(varName, "PRESENCE_BACK") == 0)
-                {
-                    ioPins.PRESENCE_BACK = varValue;
-                }
-                else if (strcmp(varName, "GATE_SAFETY_A") == 0)
-                {
-                    ioPins.GATE_SAFETY_A = varValue;
-                }
-                else if (strcmp(varName, "GATE_SAFETY_B") == 0)
-                {
-                    ioPins.GATE_SAFETY_B = varValue;
-                }
-                else if (strcmp(varName, "GATE_MOVING_A") == 0)
-                {
-                    ioPins.GATE_MOVING_A = varValue;
-                }
-                else if (strcmp(varName, "GATE_MOVING_B") == 0)
+                // Set the appropriate struct member based on the key -
+                // a switch on the name hash instead of a strcmp per signal
+                bool *field = sensorField(ioPins, nameHash, varName);
+                if (field != NULL)
                 {
-                    ioPins.GATE_MOVING_B = varValue;
+                    *field = varValue;
                 }
                 i+=2;
             }
         }
+        linkActive = true;
+        lastFrameBinary = false;
         replyToPython();
         newData = false;
     }
@@ -150,16 +157,25 @@ void executeLogic()
 void processPins()
 {
     
-    digitalWrite(PRESENCE_FRONT_PIN, ioPins.PRESENCE_FRONT ? HIGH : LOW);
-    digitalWrite(PRESENCE_MIDDLE_PIN, ioPins.PRESENCE_MIDDLE ? HIGH : LOW);
-    digitalWrite(PRESENCE_BACK_PIN, ioPins.PRESENCE_BACK ? HIGH : LOW);
-    digitalWrite(GATE_SAFETY_A_PIN, ioPins.GATE_SAFETY_A ? HIGH : LOW);
-    digitalWrite(GATE_SAFETY_B_PIN, ioPins.GATE_SAFETY_B ? HIGH : LOW);
-    
-    digitalWrite(GATE_MOVING_B_PIN, ioPins.GATE_MOVING_B ? HIGH : LOW);
-    digitalWrite(GATE_MOVING_A_PIN, ioPins.GATE_MOVING_A ? HIGH : LOW);
-    ioPins.GATE_REQUEST_A = digitalRead(GATE_REQUEST_A_PIN);
-    ioPins.GATE_REQUEST_B = digitalRead(GATE_REQUEST_B_PIN);
+    writeSensorPins(ioPins);
+    bool requestA = digitalRead(GATE_REQUEST_A_PIN);
+    bool requestB = digitalRead(GATE_REQUEST_B_PIN);
+    bool requestChanged = requestA != ioPins.GATE_REQUEST_A || requestB != ioPins.GATE_REQUEST_B;
+    ioPins.GATE_REQUEST_A = requestA;
+    ioPins.GATE_REQUEST_B = requestB;
+
+    // The PC may only transmit on sensor changes, so report request edges right away
+    if (requestChanged && linkActive)
+    {
+        if (lastFrameBinary)
+        {
+            replyBinary(lastSeq);
+        }
+        else
+        {
+            replyToPython();
+        }
+    }
 }
 //===============
 
@@ -171,11 +187,31 @@ void recvWithStartEndMarkers()
     char endMarker = '>';
     char rc;
 
-    while (Serial.available() > 0 && newData == false)
+    while (Serial.available() > 0 && newData == false && newBinaryData == false)
     {
         rc = Serial.read();
 
-        if (recvInProgress == true)
+        if (binaryInProgress == true)
+        {
+            // Payload bytes may equal BINARY_SYNC, so never resync mid-frame
+            binaryChars[binaryNdx] = rc;
+            binaryNdx++;
+            if (binaryNdx == 3)
+            {
+                binaryInProgress = false;
+                binaryNdx = 0;
+                newBinaryData = true;
+            }
+        }
+        else if (rc == BINARY_SYNC)
+        {
+            // Binary frame start - also abandons any partial text frame
+            recvInProgress = false;
+            ndx = 0;
+            binaryInProgress = true;
+            binaryNdx = 0;
+        }
+        else if (recvInProgress == true)
         {
             if (rc != endMarker)
             {
@@ -209,8 +245,43 @@ void replyToPython()
     Serial.print(ioPins.GATE_REQUEST_A);
     Serial.print(",GATE_REQUEST_B:");
     Serial.print(ioPins.GATE_REQUEST_B);
+    if (lastTextSeq >= 0)
+    {
+        Serial.print(",SEQ:");
+        Serial.print(lastTextSeq);
+    }
     Serial.println(">");
     // change the state of the LED everytime a reply is sent
 }
 
+//===============
+
+void replyBinary(byte seq)
+{
+    // Echo the sequence number so the PC can spot lost frames
+    byte frame[4];
+    frame[0] = BINARY_SYNC;
+    frame[1] = seq;
+    frame[2] = 0x80 | requestBits(ioPins);
+    frame[3] = 0x80 | crc7(&frame[1], 2);
+    Serial.write(frame, 4);
+}
+
+//===============
+
+byte crc7(const byte *data, byte len)
+{
+    // CRC-7/MMC (x^7 + x^3 + 1), computed in the top 7 bits of crc
+    byte crc = 0;
+    for (byte i = 0; i < len; i++)
+    {
+        crc ^= data[i];
+        for (byte bit = 0; bit < 8; bit++)
+        {
+            crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x12) : (byte)(crc << 1);
+        }
+    }
+    return crc >> 1;
+}
+
 //===============
\ No newline at end of file
@@ -0,0 +1,119 @@
+// Generated by src/gui/signals.py - edit the schema there and rerun it.
+#ifndef AIRLOCK_SIGNALS_H
+#define AIRLOCK_SIGNALS_H
+
+#include <Arduino.h>
+#include <string.h>
+
+#define PRESENCE_FRONT_PIN 23
+#define PRESENCE_MIDDLE_PIN 22
+#define PRESENCE_BACK_PIN 21
+#define GATE_SAFETY_A_PIN 19
+#define GATE_SAFETY_B_PIN 18
+#define GATE_MOVING_A_PIN 2
+#define GATE_MOVING_B_PIN 15
+#define GATE_REQUEST_A_PIN 5
+#define GATE_REQUEST_B_PIN 4
+
+struct IOpins
+{
+    bool PRESENCE_FRONT=false;
+    bool PRESENCE_MIDDLE=false;
+    bool PRESENCE_BACK=false;
+    bool GATE_SAFETY_A=false;
+    bool GATE_SAFETY_B=false;
+    bool GATE_MOVING_A=false;
+    bool GATE_MOVING_B=false;
+    bool GATE_REQUEST_A=false;
+    bool GATE_REQUEST_B=false;
+};
+
+// Outputs of this board are driven, inputs read with pull-ups
+inline void configureSignalPins()
+{
+    pinMode(PRESENCE_FRONT_PIN, OUTPUT);
+    pinMode(PRESENCE_MIDDLE_PIN, OUTPUT);
+    pinMode(PRESENCE_BACK_PIN, OUTPUT);
+    pinMode(GATE_SAFETY_A_PIN, OUTPUT);
+    pinMode(GATE_SAFETY_B_PIN, OUTPUT);
+    pinMode(GATE_MOVING_A_PIN, OUTPUT);
+    pinMode(GATE_MOVING_B_PIN, OUTPUT);
+    pinMode(GATE_REQUEST_A_PIN, INPUT_PULLUP);
+    pinMode(GATE_REQUEST_B_PIN, INPUT_PULLUP);
+}
+
+// Bit masks in the binary frame payload
+#define PRESENCE_FRONT_BIT 0x01
+#define PRESENCE_MIDDLE_BIT 0x02
+#define PRESENCE_BACK_BIT 0x04
+#define GATE_SAFETY_A_BIT 0x08
+#define GATE_SAFETY_B_BIT 0x10
+#define GATE_MOVING_A_BIT 0x20
+#define GATE_MOVING_B_BIT 0x40
+#define GATE_REQUEST_A_BIT 0x01
+#define GATE_REQUEST_B_BIT 0x02
+
+// FNV-1a hash of a text frame field name, updated one character at a time
+#define SIGNAL_HASH_INIT 2166136261UL
+inline uint32_t signalHashStep(uint32_t hash, char c)
+{
+    return (hash ^ (uint8_t)c) * 16777619UL;
+}
+#define SIGNAL_HASH_SEQ 0x4C01879CUL
+
+// Sensor field named name (hash = its signalHashStep hash), or NULL.
+// One switch and one confirming strcmp instead of a strcmp per signal.
+inline bool *sensorField(IOpins &pins, uint32_t hash, const char *name)
+{
+    switch (hash)
+    {
+    case 0x33635C7CUL:
+        return strcmp(name, "PRESENCE_FRONT") == 0 ? &pins.PRESENCE_FRONT : NULL;
+    case 0x259A5C4CUL:
+        return strcmp(name, "PRESENCE_MIDDLE") == 0 ? &pins.PRESENCE_MIDDLE : NULL;
+    case 0xE8740A4EUL:
+        return strcmp(name, "PRESENCE_BACK") == 0 ? &pins.PRESENCE_BACK : NULL;
+    case 0x58345351UL:
+        return strcmp(name, "GATE_SAFETY_A") == 0 ? &pins.GATE_SAFETY_A : NULL;
+    case 0x55344E98UL:
+        return strcmp(name, "GATE_SAFETY_B") == 0 ? &pins.GATE_SAFETY_B : NULL;
+    case 0x18476429UL:
+        return strcmp(name, "GATE_MOVING_A") == 0 ? &pins.GATE_MOVING_A : NULL;
+    case 0x15475F70UL:
+        return strcmp(name, "GATE_MOVING_B") == 0 ? &pins.GATE_MOVING_B : NULL;
+    default:
+        return NULL;
+    }
+}
+
+inline void applySensorBits(IOpins &pins, byte bits)
+{
+    pins.PRESENCE_FRONT = bits & PRESENCE_FRONT_BIT;
+    pins.PRESENCE_MIDDLE = bits & PRESENCE_MIDDLE_BIT;
+    pins.PRESENCE_BACK = bits & PRESENCE_BACK_BIT;
+    pins.GATE_SAFETY_A = bits & GATE_SAFETY_A_BIT;
+    pins.GATE_SAFETY_B = bits & GATE_SAFETY_B_BIT;
+    pins.GATE_MOVING_A = bits & GATE_MOVING_A_BIT;
+    pins.GATE_MOVING_B = bits & GATE_MOVING_B_BIT;
+}
+
+inline byte requestBits(const IOpins &pins)
+{
+    byte bits = 0;
+    if (pins.GATE_REQUEST_A) bits |= GATE_REQUEST_A_BIT;
+    if (pins.GATE_REQUEST_B) bits |= GATE_REQUEST_B_BIT;
+    return bits;
+}
+
+inline void writeSensorPins(const IOpins &pins)
+{
+    digitalWrite(PRESENCE_FRONT_PIN, pins.PRESENCE_FRONT ? HIGH : LOW);
+    digitalWrite(PRESENCE_MIDDLE_PIN, pins.PRESENCE_MIDDLE ? HIGH : LOW);
+    digitalWrite(PRESENCE_BACK_PIN, pins.PRESENCE_BACK ? HIGH : LOW);
+    digitalWrite(GATE_SAFETY_A_PIN, pins.GATE_SAFETY_A ? HIGH : LOW);
+    digitalWrite(GATE_SAFETY_B_PIN, pins.GATE_SAFETY_B ? HIGH : LOW);
+    digitalWrite(GATE_MOVING_A_PIN, pins.GATE_MOVING_A ? HIGH : LOW);
+    digitalWrite(GATE_MOVING_B_PIN, pins.GATE_MOVING_B ? HIGH : LOW);
+}
+
+#endif
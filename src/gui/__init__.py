@@ -4,4 +4,24 @@ GUI modules for the Airlock Control System HIL Testbench.
 This module contains:
 - airlock_gui: Hardware-in-the-Loop simulator with visual interface
 - arduino_gui: Manual control panel for testing and debugging
+- airlock_sim: Tk-free simulation core (rover, sensors, gates) driven by step(dt)
+- gates: Struct-of-arrays state machine for any number of gates
+- sensor_layout: Beam and safety span layout with an interval index for rover overlap queries
+- hil_emulator: Pseudo-terminal emulator of the HIL_ESP32 bridge firmware
+- signals: Signal schema; generates the firmware headers
+- protocol: Text and binary frame codecs (generated from the schema) and the incremental frame parser
+- serial_link: Event-driven serial reader, multi-port multiplexer and change-driven transmit policy
+- link_impairment: Seeded latency, jitter, rate cap, drops and bit flips on a wrapped serial port
+- particles: Fixed-capacity, array-backed particle pool for gate effects
+- terminal: Batched, line-capped serial terminal buffer with optional log spooling
+- scheduler: Single-threaded task scheduler with a thread-safe inbox, pumped by the Tk loop
+- sim_clock: Fixed-timestep simulation clock with catch-up and jitter statistics
+- metrics: Round-trip latency tracker and log-bucketed histogram
+- session_log: Append-only session recorder and offline replay
+- scenarios: Scenario file format and parallel headless regression runner with JUnit output
+- fuzz: Seeded random trajectory fuzzing against safety invariants, with shrinking
+- model_check: Breadth-first exploration of every reachable controller and gate state
+- multi_bench: Several testbenches in one window, read by one selector-based I/O thread
+- tracing: Span tracer for the serial-to-render pipeline with Chrome trace export
+- telemetry: Local pub/sub feed of simulator state with per-client rate limits, latest value wins
 """ 
\ No newline at end of file
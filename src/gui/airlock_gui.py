@@ -1,15 +1,45 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import serial
 import serial.tools.list_ports
-import threading
 import time
 import math
 import datetime
 import random
 
+try:
+    from .airlock_sim import AirlockSimulator
+    from .link_impairment import ImpairmentDialog, default_impairment, load_impairment, wrap_serial
+    from .metrics import LatencyTracker
+    from .protocol import (BinaryFrame, PROTOCOL_PROBE, REQUEST_CODEC, SENSOR_CODEC, SEQ_MODULO,
+                           encode_binary_frame)
+    from .particles import ParticlePool
+    from .scheduler import Scheduler
+    from .sensor_layout import load_layout
+    from .session_log import SessionRecorder, SessionReplay
+    from .serial_link import ChangeDrivenTransmitter, SerialReader, open_serial_async
+    from .sim_clock import MAX_TICK_RATE, SimulationClock
+    from .terminal import TAG_COLORS, TerminalBuffer
+    from .telemetry import TelemetryServer, frame_text
+    from .tracing import traced, tracer
+except ImportError:
+    from airlock_sim import AirlockSimulator
+    from link_impairment import ImpairmentDialog, default_impairment, load_impairment, wrap_serial
+    from metrics import LatencyTracker
+    from protocol import (BinaryFrame, PROTOCOL_PROBE, REQUEST_CODEC, SENSOR_CODEC, SEQ_MODULO,
+                          encode_binary_frame)
+    from particles import ParticlePool
+    from scheduler import Scheduler
+    from sensor_layout import load_layout
+    from session_log import SessionRecorder, SessionReplay
+    from serial_link import ChangeDrivenTransmitter, SerialReader, open_serial_async
+    from sim_clock import MAX_TICK_RATE, SimulationClock
+    from terminal import TAG_COLORS, TerminalBuffer
+    from telemetry import TelemetryServer, frame_text
+    from tracing import traced, tracer
+
 class AirlockGUI:
-    def __init__(self, root):
+    def __init__(self, root, layout=None, impairment=None, telemetry=None):
         self.root = root
         self.root.title("Airlock HIL Simulator")
         self.root.geometry("1800x1000")  # Made even wider to accommodate both panels
@@ -17,79 +47,68 @@ class AirlockGUI:
         
         # Serial connection
         self.ser = None
+        self.reader = None
         self.connected = False
-        
-        # Airlock dimensions (scaled down for display)
-        self.scale = 0.5  # Reduced scale to fit better with terminal
-        self.airlock_width = 1376 * self.scale  # Updated total width: 408 + 560 + 408
-        self.front_zone_width = 408 * self.scale
-        self.middle_zone_width = 560 * self.scale
-        self.back_zone_width = 408 * self.scale  # Changed to match front zone
-        self.airlock_height = 175  # Reduced height by half to make room for sensor states
-        
-        # Rover properties
-        self.rover_width = 638 * self.scale * 0.4  # Made much smaller for easier movement
-        self.rover_height = 35  # Also smaller height
-        self.rover_x = 50  # Start position - outside front zone
-        self.rover_y = self.airlock_height // 2 + 50  # Adjust for canvas position
+        self.connecting = False  # Port is being opened on the connect thread
+        
+        # Frame protocol - binary only once the bridge acknowledges the probe
+        self.binary_protocol = False
+        self.tx_seq = 0
+        self.last_rx_seq = None
+        self.sequence_gaps = 0
+        self.sensor_send_interval = 0.1  # Seconds between periodic transmit checks
+        
+        # Round-trip latency: frames carry a tag the bridge echoes in its reply
+        self.latency = LatencyTracker()
+        
+        # Optional degraded link for testing; applied to each new connection while enabled
+        self.impairment = impairment or default_impairment()
+        self.impairment_dialog = None
+        
+        # Optional TelemetryServer; its own I/O thread feeds the subscribers
+        self.telemetry = telemetry
+        
+        # Change-driven transmission: send on edges, heartbeat when idle
+        self.transmitter = ChangeDrivenTransmitter(heartbeat_interval=1.0)
+        self.last_frame_size = 0
+        
+        # Tk-free simulation core; the GUI only observes and renders it
+        self.sim = AirlockSimulator(layout=layout)
+        self.sim.add_listener(self.on_gate_event)
+        self.sim.add_edge_listener(self.on_sensor_edge)
+        self.sensor_states = self.sim.sensor_states
+        self.gate_requests = self.sim.gate_requests
         self.rover_dragging = False
         
-        # Gate properties
-        self.gate_width = 10
-        self.gate_a_x = self.front_zone_width
-        self.gate_b_x = self.front_zone_width + self.middle_zone_width
-        self.gate_a_open = False
-        self.gate_b_open = False
-        self.gate_a_moving = False
-        self.gate_b_moving = False
-        self.gate_animation_progress_a = 0
-        self.gate_animation_progress_b = 0
-        
-        # Enhanced animation properties
-        self.gate_a_animation_time = 0  # Time elapsed during animation
-        self.gate_b_animation_time = 0
-        self.gate_animation_duration = 3.0  # Total animation duration in seconds
-        self.gate_a_particles = []  # Particle effects for gate A
-        self.gate_b_particles = []  # Particle effects for gate B
-        
-        # Gate movement direction tracking
-        self.gate_a_target_state = False  # True = opening, False = closing
-        self.gate_b_target_state = False  # True = opening, False = closing
-        
-        # Drawing positions
-        self.start_x = 100
-        self.start_y = 50
-        
-        # Sensor states
-        self.sensor_states = {
-            'PRESENCE_FRONT': False,
-            'PRESENCE_MIDDLE': False,
-            'PRESENCE_BACK': False,
-            'GATE_SAFETY_A': False,
-            'GATE_SAFETY_B': False,
-            'GATE_MOVING_A': False,
-            'GATE_MOVING_B': False
-        }
-        
-        # Gate requests from Arduino
-        self.gate_requests = {
-            'GATE_REQUEST_A': False,
-            'GATE_REQUEST_B': False
-        }
-        
-        # Anti-flicker system
+        # Fixed-timestep clock on time.monotonic - gate timing does not drift under load
+        self.clock = SimulationClock(tick_rate=100)
+        self.sim_task = None
+        
+        # Session recording and offline replay
+        self.recorder = None
+        self.replay = None
+        self.replay_speed = None
+        self.replay_started = 0.0
+        
+        # Particle effects for gates - fixed capacity, canvas items recycled
+        self.particles = ParticlePool(capacity=64)
+        
+        # Frame pacing - redraws are coalesced to at most one per interval
         self.update_pending = False
-        self.last_update_time = 0
-        self.min_update_interval = 0.1  # Minimum 100ms between updates
+        self.min_update_interval = 1 / 60
+        
+        # Single scheduler on the Tk thread owns ticks, transmits and rendering;
+        # the serial reader thread only posts into its queue
+        self.scheduler = Scheduler()
+        
+        # Serial terminal - messages are batched and the widget is capped in lines
+        self.terminal = TerminalBuffer(max_lines=2000)
         
         # Control flags
         self.needs_redraw = True
         
         self.setup_gui()
-        self.start_reading_thread()
-        self.start_animation_thread()
-        self.start_sensor_update_thread()  # Add periodic sensor updates
-        self.start_sensor_display_update_thread()  # Add periodic sensor display updates
+        self.start_scheduler()
         
     def setup_gui(self):
         # Main title
@@ -120,11 +139,78 @@ class AirlockGUI:
                                    bg='#2196F3', fg='white', font=('Arial', 10))
         self.refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        self.use_binary_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(conn_frame, text="Binary protocol", variable=self.use_binary_var,
+                      bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        
+        # Unticked: hold DTR low so a running board is not reset and reconnects at once
+        self.reset_on_connect_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(conn_frame, text="Reset on connect", variable=self.reset_on_connect_var,
+                      bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        
         # Status label
         self.status_label = tk.Label(self.root, text="Disconnected", 
                                    font=('Arial', 12), fg='red', bg='#1a1a1a')
         self.status_label.pack(pady=5)
         
+        # Transmit mode and link statistics
+        link_frame = tk.Frame(self.root, bg='#1a1a1a')
+        link_frame.pack(pady=(0, 5))
+        
+        self.change_driven_var = tk.BooleanVar(value=self.transmitter.enabled)
+        tk.Checkbutton(link_frame, text="Change-driven TX", variable=self.change_driven_var,
+                      command=self.on_transmit_mode_change,
+                      bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(link_frame, text="Heartbeat (s):", 
+                font=('Arial', 10), fg='white', bg='#1a1a1a').pack(side=tk.LEFT, padx=(10, 2))
+        self.heartbeat_var = tk.StringVar(value=str(self.transmitter.heartbeat_interval))
+        tk.Spinbox(link_frame, from_=0.1, to=10.0, increment=0.1, width=5,
+                  textvariable=self.heartbeat_var, command=self.on_transmit_mode_change,
+                  bg='#1a1a1a', fg='white', buttonbackground='#333333').pack(side=tk.LEFT)
+        
+        tk.Button(link_frame, text="Link Impairment...", command=self.open_impairment_dialog,
+                 bg='#2196F3', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=(10, 5))
+        
+        self.link_stats_label = tk.Label(link_frame, text="", 
+                                       font=('Consolas', 9), fg='#aaaaaa', bg='#1a1a1a')
+        self.link_stats_label.pack(side=tk.LEFT, padx=10)
+        
+        # Simulation tick rate and clock statistics
+        clock_frame = tk.Frame(self.root, bg='#1a1a1a')
+        clock_frame.pack(pady=(0, 5))
+        
+        tk.Label(clock_frame, text="Sim rate (Hz):", 
+                font=('Arial', 10), fg='white', bg='#1a1a1a').pack(side=tk.LEFT, padx=(10, 2))
+        self.tick_rate_var = tk.StringVar(value=str(self.clock.tick_rate))
+        tk.Spinbox(clock_frame, values=(10, 20, 50, 100, 200, 500, MAX_TICK_RATE), width=5,
+                  textvariable=self.tick_rate_var, command=self.on_tick_rate_change,
+                  bg='#1a1a1a', fg='white', buttonbackground='#333333').pack(side=tk.LEFT)
+        
+        self.clock_stats_label = tk.Label(clock_frame, text="", 
+                                        font=('Consolas', 9), fg='#aaaaaa', bg='#1a1a1a')
+        self.clock_stats_label.pack(side=tk.LEFT, padx=10)
+        
+        # Session recording and replay
+        self.record_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(clock_frame, text="Record session", variable=self.record_var,
+                      command=self.on_record_toggle,
+                      bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        
+        self.replay_speed_var = tk.StringVar(value="1x")
+        ttk.Combobox(clock_frame, textvariable=self.replay_speed_var,
+                    values=("1x", "10x", "Max"), width=5, state='readonly').pack(side=tk.LEFT, padx=(10, 2))
+        tk.Button(clock_frame, text="Replay Session...", command=self.start_replay,
+                 bg='#2196F3', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+        
+        # Pipeline tracing
+        self.trace_var = tk.BooleanVar(value=tracer.enabled)
+        tk.Checkbutton(clock_frame, text="Trace", variable=self.trace_var,
+                      command=self.on_trace_toggle,
+                      bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=(10, 2))
+        tk.Button(clock_frame, text="Export Trace...", command=self.export_trace,
+                 bg='#2196F3', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+        
         # Create main content frame with two columns
         main_frame = tk.Frame(self.root, bg='#1a1a1a')
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10)
@@ -155,66 +241,41 @@ class AirlockGUI:
         table_container = tk.Frame(sensor_frame, bg='#1a1a1a')
         table_container.pack(fill='x', padx=10, pady=5)
         
-        # First row sensors
-        first_row_sensors = ['PRESENCE_FRONT', 'PRESENCE_MIDDLE', 'PRESENCE_BACK', 
-                            'GATE_SAFETY_A', 'GATE_SAFETY_B']
-        
-        # First row container
-        first_row = tk.Frame(table_container, bg='#1a1a1a')
-        first_row.pack(fill='x', pady=(0, 3))
+        # Rover-driven sensors on the first row, gate-driven signals and requests on the second
+        gate_driven = self.sim.gate_moving_names
+        first_row_sensors = [name for name in self.sensor_states if name not in gate_driven]
+        second_row_sensors = list(gate_driven) + list(self.sim.gate_request_names)
+        columns = max(len(first_row_sensors), len(second_row_sensors))
         
-        # Create first row with equal distribution
-        for i, sensor_name in enumerate(first_row_sensors):
-            sensor_col = tk.Frame(first_row, bg='#1a1a1a')
-            sensor_col.pack(side=tk.LEFT, fill='x', expand=True, padx=2)
+        for row_index, row_sensors in enumerate((first_row_sensors, second_row_sensors)):
+            row = tk.Frame(table_container, bg='#1a1a1a')
+            row.pack(fill='x', pady=(0, 3) if row_index == 0 else (3, 0))
             
-            # Sensor name label (top)
-            name_label = tk.Label(sensor_col, text=sensor_name, 
-                                 font=('Arial', 9, 'bold'), 
-                                 fg='white', bg='#333333',
-                                 relief='raised', bd=1, pady=2)
-            name_label.pack(fill='x')
-            
-            # State label (bottom)
-            state_label = tk.Label(sensor_col, text="OFF", 
-                                  font=('Arial', 10, 'bold'), 
-                                  fg='white', bg='#4a4a4a',
-                                  relief='raised', bd=1, pady=4)
-            state_label.pack(fill='x')
-            
-            self.sensor_labels[sensor_name] = state_label
-        
-        # Second row sensors
-        second_row_sensors = ['GATE_MOVING_A', 'GATE_MOVING_B', 'GATE_REQUEST_A', 'GATE_REQUEST_B']
-        
-        # Second row container
-        second_row = tk.Frame(table_container, bg='#1a1a1a')
-        second_row.pack(fill='x', pady=(3, 0))
-        
-        # Create second row with equal distribution
-        for i, sensor_name in enumerate(second_row_sensors):
-            sensor_col = tk.Frame(second_row, bg='#1a1a1a')
-            sensor_col.pack(side=tk.LEFT, fill='x', expand=True, padx=2)
-            
-            # Sensor name label (top)
-            name_label = tk.Label(sensor_col, text=sensor_name, 
-                                 font=('Arial', 9, 'bold'), 
-                                 fg='white', bg='#333333',
-                                 relief='raised', bd=1, pady=2)
-            name_label.pack(fill='x')
-            
-            # State label (bottom)
-            state_label = tk.Label(sensor_col, text="OFF", 
-                                  font=('Arial', 10, 'bold'), 
-                                  fg='white', bg='#4a4a4a',
-                                  relief='raised', bd=1, pady=4)
-            state_label.pack(fill='x')
+            # Create row with equal distribution
+            for sensor_name in row_sensors:
+                sensor_col = tk.Frame(row, bg='#1a1a1a')
+                sensor_col.pack(side=tk.LEFT, fill='x', expand=True, padx=2)
+                
+                # Sensor name label (top)
+                name_label = tk.Label(sensor_col, text=sensor_name, 
+                                     font=('Arial', 9, 'bold'), 
+                                     fg='white', bg='#333333',
+                                     relief='raised', bd=1, pady=2)
+                name_label.pack(fill='x')
+                
+                # State label (bottom)
+                state_label = tk.Label(sensor_col, text="OFF", 
+                                      font=('Arial', 10, 'bold'), 
+                                      fg='white', bg='#4a4a4a',
+                                      relief='raised', bd=1, pady=4)
+                state_label.pack(fill='x')
+                
+                self.sensor_labels[sensor_name] = state_label
             
-            self.sensor_labels[sensor_name] = state_label
-        
-        # Add empty columns to balance the second row (since it has 4 items vs 5 in first row)
-        empty_col = tk.Frame(second_row, bg='#1a1a1a')
-        empty_col.pack(side=tk.LEFT, fill='x', expand=True, padx=2)
+            # Add empty columns so both rows have the same column widths
+            for _ in range(columns - len(row_sensors)):
+                empty_col = tk.Frame(row, bg='#1a1a1a')
+                empty_col.pack(side=tk.LEFT, fill='x', expand=True, padx=2)
         
         # Control instructions
         instructions = tk.Label(left_frame, 
@@ -243,6 +304,10 @@ class AirlockGUI:
                                                         wrap=tk.WORD)
         self.terminal_output.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
         
+        # Color tags are configured once here, not per message
+        for tag, color in TAG_COLORS.items():
+            self.terminal_output.tag_configure(tag, foreground=color)
+        
         # Terminal input frame
         input_frame = tk.Frame(terminal_frame, bg='#2a2a2a')
         input_frame.pack(fill=tk.X, pady=5, padx=5)
@@ -271,6 +336,11 @@ class AirlockGUI:
                             bg='#ff6b35', fg='white', font=('Arial', 9))
         clear_btn.pack(side=tk.LEFT)
         
+        export_btn = tk.Button(control_frame, text="Export Latency", 
+                             command=self.export_latency,
+                             bg='#2196F3', fg='white', font=('Arial', 9))
+        export_btn.pack(side=tk.LEFT, padx=5)
+        
         auto_scroll_var = tk.BooleanVar(value=True)
         self.auto_scroll_check = tk.Checkbutton(control_frame, text="Auto Scroll",
                                                variable=auto_scroll_var,
@@ -279,8 +349,15 @@ class AirlockGUI:
         self.auto_scroll_check.pack(side=tk.RIGHT)
         self.auto_scroll = auto_scroll_var
         
+        self.spool_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Log to file", variable=self.spool_var,
+                      command=self.on_spool_toggle,
+                      bg='#2a2a2a', fg='white',
+                      selectcolor='#4a4a4a').pack(side=tk.RIGHT, padx=5)
+        
         # Draw initial airlock
         self.draw_airlock_static()
+        self.create_dynamic_items()
         self.update_display()
         
         # Bind controls
@@ -298,44 +375,32 @@ class AirlockGUI:
         self.add_terminal_message("Type commands below to send to Arduino", "INFO")
         self.add_terminal_message("Commands are sent with < > delimiters automatically", "INFO")
         
-        # Debug: Show initial gate states
-        print(f"DEBUG: Initial gate states:")
-        print(f"DEBUG: Gate A - Open: {self.gate_a_open}, Moving: {self.gate_a_moving}, Target: {self.gate_a_target_state}")
-        print(f"DEBUG: Gate B - Open: {self.gate_b_open}, Moving: {self.gate_b_moving}, Target: {self.gate_b_target_state}")
-        print(f"DEBUG: Gate requests: {self.gate_requests}")
-        
     def add_terminal_message(self, message, msg_type="DATA"):
-        """Add a message to the terminal with timestamp and formatting"""
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        
-        self.terminal_output.config(state=tk.NORMAL)
+        """Queue a message for the terminal; it is drawn with the next frame"""
+        self.terminal.post(message, msg_type)
+        self.request_update()
+    
+    @traced('render terminal', 'render')
+    def flush_terminal(self):
+        """Insert all queued messages in one batch and evict the oldest lines"""
+        entries = self.terminal.drain()
+        if not entries:
+            return
         
-        # Color coding based on message type
-        if msg_type == "SENT":
-            color_tag = "sent"
-            prefix = ">> "
-        elif msg_type == "RECEIVED":
-            color_tag = "received"
-            prefix = "<< "
-        elif msg_type == "INFO":
-            color_tag = "info"
-            prefix = "-- "
-        elif msg_type == "ERROR":
-            color_tag = "error"
-            prefix = "!! "
-        else:
-            color_tag = "default"
-            prefix = "   "
+        # One insert call for the whole batch: text, tag, text, tag, ...
+        chunks = []
+        for line, tag in entries:
+            chunks.append(line)
+            chunks.append(tag)
         
-        # Configure color tags
-        self.terminal_output.tag_configure("sent", foreground="#ffff00")
-        self.terminal_output.tag_configure("received", foreground="#00ff00")
-        self.terminal_output.tag_configure("info", foreground="#00aaff")
-        self.terminal_output.tag_configure("error", foreground="#ff0000")
-        self.terminal_output.tag_configure("default", foreground="#ffffff")
+        self.terminal_output.config(state=tk.NORMAL)
+        self.terminal_output.insert(tk.END, *chunks)
         
-        formatted_message = f"[{timestamp}] {prefix}{message}\n"
-        self.terminal_output.insert(tk.END, formatted_message, color_tag)
+        # Keep at most max_lines lines (the widget always ends with an empty line)
+        line_count = int(self.terminal_output.index('end-1c').split('.')[0]) - 1
+        excess = line_count - self.terminal.max_lines
+        if excess > 0:
+            self.terminal_output.delete('1.0', f'{excess + 1}.0')
         
         # Auto scroll if enabled
         if self.auto_scroll.get():
@@ -343,6 +408,21 @@ class AirlockGUI:
         
         self.terminal_output.config(state=tk.DISABLED)
     
+    def on_spool_toggle(self):
+        """Start or stop writing the full terminal history to a log file"""
+        if self.spool_var.get():
+            path = datetime.datetime.now().strftime("airlock_terminal_%Y%m%d_%H%M%S.log")
+            try:
+                self.terminal.start_spool(path)
+            except OSError as e:
+                self.spool_var.set(False)
+                self.add_terminal_message(f"Cannot open log file: {e}", "ERROR")
+                return
+            self.add_terminal_message(f"Logging terminal to {path}", "INFO")
+        else:
+            self.add_terminal_message("Terminal logging stopped", "INFO")
+            self.terminal.stop_spool()
+    
     def send_command(self, event=None):
         """Send a custom command through the terminal"""
         command = self.command_entry.get().strip()
@@ -360,7 +440,7 @@ class AirlockGUI:
             command = command + '>'
         
         try:
-            self.ser.write(command.encode())
+            self.write_serial(command.encode())
             self.add_terminal_message(command, "SENT")
             self.command_entry.delete(0, tk.END)
         except serial.SerialException as e:
@@ -368,6 +448,7 @@ class AirlockGUI:
     
     def clear_terminal(self):
         """Clear the terminal output"""
+        self.terminal.clear()
         self.terminal_output.config(state=tk.NORMAL)
         self.terminal_output.delete(1.0, tk.END)
         self.terminal_output.config(state=tk.DISABLED)
@@ -380,28 +461,28 @@ class AirlockGUI:
         
         # Draw zones
         # Front zone
-        self.canvas.create_rectangle(self.start_x, self.start_y, 
-                                   self.start_x + self.front_zone_width, 
-                                   self.start_y + self.airlock_height,
+        self.canvas.create_rectangle(self.sim.start_x, self.sim.start_y, 
+                                   self.sim.start_x + self.sim.front_zone_width, 
+                                   self.sim.start_y + self.sim.airlock_height,
                                    fill='#3a3a3a', outline='white', width=2, tags="static")
-        self.canvas.create_text(self.start_x + self.front_zone_width/2, self.start_y + 20,
+        self.canvas.create_text(self.sim.start_x + self.sim.front_zone_width/2, self.sim.start_y + 20,
                               text="FRONT ZONE", fill='white', font=('Arial', 14, 'bold'), tags="static")
         
         # Middle zone
-        self.canvas.create_rectangle(self.start_x + self.front_zone_width, self.start_y,
-                                   self.start_x + self.front_zone_width + self.middle_zone_width,
-                                   self.start_y + self.airlock_height,
+        self.canvas.create_rectangle(self.sim.start_x + self.sim.front_zone_width, self.sim.start_y,
+                                   self.sim.start_x + self.sim.front_zone_width + self.sim.middle_zone_width,
+                                   self.sim.start_y + self.sim.airlock_height,
                                    fill='#4a4a4a', outline='white', width=2, tags="static")
-        self.canvas.create_text(self.start_x + self.front_zone_width + self.middle_zone_width/2, self.start_y + 20,
+        self.canvas.create_text(self.sim.start_x + self.sim.front_zone_width + self.sim.middle_zone_width/2, self.sim.start_y + 20,
                               text="MIDDLE ZONE", fill='white', font=('Arial', 14, 'bold'), tags="static")
         
         # Back zone
-        self.canvas.create_rectangle(self.start_x + self.front_zone_width + self.middle_zone_width, self.start_y,
-                                   self.start_x + self.airlock_width,
-                                   self.start_y + self.airlock_height,
+        self.canvas.create_rectangle(self.sim.start_x + self.sim.front_zone_width + self.sim.middle_zone_width, self.sim.start_y,
+                                   self.sim.start_x + self.sim.airlock_width,
+                                   self.sim.start_y + self.sim.airlock_height,
                                    fill='#3a3a3a', outline='white', width=2, tags="static")
-        self.canvas.create_text(self.start_x + self.front_zone_width + self.middle_zone_width + self.back_zone_width/2, 
-                              self.start_y + 20, text="BACK ZONE", fill='white', font=('Arial', 14, 'bold'), tags="static")
+        self.canvas.create_text(self.sim.start_x + self.sim.front_zone_width + self.sim.middle_zone_width + self.sim.back_zone_width/2, 
+                              self.sim.start_y + 20, text="BACK ZONE", fill='white', font=('Arial', 14, 'bold'), tags="static")
         
     def update_display(self):
         """Update only the dynamic parts of the display - now throttled"""
@@ -411,261 +492,146 @@ class AirlockGUI:
         """Update only the gates and particles - now throttled"""  
         self.request_update()
     
+    def create_dynamic_items(self):
+        """Create every moving or recoloured canvas item once; frames only update them"""
+        sim = self.sim
+        self.canvas_items = {}
+        self.item_state = {}  # item id -> last (coords, options) applied
+        
+        # Layout sensors: beams as dashed lines, safety spans as dashed areas.
+        # Each entry is (shape, label or None, shape option, lit colour, idle colour)
+        self.sensor_items = []
+        self.drawn_sensor_hits = set()
+        for element in sim.sensor_layout.elements:
+            left, right = sim.start_x + element.left, sim.start_x + element.right
+            text = None
+            if element.left == element.right:
+                shape = self.canvas.create_line(left, sim.start_y + 20, left, sim.start_y + sim.airlock_height - 20,
+                                                width=5, dash=(8, 4), tags="sensor_zones")
+                if element.label:
+                    text = self.canvas.create_text(left - 20, sim.start_y + 10, text=element.label,
+                                                   font=('Arial', 9, 'bold'), tags="sensor_zones")
+                entry = (shape, text, 'fill', '#00ff00', '#005500')
+            else:
+                shape = self.canvas.create_rectangle(left, sim.start_y, right, sim.start_y + sim.airlock_height,
+                                                     fill='', width=3, dash=(3, 3), tags="sensor_zones")
+                if element.label:
+                    text = self.canvas.create_text((left + right) / 2, sim.start_y + sim.airlock_height + 20,
+                                                   text=element.label, font=('Arial', 10), tags="sensor_zones")
+                entry = (shape, text, 'outline', '#ff0000', '#550000')
+            self.sensor_items.append(entry)
+            self.draw_sensor(entry, False)
+        
+        # One hidden oval per pool slot, created below the gates and reused
+        self.canvas_items['particles'] = [
+            self.canvas.create_oval(0, 0, 0, 0, outline="", state='hidden', tags="particles")
+            for _ in range(self.particles.capacity)
+        ]
+        
+        # Gates: motion blur, body, mechanical segment lines and labels
+        segment_count = int(sim.airlock_height // 40) + 1
+        for gate, gate_x in zip(sim.gates.names, sim.gates.x):
+            x = sim.start_x + gate_x
+            blur = self.canvas.create_rectangle(0, 0, 0, 0, outline="", state='hidden', tags="gates")
+            body = self.canvas.create_rectangle(0, 0, 0, 0, outline='white', width=2, tags="gates")
+            segments = [self.canvas.create_line(0, 0, 0, 0, fill='#333333', width=1,
+                                                state='hidden', tags="gates")
+                        for _ in range(segment_count)]
+            self.canvas.create_text(x, sim.start_y - 25, text=f"Gate {gate}", fill='white',
+                                    font=('Arial', 12, 'bold'), tags="gates")
+            status = self.canvas.create_text(x, sim.start_y - 10, font=('Arial', 9), tags="gates")
+            self.canvas_items['gate_' + gate] = (blur, body, segments, status)
+        
+        # Rover as a rectangle with direction indicator and label
+        self.canvas_items['rover'] = (
+            self.canvas.create_rectangle(0, 0, 0, 0, fill='#0088ff', outline='white', width=3, tags="rover"),
+            self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill='yellow', outline='white', tags="rover"),
+            self.canvas.create_text(0, 0, text="ROVER", fill='white', font=('Arial', 10, 'bold'), tags="rover")
+        )
+    
+    def set_item(self, item, coords=None, **options):
+        """Apply coords/options to a canvas item only if they differ from the last frame"""
+        old_coords, old_options = self.item_state.get(item, (None, {}))
+        if coords is not None and coords != old_coords:
+            self.canvas.coords(item, *coords)
+            old_coords = coords
+        changed = {key: value for key, value in options.items() if old_options.get(key) != value}
+        if changed:
+            self.canvas.itemconfigure(item, **changed)
+            old_options = dict(old_options, **changed)
+        self.item_state[item] = (old_coords, old_options)
+    
+    def draw_sensor(self, entry, lit):
+        shape, text, option, lit_color, idle_color = entry
+        color = lit_color if lit else idle_color
+        self.set_item(shape, **{option: color})
+        if text is not None:
+            self.set_item(text, fill=color)
+    
     def draw_sensor_zones(self):
-        # Calculate sensor line positions at center of each zone
-        front_sensor_x = self.start_x + self.front_zone_width / 2
-        middle_sensor_x = self.start_x + self.front_zone_width + self.middle_zone_width / 2
-        back_sensor_x = self.start_x + self.front_zone_width + self.middle_zone_width + self.back_zone_width / 2
-        
-        # Draw presence sensor lines
-        # Front presence sensor line
-        self.canvas.create_line(front_sensor_x, self.start_y + 20,
-                              front_sensor_x, self.start_y + self.airlock_height - 20,
-                              fill='#00ff00' if self.sensor_states['PRESENCE_FRONT'] else '#005500',
-                              width=5, dash=(8, 4), tags="sensor_zones")
-        self.canvas.create_text(front_sensor_x - 20, self.start_y + 10,
-                              text="FRONT", fill='#00ff00' if self.sensor_states['PRESENCE_FRONT'] else '#005500',
-                              font=('Arial', 9, 'bold'), tags="sensor_zones")
-        
-        # Middle presence sensor line
-        self.canvas.create_line(middle_sensor_x, self.start_y + 20,
-                              middle_sensor_x, self.start_y + self.airlock_height - 20,
-                              fill='#00ff00' if self.sensor_states['PRESENCE_MIDDLE'] else '#005500',
-                              width=5, dash=(8, 4), tags="sensor_zones")
-        self.canvas.create_text(middle_sensor_x - 20, self.start_y + 10,
-                              text="MIDDLE", fill='#00ff00' if self.sensor_states['PRESENCE_MIDDLE'] else '#005500',
-                              font=('Arial', 9, 'bold'), tags="sensor_zones")
-        
-        # Back presence sensor line
-        self.canvas.create_line(back_sensor_x, self.start_y + 20,
-                              back_sensor_x, self.start_y + self.airlock_height - 20,
-                              fill='#00ff00' if self.sensor_states['PRESENCE_BACK'] else '#005500',
-                              width=5, dash=(8, 4), tags="sensor_zones")
-        self.canvas.create_text(back_sensor_x - 20, self.start_y + 10,
-                              text="BACK", fill='#00ff00' if self.sensor_states['PRESENCE_BACK'] else '#005500',
-                              font=('Arial', 9, 'bold'), tags="sensor_zones")
-        
-        # Gate safety zones (keep these as areas)
-        safety_zone_width = 60
-        
-        # Gate A safety zone
-        self.canvas.create_rectangle(self.start_x + self.gate_a_x - safety_zone_width/2, self.start_y,
-                                   self.start_x + self.gate_a_x + safety_zone_width/2,
-                                   self.start_y + self.airlock_height,
-                                   fill='', outline='#ff0000' if self.sensor_states['GATE_SAFETY_A'] else '#550000',
-                                   width=3, dash=(3, 3), tags="sensor_zones")
-        self.canvas.create_text(self.start_x + self.gate_a_x, self.start_y + self.airlock_height + 20,
-                              text="Gate A Safety", fill='#ff0000' if self.sensor_states['GATE_SAFETY_A'] else '#550000',
-                              font=('Arial', 10), tags="sensor_zones")
-        
-        # Gate B safety zone
-        self.canvas.create_rectangle(self.start_x + self.gate_b_x - safety_zone_width/2, self.start_y,
-                                   self.start_x + self.gate_b_x + safety_zone_width/2,
-                                   self.start_y + self.airlock_height,
-                                   fill='', outline='#ff0000' if self.sensor_states['GATE_SAFETY_B'] else '#550000',
-                                   width=3, dash=(3, 3), tags="sensor_zones")
-        self.canvas.create_text(self.start_x + self.gate_b_x, self.start_y + self.airlock_height + 20,
-                              text="Gate B Safety", fill='#ff0000' if self.sensor_states['GATE_SAFETY_B'] else '#550000',
-                              font=('Arial', 10), tags="sensor_zones")
-        
+        # Only sensors the rover entered or left since the last frame are redrawn
+        hits = set(self.sim.sensor_hits or ())
+        for index in hits ^ self.drawn_sensor_hits:
+            self.draw_sensor(self.sensor_items[index], index in hits)
+        self.drawn_sensor_hits = hits
+    
     def draw_gates(self):
-        # Update and draw particles (but don't delete all particles every frame)
-        self.gate_a_particles = self.update_particles(self.gate_a_particles)
-        self.gate_b_particles = self.update_particles(self.gate_b_particles)
-        
-        # Only draw particles if there are particles to show
-        if self.gate_a_particles or self.gate_b_particles:
-            self.draw_particles(self.gate_a_particles)
-            self.draw_particles(self.gate_b_particles)
-        
-        # Gate A with enhanced animation
-        if self.gate_a_moving:
-            # Use smooth cubic easing for both opening and closing
-            eased_progress = self.ease_in_out_cubic(self.gate_animation_progress_a)
-        else:
-            eased_progress = self.gate_animation_progress_a
-        
-        # Smooth top-to-bottom animation
-        # When closed: gate covers entire opening (y=start_y, height=full)
-        # When open: gate is pushed down to bottom (y=start_y+height, height=minimal)
-        gate_a_y = self.start_y + (self.airlock_height * eased_progress)
-        gate_a_height = self.airlock_height * (1 - eased_progress)
-        
-        # Ensure minimum visibility when fully open
-        if gate_a_height < 3:
-            gate_a_height = 3  # Keep a small visible portion when fully open
-        
-        # Enhanced gate colors with smoother effects
-        if self.gate_a_moving:
-            # Smoother pulsing effect (reduced frequency)
-            pulse = abs(math.sin(time.time() * 3)) * 0.2 + 0.8  # Slower and subtler pulse
-            gate_a_color = f"#{int(255*pulse):02x}{int(255*pulse):02x}00"  # Pulsing yellow
+        sim = self.sim
+        gates = sim.gates
+        for index, gate in enumerate(gates.names):
+            gate_x, progress, moving, is_open = gates.x[index], gates.progress[index], \
+                gates.moving[index], gates.open[index]
+            blur, body, segments, status = self.canvas_items['gate_' + gate]
             
-            # Simplified motion blur - just one subtle shadow
-            blur_alpha = 30
-            blur_color = f"#{blur_alpha:02x}{blur_alpha:02x}00"
-            self.canvas.create_rectangle(
-                self.start_x + self.gate_a_x - self.gate_width/2 - 2, gate_a_y - 2,
-                self.start_x + self.gate_a_x + self.gate_width/2 + 2,
-                gate_a_y + gate_a_height + 2,
-                fill=blur_color, outline="", tags="gates"
-            )
-        else:
-            gate_a_color = '#00ff00' if self.gate_a_open else '#ff0000'
-        
-        # Main gate rectangle
-        self.canvas.create_rectangle(
-            self.start_x + self.gate_a_x - self.gate_width/2, gate_a_y,
-            self.start_x + self.gate_a_x + self.gate_width/2,
-            gate_a_y + gate_a_height,
-            fill=gate_a_color, outline='white', width=2, tags="gates"
-        )
-        
-        # Add mechanical details (only when gate is substantially visible)
-        if gate_a_height > 50:  # Increased threshold to reduce flicker
-            segment_height = 40  # Larger segments, fewer lines
-            for y in range(int(gate_a_y + segment_height), int(gate_a_y + gate_a_height), segment_height):
-                self.canvas.create_line(
-                    self.start_x + self.gate_a_x - self.gate_width/2 + 1, y,
-                    self.start_x + self.gate_a_x + self.gate_width/2 - 1, y,
-                    fill='#333333', width=1, tags="gates"
-                )
-        
-        # Gate A label with status
-        status_text = "OPENING" if (self.gate_a_moving and self.gate_a_target_state) else \
-                     "CLOSING" if (self.gate_a_moving and not self.gate_a_target_state) else \
-                     "OPEN" if self.gate_a_open else "CLOSED"
-        
-        self.canvas.create_text(
-            self.start_x + self.gate_a_x, self.start_y - 25,
-            text=f"Gate A", fill='white', font=('Arial', 12, 'bold'), tags="gates"
-        )
-        self.canvas.create_text(
-            self.start_x + self.gate_a_x, self.start_y - 10,
-            text=f"[{status_text}]", fill='yellow' if self.gate_a_moving else 'white', 
-            font=('Arial', 9), tags="gates"
-        )
-        
-        # Gate B with enhanced animation (same logic as Gate A)
-        if self.gate_b_moving:
-            # Use smooth cubic easing for both opening and closing
-            eased_progress = self.ease_in_out_cubic(self.gate_animation_progress_b)
-        else:
-            eased_progress = self.gate_animation_progress_b
-        
-        # Smooth top-to-bottom animation
-        gate_b_y = self.start_y + (self.airlock_height * eased_progress)
-        gate_b_height = self.airlock_height * (1 - eased_progress)
-        
-        # Ensure minimum visibility when fully open
-        if gate_b_height < 3:
-            gate_b_height = 3  # Keep a small visible portion when fully open
-        
-        if self.gate_b_moving:
-            # Smoother pulsing effect (reduced frequency)
-            pulse = abs(math.sin(time.time() * 3)) * 0.2 + 0.8  # Slower and subtler pulse
-            gate_b_color = f"#{int(255*pulse):02x}{int(255*pulse):02x}00"  # Pulsing yellow
+            # Smooth cubic easing while moving
+            eased_progress = self.ease_in_out_cubic(progress) if moving else progress
             
-            # Simplified motion blur - just one subtle shadow
-            blur_alpha = 30
-            blur_color = f"#{blur_alpha:02x}{blur_alpha:02x}00"
-            self.canvas.create_rectangle(
-                self.start_x + self.gate_b_x - self.gate_width/2 - 2, gate_b_y - 2,
-                self.start_x + self.gate_b_x + self.gate_width/2 + 2,
-                gate_b_y + gate_b_height + 2,
-                fill=blur_color, outline="", tags="gates"
-            )
-        else:
-            gate_b_color = '#00ff00' if self.gate_b_open else '#ff0000'
-        
-        # Main gate rectangle
-        self.canvas.create_rectangle(
-            self.start_x + self.gate_b_x - self.gate_width/2, gate_b_y,
-            self.start_x + self.gate_b_x + self.gate_width/2,
-            gate_b_y + gate_b_height,
-            fill=gate_b_color, outline='white', width=2, tags="gates"
-        )
-        
-        # Add mechanical details (only when gate is substantially visible)
-        if gate_b_height > 50:  # Increased threshold to reduce flicker
-            segment_height = 40  # Larger segments, fewer lines
-            for y in range(int(gate_b_y + segment_height), int(gate_b_y + gate_b_height), segment_height):
-                self.canvas.create_line(
-                    self.start_x + self.gate_b_x - self.gate_width/2 + 1, y,
-                    self.start_x + self.gate_b_x + self.gate_width/2 - 1, y,
-                    fill='#333333', width=1, tags="gates"
-                )
-        
-        # Gate B label with status
-        status_text = "OPENING" if (self.gate_b_moving and self.gate_b_target_state) else \
-                     "CLOSING" if (self.gate_b_moving and not self.gate_b_target_state) else \
-                     "OPEN" if self.gate_b_open else "CLOSED"
-        
-        self.canvas.create_text(
-            self.start_x + self.gate_b_x, self.start_y - 25,
-            text=f"Gate B", fill='white', font=('Arial', 12, 'bold'), tags="gates"
-        )
-        self.canvas.create_text(
-            self.start_x + self.gate_b_x, self.start_y - 10,
-            text=f"[{status_text}]", fill='yellow' if self.gate_b_moving else 'white', 
-            font=('Arial', 9), tags="gates"
-        )
+            # Smooth top-to-bottom animation
+            # When closed: gate covers entire opening (y=start_y, height=full)
+            # When open: gate is pushed down to bottom (y=start_y+height, height=minimal)
+            gate_y = sim.start_y + (sim.airlock_height * eased_progress)
+            gate_height = max(3, sim.airlock_height * (1 - eased_progress))  # Keep a small visible portion
+            left = sim.start_x + gate_x - sim.gate_width/2
+            right = sim.start_x + gate_x + sim.gate_width/2
+            
+            if moving:
+                # Subtle pulsing yellow with a single motion blur shadow
+                pulse = abs(math.sin(time.time() * 3)) * 0.2 + 0.8
+                color = f"#{int(255*pulse):02x}{int(255*pulse):02x}00"
+                self.set_item(blur, (left - 2, gate_y - 2, right + 2, gate_y + gate_height + 2),
+                              fill="#1e1e00", state='normal')
+            else:
+                color = '#00ff00' if is_open else '#ff0000'
+                self.set_item(blur, state='hidden')
+            
+            self.set_item(body, (left, gate_y, right, gate_y + gate_height), fill=color)
+            
+            # Mechanical details only when the gate is substantially visible
+            segment_ys = []
+            if gate_height > 50:
+                segment_ys = range(int(gate_y + 40), int(gate_y + gate_height), 40)
+            for segment, line in enumerate(segments):
+                if segment < len(segment_ys):
+                    y = segment_ys[segment]
+                    self.set_item(line, (left + 1, y, right - 1, y), state='normal')
+                else:
+                    self.set_item(line, state='hidden')
+            
+            self.set_item(status, text=f"[{gates.state(index)}]", fill='yellow' if moving else 'white')
     
     def draw_rover(self):
-        # Draw rover as a rectangle with direction indicator
-        rover_color = '#0088ff'
-        self.canvas.create_rectangle(self.rover_x - self.rover_width/2,
-                                   self.rover_y - self.rover_height/2,
-                                   self.rover_x + self.rover_width/2,
-                                   self.rover_y + self.rover_height/2,
-                                   fill=rover_color, outline='white', width=3, tags="rover")
-        
-        # Add direction indicator
-        self.canvas.create_polygon(self.rover_x + self.rover_width/2 - 10, self.rover_y - 15,
-                                 self.rover_x + self.rover_width/2 + 10, self.rover_y,
-                                 self.rover_x + self.rover_width/2 - 10, self.rover_y + 15,
-                                 fill='yellow', outline='white', tags="rover")
-        
-        # Add rover label
-        self.canvas.create_text(self.rover_x, self.rover_y,
-                              text="ROVER", fill='white', font=('Arial', 10, 'bold'), tags="rover")
+        sim = self.sim
+        body, arrow, label = self.canvas_items['rover']
+        x, y = sim.rover_x, sim.rover_y
+        front = x + sim.rover_width/2
+        self.set_item(body, (x - sim.rover_width/2, y - sim.rover_height/2,
+                             front, y + sim.rover_height/2))
+        self.set_item(arrow, (front - 10, y - 15, front + 10, y, front - 10, y + 15))
+        self.set_item(label, (x, y))
         
     def update_sensors(self):
-        # Calculate rover edges
-        rover_left = self.rover_x - self.rover_width/2
-        rover_right = self.rover_x + self.rover_width/2
-        
-        # Reset all sensors
-        old_states = self.sensor_states.copy()
-        
-        # Calculate sensor line positions at center of each zone
-        front_sensor_x = self.start_x + self.front_zone_width / 2
-        middle_sensor_x = self.start_x + self.front_zone_width + self.middle_zone_width / 2
-        back_sensor_x = self.start_x + self.front_zone_width + self.middle_zone_width + self.back_zone_width / 2
-        
-        # Check presence sensors (trigger if any part of rover crosses sensor line)
-        self.sensor_states['PRESENCE_FRONT'] = rover_left <= front_sensor_x <= rover_right
-        self.sensor_states['PRESENCE_MIDDLE'] = rover_left <= middle_sensor_x <= rover_right
-        self.sensor_states['PRESENCE_BACK'] = rover_left <= back_sensor_x <= rover_right
-        
-        # Check gate safety sensors (based on rover edges, keep existing logic)
-        safety_zone_width = 60
-        
-        # Gate A safety
-        gate_a_pos = self.start_x + self.gate_a_x
-        if (rover_right > gate_a_pos - safety_zone_width/2 and 
-            rover_left < gate_a_pos + safety_zone_width/2):
-            self.sensor_states['GATE_SAFETY_A'] = True
-        else:
-            self.sensor_states['GATE_SAFETY_A'] = False
-        
-        # Gate B safety
-        gate_b_pos = self.start_x + self.gate_b_x
-        if (rover_right > gate_b_pos - safety_zone_width/2 and 
-            rover_left < gate_b_pos + safety_zone_width/2):
-            self.sensor_states['GATE_SAFETY_B'] = True
-        else:
-            self.sensor_states['GATE_SAFETY_B'] = False
+        if self.sim.update_sensors():
+            self.transmit_sensors()
         
         # Update sensor labels
         for name, state in self.sensor_states.items():
@@ -676,29 +642,14 @@ class AirlockGUI:
                 else:
                     label.config(text="OFF", bg='#4a4a4a', fg='white')
         
-        # Update gate moving states in labels
-        self.sensor_labels['GATE_MOVING_A'].config(
-            text="ON" if self.gate_a_moving else "OFF",
-            bg='#00ff00' if self.gate_a_moving else '#4a4a4a',
-            fg='black' if self.gate_a_moving else 'white'
-        )
-        self.sensor_labels['GATE_MOVING_B'].config(
-            text="ON" if self.gate_b_moving else "OFF",
-            bg='#00ff00' if self.gate_b_moving else '#4a4a4a',
-            fg='black' if self.gate_b_moving else 'white'
-        )
-        
         # Update gate request states in labels
-        self.sensor_labels['GATE_REQUEST_A'].config(
-            text="ON" if self.gate_requests['GATE_REQUEST_A'] else "OFF",
-            bg='#00ff00' if self.gate_requests['GATE_REQUEST_A'] else '#4a4a4a',
-            fg='black' if self.gate_requests['GATE_REQUEST_A'] else 'white'
-        )
-        self.sensor_labels['GATE_REQUEST_B'].config(
-            text="ON" if self.gate_requests['GATE_REQUEST_B'] else "OFF",
-            bg='#00ff00' if self.gate_requests['GATE_REQUEST_B'] else '#4a4a4a',
-            fg='black' if self.gate_requests['GATE_REQUEST_B'] else 'white'
-        )
+        for name in self.sim.gate_request_names:
+            state = self.gate_requests[name]
+            self.sensor_labels[name].config(
+                text="ON" if state else "OFF",
+                bg='#00ff00' if state else '#4a4a4a',
+                fg='black' if state else 'white'
+            )
         
         # Request throttled update instead of immediate update
         self.request_update()
@@ -712,46 +663,42 @@ class AirlockGUI:
         self.canvas.focus_set()
         
         # Check if click is on rover
-        rover_left = self.rover_x - self.rover_width/2
-        rover_right = self.rover_x + self.rover_width/2
-        rover_top = self.rover_y - self.rover_height/2
-        rover_bottom = self.rover_y + self.rover_height/2
+        rover_left = self.sim.rover_x - self.sim.rover_width/2
+        rover_right = self.sim.rover_x + self.sim.rover_width/2
+        rover_top = self.sim.rover_y - self.sim.rover_height/2
+        rover_bottom = self.sim.rover_y + self.sim.rover_height/2
         
         if rover_left <= event.x <= rover_right and rover_top <= event.y <= rover_bottom:
             self.rover_dragging = True
-            self.drag_start_x = event.x - self.rover_x
-            print("Rover grabbed for dragging")
-        else:
-            print(f"Clicked at ({event.x}, {event.y}), rover at ({self.rover_x}, {self.rover_y})")
+            self.drag_start_x = event.x - self.sim.rover_x
+            tracer.instant('rover grabbed', 'input', x=self.sim.rover_x)
     
     def on_canvas_drag(self, event):
         if self.rover_dragging:
             new_x = event.x - self.drag_start_x
-            self.rover_x = new_x
+            self.sim.move_rover(new_x)  # Swept, so a fast drag still fires every beam it crosses
             self.update_sensors()
-            print(f"Rover moved to x={self.rover_x}")
+            tracer.instant('rover moved', 'input', x=self.sim.rover_x)
     
     def on_canvas_release(self, event):
         if self.rover_dragging:
-            print("Rover released")
+            tracer.instant('rover released', 'input', x=self.sim.rover_x)
         self.rover_dragging = False
     
     def on_key_press(self, event):
         step = 0.8
-        new_x = self.rover_x
+        new_x = self.sim.rover_x
         
         if event.keysym == 'Left':
-            new_x = self.rover_x - step
-            print("Left arrow pressed")
+            new_x = self.sim.rover_x - step
         elif event.keysym == 'Right':
-            new_x = self.rover_x + step
-            print("Right arrow pressed")
+            new_x = self.sim.rover_x + step
         else:
             return
         
-        self.rover_x = new_x
+        self.sim.move_rover(new_x)
         self.update_sensors()
-        print(f"Rover moved to x={self.rover_x}")
+        tracer.instant('rover moved', 'input', x=self.sim.rover_x, key=event.keysym)
     
     def get_serial_ports(self):
         ports = serial.tools.list_ports.comports()
@@ -761,6 +708,8 @@ class AirlockGUI:
         self.port_combo['values'] = self.get_serial_ports()
     
     def toggle_connection(self):
+        if self.connecting:
+            return
         if not self.connected:
             self.connect_serial()
         else:
@@ -772,388 +721,408 @@ class AirlockGUI:
             messagebox.showerror("Error", "Please select a COM port")
             return
         
-        try:
-            self.ser = serial.Serial(port, 115200, timeout=1)
-            time.sleep(2)  # Wait for Arduino to initialize
-            self.connected = True
-            self.connect_btn.config(text="Disconnect", bg='#f44336')
-            self.status_label.config(text=f"Connected to {port}", fg='green')
-            self.add_terminal_message(f"Connected to {port} at 115200 baud", "INFO")
-            messagebox.showinfo("Success", f"Connected to {port}")
-            # Send initial sensor states
-            self.send_data()
-        except serial.SerialException as e:
-            error_msg = f"Failed to connect: {str(e)}"
-            self.add_terminal_message(error_msg, "ERROR")
-            messagebox.showerror("Error", error_msg)
+        # Open and wait for the ready banner off the Tk thread
+        self.connecting = True
+        self.connect_btn.config(text="Connecting...", state=tk.DISABLED)
+        self.status_label.config(text=f"Connecting to {port}...", fg='orange')
+        open_serial_async(port,
+                          lambda ser, ready, elapsed: self.scheduler.post(self.on_serial_opened,
+                                                                          port, ser, ready, elapsed),
+                          lambda error: self.scheduler.post(self.on_connect_failed, error),
+                          reset=self.reset_on_connect_var.get())
+    
+    def on_serial_opened(self, port, ser, ready, elapsed):
+        self.connecting = False
+        self.ser = wrap_serial(ser, self.impairment)
+        self.connected = True
+        self.connect_btn.config(text="Disconnect", bg='#f44336', state=tk.NORMAL)
+        self.status_label.config(text=f"Connected to {port}", fg='green')
+        self.add_terminal_message(f"Connected to {port} at 115200 baud", "INFO")
+        if ready:
+            self.add_terminal_message(f"Bridge ready after {elapsed:.2f} s", "INFO")
+        elif self.reset_on_connect_var.get():
+            self.add_terminal_message(f"No ready banner after {elapsed:.1f} s - continuing anyway", "INFO")
+        if self.ser is not ser:
+            self.add_terminal_message(f"Link impairment active (seed {self.impairment.seed})", "INFO")
+        # Event-driven reader: handles each frame as soon as it arrives
+        # Messages are handed to the Tk thread through the scheduler queue
+        self.reader = SerialReader(self.ser,
+                                   lambda line: self.scheduler.post(self.handle_received_line, line),
+                                   lambda error: self.scheduler.post(self.on_serial_error, error))
+        self.reader.start()
+        # Ask the bridge for binary frames; older firmware ignores the probe
+        self.binary_protocol = False
+        self.last_rx_seq = None
+        self.latency.reset()
+        if self.use_binary_var.get():
+            self.write_serial(PROTOCOL_PROBE.encode())
+            self.add_terminal_message(PROTOCOL_PROBE, "SENT")
+        messagebox.showinfo("Success", f"Connected to {port}")
+        # Send initial sensor states
+        self.transmitter.reset()
+        self.transmit_sensors()
+    
+    def on_connect_failed(self, error):
+        self.connecting = False
+        self.connect_btn.config(text="Connect", bg='#4CAF50', state=tk.NORMAL)
+        self.status_label.config(text="Disconnected", fg='red')
+        error_msg = f"Failed to connect: {str(error)}"
+        self.add_terminal_message(error_msg, "ERROR")
+        messagebox.showerror("Error", error_msg)
     
     def disconnect_serial(self):
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
         if self.ser:
             self.ser.close()
             self.ser = None
         self.connected = False
+        self.binary_protocol = False
         self.connect_btn.config(text="Connect", bg='#4CAF50')
         self.status_label.config(text="Disconnected", fg='red')
         self.add_terminal_message("Serial connection closed", "INFO")
     
-    def send_data(self):
+    def open_impairment_dialog(self):
+        if self.impairment_dialog and self.impairment_dialog.window.winfo_exists():
+            self.impairment_dialog.window.lift()
+            return
+        self.impairment_dialog = ImpairmentDialog(
+            self.root, self.impairment,
+            on_apply=lambda: self.add_terminal_message("Link impairment settings applied", "INFO"))
+    
+    def export_latency(self):
+        """Save the round-trip latency histogram of this run as JSON"""
+        if not self.latency.histogram.count:
+            messagebox.showinfo("Export Latency", "No latency samples recorded yet")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON", "*.json")],
+            initialfile=datetime.datetime.now().strftime("latency_%Y%m%d_%H%M%S.json"))
+        if not path:
+            return
+        try:
+            self.latency.export(path,
+                                port=self.port_var.get(),
+                                protocol="binary" if self.binary_protocol else "text",
+                                change_driven=self.transmitter.enabled,
+                                tick_rate=self.clock.tick_rate)
+            self.add_terminal_message(f"Latency histogram saved to {path}", "INFO")
+        except OSError as e:
+            self.add_terminal_message(f"Failed to export latency: {e}", "ERROR")
+    
+    def on_transmit_mode_change(self):
+        """Apply the change-driven checkbox and heartbeat spinbox"""
+        self.transmitter.enabled = self.change_driven_var.get()
+        try:
+            self.transmitter.heartbeat_interval = max(0.1, float(self.heartbeat_var.get()))
+        except ValueError:
+            pass
+    
+    def transmit_sensors(self, periodic=False):
+        """Send the sensor frame if anything changed or a heartbeat is due.
+        
+        Called right after every sensor or gate-moving change, and from the
+        periodic scheduler task for heartbeats and the fixed-rate mode.
+        """
         if not self.connected or not self.ser:
             return
         
-        # Format data as expected by Arduino
-        data_parts = []
-        for name, state in self.sensor_states.items():
-            if name not in ['GATE_MOVING_A', 'GATE_MOVING_B']:  # Don't send internal states
-                value = "1" if state else "0"
-                data_parts.append(f"{name}:{value}")
+        state = tuple(self.sensor_states.values())
+        now = time.monotonic()
+        if self.transmitter.should_send(state, now, periodic):
+            # Heartbeats are not echoed to the terminal
+            log = not (self.transmitter.enabled and self.transmitter.is_heartbeat(state))
+            size = self.send_data(log=log)
+            if size:
+                self.last_frame_size = size
+                self.transmitter.record_sent(state, now, size)
+        elif periodic:
+            self.transmitter.record_skipped(self.last_frame_size)
+    
+    @traced('transmit', 'transmit')
+    def send_data(self, log=True):
+        """Write one sensor frame; returns the number of bytes sent"""
+        if not self.connected or not self.ser:
+            return 0
         
-        # Add gate moving states
-        data_parts.append(f"GATE_MOVING_A:{'1' if self.gate_a_moving else '0'}")
-        data_parts.append(f"GATE_MOVING_B:{'1' if self.gate_b_moving else '0'}")
+        if self.binary_protocol:
+            return self.send_binary_data(log)
         
-        message = "<" + ",".join(data_parts) + ">"
+        # Format data as expected by Arduino. The sequence tag goes last -
+        # older firmware reading one value char per pair ignores it
+        seq = self.tx_seq
+        self.tx_seq = (self.tx_seq + 1) % SEQ_MODULO
+        message = SENSOR_CODEC.encode_text(SENSOR_CODEC.pack(self.sensor_states), seq)
         
         try:
-            self.ser.write(message.encode())
-            self.add_terminal_message(message, "SENT")
+            self.write_serial(message.encode())
+            self.latency.sent(seq, time.perf_counter())
+            if log:
+                self.add_terminal_message(message, "SENT")
+            return len(message)
         except serial.SerialException as e:
             error_msg = f"Failed to send data: {str(e)}"
             self.add_terminal_message(error_msg, "ERROR")
             messagebox.showerror("Error", error_msg)
+            return 0
     
-    def read_arduino_data(self):
-        if not self.connected or not self.ser:
-            return
+    def send_binary_data(self, log=True):
+        """Send the sensor states as a 4-byte binary frame"""
+        bits = SENSOR_CODEC.pack(self.sensor_states)
+        frame = encode_binary_frame(self.tx_seq, bits)
+        seq = self.tx_seq
+        self.tx_seq = (self.tx_seq + 1) % SEQ_MODULO
         
         try:
-            if self.ser.in_waiting > 0:
-                line = self.ser.readline().decode().strip()
-                print("LINE "+line)
-                print(line.startswith('<'))
-                
-                print(line[-1])
-                if line.startswith('<') and line.endswith('>'):
-                    # Parse the received data
-                    data = line[1:-1]  # Remove < and >
-                    pairs = data.split(',')
-                    for pair in pairs:
-                        if ':' in pair:
-                            name, value = pair.split(':')
-                            if name in self.gate_requests:
-                                old_value = self.gate_requests[name]
-                                self.gate_requests[name] = value == '1'
-                                print(f"DEBUG: {name} changed from {old_value} to {self.gate_requests[name]}")
-                    
-                    self.add_terminal_message(line, "RECEIVED")
-                    print(f"Received: {line}")
-                    print(f"DEBUG: Current gate requests: {self.gate_requests}")
-                    self.process_gate_requests()
-                elif line:  # Any other non-empty message
-                    self.add_terminal_message(line, "RECEIVED")
-        except serial.SerialException:
-            pass
+            self.write_serial(frame)
+            self.latency.sent(seq, time.perf_counter())
+            if log:
+                self.add_terminal_message(f"[BIN #{seq}] {bits:07b}", "SENT")
+            return len(frame)
+        except serial.SerialException as e:
+            error_msg = f"Failed to send data: {str(e)}"
+            self.add_terminal_message(error_msg, "ERROR")
+            messagebox.showerror("Error", error_msg)
+            return 0
     
-    def process_gate_requests(self):
-        print(f"DEBUG: Processing gate requests...")
-        print(f"DEBUG: Gate A - Request: {self.gate_requests['GATE_REQUEST_A']}, Open: {self.gate_a_open}, Moving: {self.gate_a_moving}, Target: {self.gate_a_target_state}")
-        print(f"DEBUG: Gate B - Request: {self.gate_requests['GATE_REQUEST_B']}, Open: {self.gate_b_open}, Moving: {self.gate_b_moving}, Target: {self.gate_b_target_state}")
-        
-        # Process gate A request - allow direction changes during movement
-        if self.gate_requests['GATE_REQUEST_A']:  # Request = 1: OPEN
-            if not self.gate_a_moving:
-                # Start opening if not moving and not fully open
-                if not self.gate_a_open:
-                    self.gate_a_target_state = True  # Opening
-                    self.gate_a_moving = True
-                    self.gate_a_animation_time = self.gate_animation_progress_a * self.gate_animation_duration
-                    self.sensor_states['GATE_MOVING_A'] = True
-                    print("Gate A: Starting to open (request = 1) with enhanced animation")
-                    
-                    # Create minimal initial particle (just 1)
-                    initial_particles = self.create_gate_particles(self.gate_a_x, 'opening')[:1]  # Only 1 particle
-                    self.gate_a_particles.extend(initial_particles)
-                else:
-                    print("DEBUG: Gate A already fully open - no movement needed")
-            else:
-                # Gate is moving - check if we need to change direction
-                if not self.gate_a_target_state:  # Currently closing, switch to opening
-                    self.gate_a_target_state = True  # Switch to opening
-                    # Calculate new animation time to continue from current position
-                    self.gate_a_animation_time = self.gate_animation_progress_a * self.gate_animation_duration
-                    print(f"Gate A: Switching to opening mid-movement from progress {self.gate_animation_progress_a}")
-                    
-                    # Create particles for direction change
-                    initial_particles = self.create_gate_particles(self.gate_a_x, 'opening')[:1]
-                    self.gate_a_particles.extend(initial_particles)
-                # If already opening, continue opening (no change needed)
-        else:  # Request = 0: CLOSE
-            if not self.gate_a_moving:
-                # Start closing if not moving and not fully closed
-                if self.gate_a_open:
-                    self.gate_a_target_state = False  # Closing
-                    self.gate_a_moving = True
-                    self.gate_a_animation_time = (1.0 - self.gate_animation_progress_a) * self.gate_animation_duration
-                    self.sensor_states['GATE_MOVING_A'] = True
-                    print("Gate A: Starting to close (request = 0) with enhanced animation")
-                    
-                    # Create minimal initial particle (just 1)
-                    initial_particles = self.create_gate_particles(self.gate_a_x, 'closing')[:1]  # Only 1 particle
-                    self.gate_a_particles.extend(initial_particles)
-                else:
-                    print("DEBUG: Gate A already fully closed - no movement needed")
-            else:
-                # Gate is moving - check if we need to change direction
-                if self.gate_a_target_state:  # Currently opening, switch to closing
-                    self.gate_a_target_state = False  # Switch to closing
-                    # Calculate new animation time to continue from current position
-                    self.gate_a_animation_time = (1.0 - self.gate_animation_progress_a) * self.gate_animation_duration
-                    print(f"Gate A: Switching to closing mid-movement from progress {self.gate_animation_progress_a}")
-                    
-                    # Create particles for direction change
-                    initial_particles = self.create_gate_particles(self.gate_a_x, 'closing')[:1]
-                    self.gate_a_particles.extend(initial_particles)
-                # If already closing, continue closing (no change needed)
-        
-        # Process gate B request - allow direction changes during movement
-        if self.gate_requests['GATE_REQUEST_B']:  # Request = 1: OPEN
-            if not self.gate_b_moving:
-                # Start opening if not moving and not fully open
-                if not self.gate_b_open:
-                    self.gate_b_target_state = True  # Opening
-                    self.gate_b_moving = True
-                    self.gate_b_animation_time = self.gate_animation_progress_b * self.gate_animation_duration
-                    self.sensor_states['GATE_MOVING_B'] = True
-                    print("Gate B: Starting to open (request = 1) with enhanced animation")
-                    
-                    # Create minimal initial particle (just 1)
-                    initial_particles = self.create_gate_particles(self.gate_b_x, 'opening')[:1]  # Only 1 particle
-                    self.gate_b_particles.extend(initial_particles)
-                else:
-                    print("DEBUG: Gate B already fully open - no movement needed")
-            else:
-                # Gate is moving - check if we need to change direction
-                if not self.gate_b_target_state:  # Currently closing, switch to opening
-                    self.gate_b_target_state = True  # Switch to opening
-                    # Calculate new animation time to continue from current position
-                    self.gate_b_animation_time = self.gate_animation_progress_b * self.gate_animation_duration
-                    print(f"Gate B: Switching to opening mid-movement from progress {self.gate_animation_progress_b}")
-                    
-                    # Create particles for direction change
-                    initial_particles = self.create_gate_particles(self.gate_b_x, 'opening')[:1]
-                    self.gate_b_particles.extend(initial_particles)
-                # If already opening, continue opening (no change needed)
-        else:  # Request = 0: CLOSE
-            if not self.gate_b_moving:
-                # Start closing if not moving and not fully closed
-                if self.gate_b_open:
-                    self.gate_b_target_state = False  # Closing
-                    self.gate_b_moving = True
-                    self.gate_b_animation_time = (1.0 - self.gate_animation_progress_b) * self.gate_animation_duration
-                    self.sensor_states['GATE_MOVING_B'] = True
-                    print("Gate B: Starting to close (request = 0) with enhanced animation")
-                    
-                    # Create minimal initial particle (just 1)
-                    initial_particles = self.create_gate_particles(self.gate_b_x, 'closing')[:1]  # Only 1 particle
-                    self.gate_b_particles.extend(initial_particles)
-                else:
-                    print("DEBUG: Gate B already fully closed - no movement needed")
-            else:
-                # Gate is moving - check if we need to change direction
-                if self.gate_b_target_state:  # Currently opening, switch to closing
-                    self.gate_b_target_state = False  # Switch to closing
-                    # Calculate new animation time to continue from current position
-                    self.gate_b_animation_time = (1.0 - self.gate_animation_progress_b) * self.gate_animation_duration
-                    print(f"Gate B: Switching to closing mid-movement from progress {self.gate_animation_progress_b}")
-                    
-                    # Create particles for direction change
-                    initial_particles = self.create_gate_particles(self.gate_b_x, 'closing')[:1]
-                    self.gate_b_particles.extend(initial_particles)
-                # If already closing, continue closing (no change needed)
+    def handle_binary_frame(self, frame):
+        """Apply a binary GATE_REQUEST reply"""
+        # Replies echo our sequence number, so a gap means a lost frame.
+        # Unsolicited request edges repeat the last number.
+        if self.last_rx_seq is not None and \
+                frame.seq not in (self.last_rx_seq, (self.last_rx_seq + 1) % SEQ_MODULO):
+            self.sequence_gaps += 1
+        self.last_rx_seq = frame.seq
+        
+        self.gate_requests.update(REQUEST_CODEC.unpack(frame.bits))
+        self.add_terminal_message(f"[BIN #{frame.seq}] {frame.bits:02b}", "RECEIVED")
+        self.process_gate_requests(frame.seq)
     
-    def animate_gates(self):
-        dt = 0.1  # Increased delta time to 100ms for smoother, less frequent updates
-        gates_moving = False
-        animation_changed = False  # Track if animation state actually changed
+    def write_serial(self, data):
+        """Write raw bytes to the bridge, recording them if a session is being recorded"""
+        self.ser.write(data)
+        if self.recorder:
+            self.recorder.record_tx(data)
+        if self.telemetry:
+            self.telemetry.publish('tx_frame', frame_text(data))
+    
+    @traced('handle message', 'state')
+    def handle_received_line(self, line):
+        """Handle one complete message from the serial reader"""
+        if self.recorder:
+            self.recorder.record_rx(line)
+        if self.telemetry:
+            self.telemetry.publish('rx_frame', frame_text(line))
+        if isinstance(line, BinaryFrame):
+            self.handle_binary_frame(line)
+            return
+        if line == PROTOCOL_PROBE:
+            self.binary_protocol = True
+            self.add_terminal_message("Bridge supports binary frames - switching protocol", "INFO")
+            return
         
-        # Animate gate A
-        if self.gate_a_moving:
-            gates_moving = True
+        if line.startswith('<') and line.endswith('>'):
+            # Requests and the echoed tag of the frame being answered
+            with tracer.span('parse', 'parse'):
+                requests, seq = REQUEST_CODEC.decode_text(line)
+            self.gate_requests.update(requests)
             
-            # Check safety during movement
-            #safety_triggered = self.sensor_states['GATE_SAFETY_A']
-            safety_triggered=False
-            if self.gate_a_target_state:  # Opening
-                # Always allow opening, even if safety is triggered
-                old_progress = self.gate_animation_progress_a
-                self.gate_a_animation_time += dt
-                progress = min(self.gate_a_animation_time / self.gate_animation_duration, 1.0)
-                self.gate_animation_progress_a = progress
-                
-                # Only mark as changed if progress actually changed significantly
-                if abs(progress - old_progress) > 0.02:  # Increased threshold to 2%
-                    animation_changed = True
-                
-                # Create particles during opening (further reduced frequency)
-               
-                
-                if progress >= 1.0:
-                    self.gate_animation_progress_a = 1.0
-                    self.gate_a_open = True
-                    self.gate_a_moving = False
-                    self.gate_a_animation_time = 0
-                    self.sensor_states['GATE_MOVING_A'] = False
-                    animation_changed = True
-                    print("Gate A: Fully opened with enhanced animation")
-                    
-                    # Create burst of particles when fully opened (minimal burst)
-                    burst_particles = self.create_gate_particles(self.gate_a_x, 'opened')[:1]  # Only 1 particle
-                    self.gate_a_particles.extend(burst_particles)
-                    
-            else:  # Closing
-                # Stop closing if safety is triggered, but allow to continue when clear
-                if not safety_triggered:
-                    old_progress = self.gate_animation_progress_a
-                    self.gate_a_animation_time += dt
-                    progress = min(self.gate_a_animation_time / self.gate_animation_duration, 1.0)
-                    self.gate_animation_progress_a = 1.0 - progress  # Reverse for closing
-                    
-                    # Only mark as changed if progress actually changed significantly
-                    if abs((1.0 - progress) - old_progress) > 0.02:  # Increased threshold to 2%
-                        animation_changed = True
-                    
-                    # Create particles during closing (minimal frequency)
-                    if random.random() < 0.01:  # Reduced to 1% chance each frame
-                        new_particles = self.create_gate_particles(self.gate_a_x, 'closing')
-                        self.gate_a_particles.extend(new_particles)
-                        animation_changed = True
-                    
-                    if progress >= 1.0:
-                        self.gate_animation_progress_a = 0.0
-                        self.gate_a_open = False
-                        self.gate_a_moving = False
-                        self.gate_a_animation_time = 0
-                        self.sensor_states['GATE_MOVING_A'] = False
-                        animation_changed = True
-                        print("Gate A: Fully closed with enhanced animation")
-                else:
-                    print("Gate A: Closing paused - safety triggered")
+            self.add_terminal_message(line, "RECEIVED")
+            self.process_gate_requests(seq)
+        else:  # Any other non-empty message
+            self.add_terminal_message(line, "RECEIVED")
+    
+    def on_serial_error(self, error):
+        """Posted by the reader thread when the port fails"""
+        self.add_terminal_message(f"Serial read failed: {error}", "ERROR")
+        if self.connected:
+            self.disconnect_serial()
+    
+    def process_gate_requests(self, seq=None):
+        # Round trip ends here: sensor frame written -> tagged reply being applied
+        if seq is not None:
+            self.latency.received(seq, time.perf_counter())
+        
+        if tracer.enabled:
+            # Gate state before the requests are applied
+            gates = self.sim.gates
+            tracer.instant('gate requests', 'state', seq=seq,
+                           requests=[self.gate_requests[name] for name in self.sim.gate_request_names],
+                           gates=[gates.state(index) for index in range(gates.count)])
+        
+        with tracer.span('state update', 'state'):
+            self.sim.process_gate_requests()
+        self.transmit_sensors()  # GATE_MOVING_* may have just gone high
+    
+    def on_gate_event(self, event, gate):
+        """Simulator callback for gate transitions - trace and spawn particles"""
+        gates = self.sim.gates
+        gate_x = gates.x[gates.names.index(gate)]
+        tracer.instant('gate ' + event, 'state', gate=gate, sim_time=self.sim.sim_time)
+        
+        # Minimal particle effect on start, direction change and full opening
+        if event != 'closed':
+            self.spawn_gate_particle(gate_x)
+    
+    def on_sensor_edge(self, edge):
+        """Simulator callback for each sensor edge of a rover move - send it as its own frame"""
+        tracer.instant('sensor edge', 'state', signal=edge.signal, rising=edge.rising, sim_time=edge.time)
+        # A beam crossed within one move reaches the bridge as an on and an off frame
+        self.transmit_sensors()
+    
+    @traced('simulation tick', 'state')
+    def simulation_tick(self):
+        """Run every fixed step that is due, catching up if this task ran late"""
+        if self.replay:
+            self.replay_tick()
+            return
         
-        # Animate gate B (similar to gate A)
-        if self.gate_b_moving:
-            gates_moving = True
-            
-            # Check safety during movement
-            #safety_triggered = self.sensor_states['GATE_SAFETY_B']
-            safety_triggered=False
-            if self.gate_b_target_state:  # Opening
-                # Always allow opening, even if safety is triggered
-                old_progress = self.gate_animation_progress_b
-                self.gate_b_animation_time += dt
-                progress = min(self.gate_b_animation_time / self.gate_animation_duration, 1.0)
-                self.gate_animation_progress_b = progress
-                
-                # Only mark as changed if progress actually changed significantly
-                if abs(progress - old_progress) > 0.02:  # Increased threshold to 2%
-                    animation_changed = True
-                
-                # Create particles during opening (further reduced frequency)
-                if random.random() < 0.02:  # Reduced to 2% chance each frame
-                    new_particles = self.create_gate_particles(self.gate_b_x, 'opening')
-                    self.gate_b_particles.extend(new_particles)
-                    animation_changed = True
-                
-                if progress >= 1.0:
-                    self.gate_animation_progress_b = 1.0
-                    self.gate_b_open = True
-                    self.gate_b_moving = False
-                    self.gate_b_animation_time = 0
-                    self.sensor_states['GATE_MOVING_B'] = False
-                    animation_changed = True
-                    print("Gate B: Fully opened with enhanced animation")
-                    
-                    # Create burst of particles when fully opened (minimal burst)
-                    burst_particles = self.create_gate_particles(self.gate_b_x, 'opened')[:1]  # Only 1 particle
-                    self.gate_b_particles.extend(burst_particles)
-                    
-            else:  # Closing
-                # Stop closing if safety is triggered, but allow to continue when clear
-                if not safety_triggered:
-                    old_progress = self.gate_animation_progress_b
-                    self.gate_b_animation_time += dt
-                    progress = min(self.gate_b_animation_time / self.gate_animation_duration, 1.0)
-                    self.gate_animation_progress_b = 1.0 - progress  # Reverse for closing
-                    
-                    # Only mark as changed if progress actually changed significantly
-                    if abs((1.0 - progress) - old_progress) > 0.02:  # Increased threshold to 2%
-                        animation_changed = True
-                    
-                    # Create particles during closing (minimal frequency)
-                    if random.random() < 0.01:  # Reduced to 1% chance each frame
-                        new_particles = self.create_gate_particles(self.gate_b_x, 'closing')
-                        self.gate_b_particles.extend(new_particles)
-                        animation_changed = True
-                    
-                    if progress >= 1.0:
-                        self.gate_animation_progress_b = 0.0
-                        self.gate_b_open = False
-                        self.gate_b_moving = False
-                        self.gate_b_animation_time = 0
-                        self.sensor_states['GATE_MOVING_B'] = False
-                        animation_changed = True
-                        print("Gate B: Fully closed with enhanced animation")
-                else:
-                    print("Gate B: Closing paused - safety triggered")
+        animation_changed = False
+        for _ in range(self.clock.poll()):
+            if self.sim.step(self.clock.dt):
+                animation_changed = True
+            self.transmit_sensors()  # Send GATE_MOVING_* falling edges at the step they happen
+        if self.telemetry:
+            self.telemetry.publish_simulator(self.sim)
+        
+        if animation_changed:
+            self.request_update()
+    
+    def on_record_toggle(self):
+        """Start or stop recording frames and state snapshots to a session file"""
+        if self.record_var.get():
+            path = datetime.datetime.now().strftime("airlock_session_%Y%m%d_%H%M%S.alsr")
+            try:
+                self.recorder = SessionRecorder(path, tick_dt=self.clock.dt)
+            except OSError as e:
+                self.record_var.set(False)
+                self.add_terminal_message(f"Cannot open session file: {e}", "ERROR")
+                return
+            self.recorder.record_snapshot(self.sim)
+            self.add_terminal_message(f"Recording session to {path}", "INFO")
+        elif self.recorder:
+            self.recorder.close()
+            self.add_terminal_message(f"Session recording stopped ({self.recorder.records} records)", "INFO")
+            self.recorder = None
+    
+    def record_snapshot(self):
+        if self.recorder:
+            self.recorder.record_snapshot(self.sim)
+    
+    def start_replay(self):
+        """Replay a recorded session into the simulator - no serial port involved"""
+        if self.connected:
+            messagebox.showerror("Error", "Disconnect before replaying a session")
+            return
+        path = filedialog.askopenfilename(filetypes=[("Airlock sessions", "*.alsr"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.replay = SessionReplay(path, sim=self.sim)
+        except (OSError, ValueError) as e:
+            self.add_terminal_message(f"Cannot replay session: {e}", "ERROR")
+            return
+        speed = self.replay_speed_var.get()
+        self.replay_speed = None if speed == "Max" else float(speed.rstrip('x'))
+        self.replay_started = time.monotonic()
+        self.add_terminal_message(f"Replaying {path} ({self.replay.duration:.1f} s at {speed})", "INFO")
+    
+    def replay_tick(self):
+        """Advance the replay to the session time matching the wall clock"""
+        replay = self.replay
+        if self.replay_speed is None:
+            # As fast as possible, in chunks so the GUI stays responsive
+            replay.advance_to(replay.time + 5.0)
+        else:
+            replay.advance_to((time.monotonic() - self.replay_started) * self.replay_speed)
+        self.request_update()
+        
+        if replay.finished:
+            replay.advance_to(replay.duration)
+            self.replay = None
+            self.add_terminal_message(
+                f"Replay finished: {replay.rx_frames} gate request frames, {replay.snapshots} snapshots, "
+                f"max gate progress error {replay.max_progress_error:.3f}", "INFO")
+    
+    def on_trace_toggle(self):
+        """Start a fresh trace or stop recording spans"""
+        if self.trace_var.get():
+            tracer.clear()
+            tracer.enable()
+            self.add_terminal_message("Tracing enabled", "INFO")
+        else:
+            tracer.disable()
+            self.add_terminal_message(f"Tracing stopped ({len(tracer.events)} events)", "INFO")
+    
+    def export_trace(self):
+        """Save the recorded spans as Chrome trace JSON (chrome://tracing, ui.perfetto.dev)"""
+        if not tracer.events:
+            messagebox.showinfo("Export Trace", "No trace events recorded - tick Trace first")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("Chrome trace", "*.json")],
+            initialfile=datetime.datetime.now().strftime("airlock_trace_%Y%m%d_%H%M%S.json"))
+        if not path:
+            return
+        try:
+            tracer.export(path)
+            self.add_terminal_message(f"Trace with {len(tracer.events)} events saved to {path}", "INFO")
+        except OSError as e:
+            self.add_terminal_message(f"Failed to export trace: {e}", "ERROR")
+    
+    def on_tick_rate_change(self):
+        """Apply the simulation rate spinbox"""
+        try:
+            self.clock.set_tick_rate(int(self.tick_rate_var.get()))
+        except ValueError:
+            return
+        self.clock.reset_stats()
+        if self.sim_task:
+            self.sim_task.interval = self.clock.dt
+    
+    def animate_gates(self):
+        """Visual effects only - gate motion is advanced by simulation_tick"""
+        animation_changed = False
+        
+        # Occasional particles while gates are moving - 2% per frame opening, 1% closing
+        gates = self.sim.gates
+        for index in range(gates.count):
+            if gates.moving[index] and random.random() < (0.02 if gates.target[index] else 0.01):
+                self.spawn_gate_particle(gates.x[index])
+                animation_changed = True
         
         # Update particles and check if any exist
-        if self.gate_a_particles or self.gate_b_particles:
-            self.gate_a_particles = self.update_particles(self.gate_a_particles)
-            self.gate_b_particles = self.update_particles(self.gate_b_particles)
+        if self.particles.count:
+            self.particles.update()
             animation_changed = True
         
         # Only request update if something meaningful changed
         if animation_changed:
             self.request_update()
     
-    def start_reading_thread(self):
-        def read_loop():
-            while True:
-                self.read_arduino_data()
-                time.sleep(0.05)  # Read every 50ms
-        
-        thread = threading.Thread(target=read_loop, daemon=True)
-        thread.start()
-    
-    def start_animation_thread(self):
-        def animation_loop():
-            while True:
-                self.animate_gates()
-                time.sleep(0.1)  # Increased to 100ms for smoother, less frequent updates
-        
-        thread = threading.Thread(target=animation_loop, daemon=True)
-        thread.start()
-    
-    def start_sensor_update_thread(self):
-        def sensor_update_loop():
-            while True:
-                if self.connected:
-                    self.send_data()
-                time.sleep(0.1)  # Send sensor data every 100ms
-        
-        thread = threading.Thread(target=sensor_update_loop, daemon=True)
-        thread.start()
+    def start_scheduler(self):
+        """Register the periodic tasks and start pumping from the Tk main loop"""
+        self.clock.start()
+        self.sim_task = self.scheduler.every(self.clock.dt, self.simulation_tick)
+        self.scheduler.every(0.1, self.animate_gates)
+        self.scheduler.every(0.1, self.record_snapshot)  # Skipped when nothing changed
+        self.scheduler.every(self.sensor_send_interval, self.periodic_transmit)
+        self.scheduler.every(self.min_update_interval, self._perform_update)
+        self.scheduler.attach(self.root)
     
-    def start_sensor_display_update_thread(self):
-        def sensor_display_update_loop():
-            while True:
-                if self.connected:
-                    self.update_display()
-                time.sleep(0.1)  # Send sensor display data every 100ms
-        
-        thread = threading.Thread(target=sensor_display_update_loop, daemon=True)
-        thread.start()
+    def periodic_transmit(self):
+        if self.connected:
+            self.transmit_sensors(periodic=True)
     
     def on_closing(self):
+        self.scheduler.stop()
         self.disconnect_serial()
+        if self.recorder:
+            self.recorder.close()
+        if self.telemetry:
+            self.telemetry.stop()
+        self.terminal.stop_spool()
         self.root.destroy()
 
     def on_canvas_focus(self, event):
@@ -1166,89 +1135,86 @@ class AirlockGUI:
         else:
             return 1 - pow(-2 * t + 2, 3) / 2
     
-    def create_gate_particles(self, gate_x, gate_type):
-        """Create particle effects for gate movement"""
-        particles = []
-        particle_count = 1  # Minimal particles - only 1 per creation
-        
-        for _ in range(particle_count):
-            particle = {
-                'x': self.start_x + gate_x + random.uniform(-3, 3),  # Very small spread
-                'y': self.start_y + random.uniform(60, self.airlock_height - 60),
-                'vx': random.uniform(-0.3, 0.3),  # Very slow movement
-                'vy': random.uniform(-0.8, -0.2),  # Very slow movement
-                'life': 1.0,
-                'size': random.uniform(1, 1.5)  # Very small particles
-            }
-            particles.append(particle)
-        return particles
+    def spawn_gate_particle(self, gate_x):
+        """Spawn one particle at a gate; ignored when the pool is full"""
+        self.particles.spawn_random(self.sim.start_x + gate_x,
+                                    self.sim.start_y + 60,
+                                    self.sim.start_y + self.sim.airlock_height - 60)
     
-    def update_particles(self, particles):
-        """Update particle positions and remove dead particles"""
-        alive_particles = []
-        for particle in particles:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['life'] -= 0.015  # Very slow fade out
-            particle['size'] *= 0.998  # Very slow size reduction
-            
-            if particle['life'] > 0 and particle['size'] > 0.9:  # Live longer
-                alive_particles.append(particle)
-        
-        return alive_particles
-    
-    def draw_particles(self, particles):
-        """Draw particle effects"""
-        for particle in particles:
-            alpha = max(0, min(255, int(particle['life'] * 255)))  # Clamp alpha value
+    def draw_particles(self):
+        """Move the pooled oval items onto the live particles and hide the rest"""
+        pool = self.particles
+        for i, item in enumerate(self.canvas_items['particles']):
+            alpha = int(pool.life[i] * 255) if i < pool.count else 0
             if alpha > 100:  # Only draw clearly visible particles
-                # Create a simple glowing effect
-                alpha_hex = f"{alpha:02x}"
-                color = f"#{alpha_hex}{alpha_hex}00"  # Yellow particles
-                size = max(1.0, particle['size'])  # Minimum size
-                
-                # Simple particle drawing
-                x1 = particle['x'] - size
-                y1 = particle['y'] - size 
-                x2 = particle['x'] + size
-                y2 = particle['y'] + size
-                
-                self.canvas.create_oval(
-                    x1, y1, x2, y2,
-                    fill=color, outline="", tags="particles"
-                )
+                alpha = min(255, alpha)
+                size = max(1.0, pool.size[i])  # Minimum size
+                x, y = pool.x[i], pool.y[i]
+                self.set_item(item, (x - size, y - size, x + size, y + size),
+                              fill=f"#{alpha:02x}{alpha:02x}00", state='normal')  # Yellow particles
+            else:
+                self.set_item(item, state='hidden')
 
     def request_update(self, force=False):
-        """Throttled update system to prevent flickering"""
-        current_time = time.time()
-        
-        if force or (current_time - self.last_update_time) >= self.min_update_interval:
-            if not self.update_pending:
-                self.update_pending = True
-                # Schedule update on next GUI cycle
-                self.root.after(10, self._perform_update)
+        """Mark the display dirty; the render task draws at most one frame per min_update_interval"""
+        self.update_pending = True
+        if force:
+            self._perform_update()
     
     def _perform_update(self):
-        """Actually perform the update - called from GUI thread"""
+        """Render task - runs on the GUI thread, draws only when something changed"""
         if self.update_pending:
             self.update_pending = False
-            self.last_update_time = time.time()
             
             # Single unified update that minimizes canvas operations
             self._unified_update()
     
+    @traced('render', 'render')
     def _unified_update(self):
-        """Single method that handles all visual updates efficiently"""
-        # Remove only dynamic elements in one operation
-        self.canvas.delete("sensor_zones", "gates", "rover", "particles")
-        
-        # Redraw everything in the correct order
+        """Update the retained canvas items in place"""
         self.draw_sensor_zones()
+        self.draw_particles()
         self.draw_gates()
         self.draw_rover()
+        self.flush_terminal()
+        
+        # Link statistics and round-trip latency
+        tx = self.transmitter
+        stats = (f"TX {tx.frames_sent} frames / {tx.bytes_sent} B  |  "
+                 f"saved {tx.frames_saved} frames / {tx.bytes_saved} B")
+        lat = self.latency.histogram
+        if lat.count:
+            stats += (f"  |  RTT p50 {lat.percentile(50) * 1000:.1f} / p95 {lat.percentile(95) * 1000:.1f} / "
+                      f"p99 {lat.percentile(99) * 1000:.1f} / max {lat.max * 1000:.1f} ms")
+        if hasattr(self.ser, 'stats_text'):
+            stats += f"\nImpaired link - {self.ser.stats_text()}"
+        self.link_stats_label.config(text=stats)
+        
+        # Clock statistics
+        clock = self.clock
+        self.clock_stats_label.config(
+            text=f"{clock.tick_rate} Hz  |  jitter {clock.mean_jitter() * 1000:.1f} ms avg / "
+                 f"{clock.jitter_max * 1000:.1f} ms max  |  overruns {clock.overruns} "
+                 f"(+{clock.catch_up_steps} steps, {clock.dropped_steps} dropped)")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Airlock HIL simulator")
+    parser.add_argument("--layout", help="sensor layout JSON file (see sensor_layout.py)")
+    parser.add_argument("--impairment", help="link impairment settings JSON file (see link_impairment.py)")
+    parser.add_argument("--telemetry", metavar="ADDRESS",
+                        help="serve a telemetry feed on host:port or a Unix socket path (see telemetry.py)")
+    args = parser.parse_args()
+    
+    telemetry = None
+    if args.telemetry:
+        telemetry = TelemetryServer(args.telemetry)
+        print(f"Telemetry feed on {telemetry.start()}")
+    
     root = tk.Tk()
-    app = AirlockGUI(root)
+    app = AirlockGUI(root, layout=load_layout(args.layout) if args.layout else None,
+                     impairment=load_impairment(args.impairment) if args.impairment else None,
+                     telemetry=telemetry)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop() 
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Headless airlock simulation core.
+
+Holds the rover position, sensor states and gate animation of the HIL
+simulator without any Tk dependency. Time only advances through step(dt),
+so the model can run at wall-clock speed under the GUI or as fast as the
+CPU allows in batch runs. Presence and safety sensors come from a
+SensorLayout; pass layout= to model a different set of beams and spans.
+
+Rover moves are swept: every sensor between the old and new position
+fires a rising and falling SensorEdge, stamped with the interpolated time
+it was crossed, so large steps and fast drags do not skip a beam.
+"""
+
+import random
+import time
+from collections import namedtuple
+
+try:
+    from .gates import GateArray
+    from .sensor_layout import SensorElement, SensorLayout, load_layout
+    from .signals import REQUEST_NAMES, SENSOR_NAMES, initial_states
+except ImportError:
+    from gates import GateArray
+    from sensor_layout import SensorElement, SensorLayout, load_layout
+    from signals import REQUEST_NAMES, SENSOR_NAMES, initial_states
+
+
+# A sensor signal changing during a rover move; time is simulated seconds
+SensorEdge = namedtuple('SensorEdge', ['time', 'signal', 'rising'])
+
+
+def control_unit_logic(sensor_states):
+    """Gate requests computed the same way as Control_unit.ino executeLogic()"""
+    return {
+        'GATE_REQUEST_A': bool(sensor_states['PRESENCE_FRONT']),
+        'GATE_REQUEST_B': bool(sensor_states['PRESENCE_MIDDLE'])
+    }
+
+
+def always_open_policy(sensor_states):
+    """Controller that keeps both gate requests high"""
+    return {'GATE_REQUEST_A': True, 'GATE_REQUEST_B': True}
+
+
+def always_closed_policy(sensor_states):
+    """Controller that never requests a gate"""
+    return {'GATE_REQUEST_A': False, 'GATE_REQUEST_B': False}
+
+
+def random_policy(sensor_states):
+    """Controller that toggles requests at random - useful for soak tests"""
+    return {'GATE_REQUEST_A': random.random() < 0.5, 'GATE_REQUEST_B': random.random() < 0.5}
+
+
+# Controller models by name, used by the firmware emulator and scenario runs
+POLICIES = {
+    'control_unit': control_unit_logic,
+    'open': always_open_policy,
+    'closed': always_closed_policy,
+    'random': random_policy
+}
+
+
+class AirlockSimulator:
+    def __init__(self, scale=0.5, gate_animation_duration=3.0, layout=None):
+        # Airlock dimensions (scaled down for display)
+        self.scale = scale
+        self.airlock_width = 1376 * self.scale  # Total width: 408 + 560 + 408
+        self.front_zone_width = 408 * self.scale
+        self.middle_zone_width = 560 * self.scale
+        self.back_zone_width = 408 * self.scale
+        self.airlock_height = 175
+
+        # Drawing origin, kept here so positions match canvas coordinates
+        self.start_x = 100
+        self.start_y = 50
+
+        # Rover properties
+        self.rover_width = 638 * self.scale * 0.4
+        self.rover_height = 35
+        self.rover_x = 50  # Start position - outside front zone
+        self.rover_y = self.airlock_height // 2 + 50
+
+        # Sensor geometry
+        self.safety_zone_width = 60
+
+        # Gate properties - the state of every gate lives in one GateArray
+        self.gate_width = 10
+        self.gates = GateArray(('A', 'B'),
+                               (self.front_zone_width, self.front_zone_width + self.middle_zone_width),
+                               gate_animation_duration, on_event=self._on_gate_event)
+
+        # Signal names of each gate, in gate order
+        self.gate_request_names = tuple(f'GATE_REQUEST_{name}' for name in self.gates.names)
+        self.gate_moving_names = tuple(f'GATE_MOVING_{name}' for name in self.gates.names)
+        self.gate_safety_names = tuple(f'GATE_SAFETY_{name}' for name in self.gates.names)
+
+        # Sensor states sent to the controller
+        self.sensor_states = initial_states(SENSOR_NAMES)
+
+        # Beams and safety spans; GATE_MOVING_* follow the gates instead
+        self.sensor_layout = layout if layout is not None else self.default_sensor_layout()
+        for name in self.sensor_layout.signals:
+            if name in self.gate_moving_names:
+                raise ValueError(f"{name} is driven by the gates, not by a layout sensor")
+        self.sensor_hits = None  # Layout elements the rover overlapped at the last update
+        # Rover x the quiet span was found for, and SensorLayout.quiet_span() there
+        self.quiet_x = None
+        self.quiet_span = None
+
+        # Gate requests received from the controller
+        self.gate_requests = initial_states(REQUEST_NAMES)
+
+        # Simulated time in seconds, advanced only by step()
+        self.sim_time = 0.0
+        self.rover_time = 0.0  # Simulated time the rover was last moved
+
+        # Callbacks notified with (event, gate) on gate transitions
+        self.listeners = []
+        # Callbacks notified with each SensorEdge of a swept move
+        self.edge_listeners = []
+
+        self.update_sensors()
+
+    def add_listener(self, callback):
+        """Register callback(event, gate) for 'opening', 'closing', 'opened' and 'closed'"""
+        self.listeners.append(callback)
+
+    def add_edge_listener(self, callback):
+        """Register callback(edge), called once sensor_states holds the edge's new value"""
+        self.edge_listeners.append(callback)
+
+    def _emit(self, event, gate):
+        for callback in self.listeners:
+            callback(event, gate)
+
+    def _on_gate_event(self, event, index):
+        # GATE_MOVING_* follows the gate: high from the start of a move until it finishes
+        self.sensor_states[self.gate_moving_names[index]] = event in ('opening', 'closing')
+        if self.listeners:
+            self._emit(event, self.gates.names[index])
+
+    def default_sensor_layout(self):
+        """A presence beam at the centre of each zone and a safety span around each gate"""
+        front, middle, back = self.front_zone_width, self.middle_zone_width, self.back_zone_width
+        elements = [
+            SensorElement('PRESENCE_FRONT', front / 2, front / 2, 'FRONT'),
+            SensorElement('PRESENCE_MIDDLE', front + middle / 2, front + middle / 2, 'MIDDLE'),
+            SensorElement('PRESENCE_BACK', front + middle + back / 2, front + middle + back / 2, 'BACK'),
+        ]
+        half_zone = self.safety_zone_width / 2
+        for name, gate, gate_x in zip(self.gate_safety_names, self.gates.names, self.gates.x):
+            elements.append(SensorElement(name, gate_x - half_zone, gate_x + half_zone, f"Gate {gate} Safety"))
+        return SensorLayout(elements)
+
+    def move_rover(self, x, sweep=True):
+        """Move the rover to x; returns True if any sensor changed or pulsed on the way.
+
+        The move is taken to run at constant speed from rover_time to sim_time,
+        and every sensor passed fires its edges. sweep=False places the rover
+        without edges, e.g. to start a new run.
+        """
+        if self._stays_quiet(x):
+            self.rover_x = self.quiet_x = x
+            self.rover_time = self.sim_time
+            return False
+        edges = self.sweep_edges(x, self.rover_time, self.sim_time) if sweep else ()
+        for edge in edges:
+            self._apply_edge(edge)
+        self.rover_x = x
+        self.rover_time = self.sim_time
+        changed = self.update_sensors() or bool(edges)
+        self._find_quiet_span()
+        return changed
+
+    def _stays_quiet(self, x):
+        # Most moves are a few units within one quiet span: no edge, and update_sensors()
+        # would find the same hits, so the sweep and the index lookup can be skipped
+        if self.quiet_x != self.rover_x:
+            return False  # rover_x was set directly, or the span is for an earlier position
+        left = x - self.start_x - self.rover_width/2
+        left_low, left_high, right_low, right_high = self.quiet_span
+        return left_low < left < left_high and right_low < left + self.rover_width < right_high
+
+    def _find_quiet_span(self):
+        rover_left = self.rover_x - self.start_x - self.rover_width/2
+        self.quiet_span = self.sensor_layout.quiet_span(rover_left, rover_left + self.rover_width)
+        self.quiet_x = self.rover_x
+
+    def sweep_edges(self, x, start_time, end_time):
+        """SensorEdges of moving the rover from rover_x to x between the two times, in order"""
+        half = self.rover_width / 2
+        fractions = self.sensor_layout.sweep(self.rover_x - self.start_x - half, x - self.start_x - half,
+                                             self.rover_width)
+        duration = end_time - start_time
+        return [SensorEdge(start_time + duration * fraction, signal, rising)
+                for fraction, signal, rising in fractions]
+
+    def _apply_edge(self, edge):
+        self.sensor_states[edge.signal] = edge.rising
+        for callback in self.edge_listeners:
+            callback(edge)
+
+    def update_sensors(self):
+        """Recompute presence and safety sensors; returns True if any changed"""
+        # A sensor triggers if any part of the rover overlaps it (layout coordinates)
+        rover_left = self.rover_x - self.start_x - self.rover_width/2
+        hits = self.sensor_layout.hits(rover_left, rover_left + self.rover_width)
+        if hits == self.sensor_hits:
+            # Same sensors as last time. Their signals can only have changed through _apply_edge(),
+            # and the edges of a move always end at the state these hits give
+            return False
+        self.sensor_hits = hits
+
+        changed = False
+        sensor_states = self.sensor_states
+        for name, value in self.sensor_layout.signal_states(hits).items():
+            if sensor_states[name] != value:
+                sensor_states[name] = value
+                changed = True
+        return changed
+
+    def set_gate_requests(self, requests):
+        """Apply GATE_REQUEST_* values from the controller and start gate movement"""
+        for name, value in requests.items():
+            if name in self.gate_requests:
+                self.gate_requests[name] = bool(value)
+        self.process_gate_requests()
+
+    def process_gate_requests(self):
+        """Start, reverse or hold each gate according to its GATE_REQUEST (1 = open, 0 = close)"""
+        # Inline comparison rather than apply_requests(): this runs for every reply and
+        # usually changes nothing, so the no-change path makes no call and no allocation
+        requests = self.gate_requests
+        target = self.gates.target
+        index = 0
+        for name in self.gate_request_names:
+            if requests[name] != target[index]:
+                self.gates.request(index, requests[name])
+            index += 1
+
+    def step(self, dt, rover_x=None):
+        """Advance gate animations by dt seconds; returns True if the visible state changed.
+
+        With rover_x the rover moves there at constant speed during the step.
+        The gates are advanced to each sensor edge in turn before it is applied,
+        so edge listeners (a controller) act at the time the edge happened.
+        """
+        if rover_x is None:
+            self.sim_time += dt
+            return self.gates.step(dt)
+
+        end_time = self.sim_time + dt
+        quiet = self._stays_quiet(rover_x)
+        edges = () if quiet else self.sweep_edges(rover_x, self.sim_time, end_time)
+        changed = bool(edges)
+        for edge in edges:
+            dt, self.sim_time = edge.time - self.sim_time, edge.time
+            if self.gates.step(dt):
+                changed = True
+            self._apply_edge(edge)
+        dt, self.sim_time = end_time - self.sim_time, end_time
+        if self.gates.step(dt):
+            changed = True
+        self.rover_x = rover_x
+        self.rover_time = end_time
+        if quiet:
+            self.quiet_x = rover_x
+            return changed
+        changed = self.update_sensors() or changed
+        self._find_quiet_span()
+        return changed
+
+
+def run_cycles(count, dt=0.1, rover_speed=200.0, policy=control_unit_logic, sim=None):
+    """Drive the rover through the airlock count times with an in-process controller.
+
+    Like the GUI, the rover moves freely (no gate collisions). A cycle ends once
+    the rover has left the airlock and both gates are closed again. The
+    controller also runs at every sensor edge within a step, so a large dt
+    still shows it each beam the rover crosses. Returns the simulator used.
+    """
+    if sim is None:
+        sim = AirlockSimulator()
+    exit_x = sim.start_x + sim.airlock_width + sim.rover_width
+
+    def on_edge(edge):
+        sim.set_gate_requests(policy(sim.sensor_states))
+
+    sim.add_edge_listener(on_edge)
+    try:
+        for _ in range(count):
+            sim.move_rover(50, sweep=False)
+            sim.set_gate_requests(policy(sim.sensor_states))
+            # Drive through, then let both gates settle closed again
+            while sim.rover_x < exit_x or sim.gates.any_moving() or any(sim.gates.open):
+                sim.step(dt, sim.rover_x + rover_speed * dt if sim.rover_x < exit_x else None)
+                sim.set_gate_requests(policy(sim.sensor_states))
+    finally:
+        sim.edge_listeners.remove(on_edge)
+    return sim
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run airlock cycles headlessly")
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--dt", type=float, default=0.1, help="simulation step in seconds")
+    parser.add_argument("--layout", help="sensor layout JSON file (see sensor_layout.py)")
+    args = parser.parse_args()
+
+    layout = load_layout(args.layout) if args.layout else None
+
+    start = time.perf_counter()
+    sim = run_cycles(args.cycles, dt=args.dt, sim=AirlockSimulator(layout=layout))
+    elapsed = time.perf_counter() - start
+    print(f"{args.cycles} cycles, {sim.sim_time:.1f} s simulated in {elapsed:.3f} s "
+          f"({args.cycles / elapsed:.0f} cycles/s, {sim.sim_time / elapsed:.0f}x real time)")
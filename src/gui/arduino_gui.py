@@ -2,12 +2,23 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import serial
 import serial.tools.list_ports
-import threading
-import time
 import json
 
+try:
+    from .link_impairment import ImpairmentDialog, default_impairment, load_impairment, wrap_serial
+    from .protocol import BinaryFrame, REQUEST_CODEC, SENSOR_CODEC
+    from .scheduler import Scheduler
+    from .serial_link import SerialReader, open_serial_async
+    from .signals import REQUEST_NAMES, SENSOR_NAMES, initial_states
+except ImportError:
+    from link_impairment import ImpairmentDialog, default_impairment, load_impairment, wrap_serial
+    from protocol import BinaryFrame, REQUEST_CODEC, SENSOR_CODEC
+    from scheduler import Scheduler
+    from serial_link import SerialReader, open_serial_async
+    from signals import REQUEST_NAMES, SENSOR_NAMES, initial_states
+
 class ArduinoGUI:
-    def __init__(self, root):
+    def __init__(self, root, impairment=None):
         self.root = root
         self.root.title("Arduino Control Panel")
         self.root.geometry("800x600")
@@ -15,30 +26,28 @@ class ArduinoGUI:
         
         # Serial connection
         self.ser = None
+        self.reader = None
         self.connected = False
+        self.connecting = False  # Port is being opened on the connect thread
         
-        # Data storage
-        self.output_states = {
-            'PRESENCE_FRONT': False,
-            'PRESENCE_MIDDLE': False,
-            'PRESENCE_BACK': False,
-            'GATE_SAFETY_A': False,
-            'GATE_SAFETY_B': False,
-            'GATE_MOVING_A': False,
-            'GATE_MOVING_B': False
-        }
+        # Optional degraded link for testing; applied to each new connection while enabled
+        self.impairment = impairment or default_impairment()
+        self.impairment_dialog = None
         
-        self.input_states = {
-            'GATE_REQUEST_A': False,
-            'GATE_REQUEST_B': False
-        }
+        # Data storage
+        # Both come from the signal schema in signals.py
+        self.output_states = initial_states(SENSOR_NAMES)
+        self.input_states = initial_states(REQUEST_NAMES)
         
         # GUI Variables
         self.output_vars = {}
         self.input_labels = {}
         
+        # Serial messages are posted here and handled on the Tk thread
+        self.scheduler = Scheduler()
+        
         self.setup_gui()
-        self.start_reading_thread()
+        self.scheduler.attach(self.root)
         
     def setup_gui(self):
         # Main title
@@ -69,6 +78,14 @@ class ArduinoGUI:
                                    bg='#2196F3', fg='white', font=('Arial', 10))
         self.refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        # Unticked: hold DTR low so a running board is not reset and reconnects at once
+        self.reset_on_connect_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(conn_frame, text="Reset on connect", variable=self.reset_on_connect_var,
+                      bg='#2b2b2b', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(conn_frame, text="Link Impairment...", command=self.open_impairment_dialog,
+                 bg='#2196F3', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        
         # Status label
         self.status_label = tk.Label(self.root, text="Disconnected", 
                                    font=('Arial', 12), fg='red', bg='#2b2b2b')
@@ -147,6 +164,8 @@ class ArduinoGUI:
         self.port_combo['values'] = self.get_serial_ports()
     
     def toggle_connection(self):
+        if self.connecting:
+            return
         if not self.connected:
             self.connect_serial()
         else:
@@ -158,17 +177,44 @@ class ArduinoGUI:
             messagebox.showerror("Error", "Please select a COM port")
             return
         
-        try:
-            self.ser = serial.Serial(port, 115200, timeout=1)
-            time.sleep(2)  # Wait for Arduino to initialize
-            self.connected = True
-            self.connect_btn.config(text="Disconnect", bg='#f44336')
-            self.status_label.config(text=f"Connected to {port}", fg='green')
-            messagebox.showinfo("Success", f"Connected to {port}")
-        except serial.SerialException as e:
-            messagebox.showerror("Error", f"Failed to connect: {str(e)}")
+        # Open and wait for the ready banner off the Tk thread
+        self.connecting = True
+        self.connect_btn.config(text="Connecting...", state=tk.DISABLED)
+        self.status_label.config(text=f"Connecting to {port}...", fg='orange')
+        open_serial_async(port,
+                          lambda ser, ready, elapsed: self.scheduler.post(self.on_serial_opened, port, ser),
+                          lambda error: self.scheduler.post(self.on_connect_failed, error),
+                          reset=self.reset_on_connect_var.get())
+    
+    def on_serial_opened(self, port, ser):
+        self.connecting = False
+        self.ser = wrap_serial(ser, self.impairment)
+        self.connected = True
+        self.connect_btn.config(text="Disconnect", bg='#f44336', state=tk.NORMAL)
+        impaired = " (impaired link)" if self.ser is not ser else ""
+        self.status_label.config(text=f"Connected to {port}{impaired}", fg='green')
+        self.reader = SerialReader(self.ser,
+                                   lambda line: self.scheduler.post(self.handle_received_line, line),
+                                   lambda error: self.scheduler.post(self.on_serial_error, error))
+        self.reader.start()
+        messagebox.showinfo("Success", f"Connected to {port}")
+    
+    def on_connect_failed(self, error):
+        self.connecting = False
+        self.connect_btn.config(text="Connect", bg='#4CAF50', state=tk.NORMAL)
+        self.status_label.config(text="Disconnected", fg='red')
+        messagebox.showerror("Error", f"Failed to connect: {str(error)}")
+    
+    def open_impairment_dialog(self):
+        if self.impairment_dialog and self.impairment_dialog.window.winfo_exists():
+            self.impairment_dialog.window.lift()
+            return
+        self.impairment_dialog = ImpairmentDialog(self.root, self.impairment, bg='#2b2b2b')
     
     def disconnect_serial(self):
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
         if self.ser:
             self.ser.close()
             self.ser = None
@@ -206,12 +252,7 @@ class ArduinoGUI:
             return
         
         # Format data as expected by Arduino: <VAR1:VALUE,VAR2:VALUE,...>
-        data_parts = []
-        for name, state in self.output_states.items():
-            value = "1" if state else "0"
-            data_parts.append(f"{name}:{value}")
-        
-        message = "<" + ",".join(data_parts) + ">"
+        message = SENSOR_CODEC.encode_text(SENSOR_CODEC.pack(self.output_states))
         
         try:
             self.ser.write(message.encode())
@@ -219,28 +260,23 @@ class ArduinoGUI:
         except serial.SerialException as e:
             messagebox.showerror("Error", f"Failed to send data: {str(e)}")
     
-    def read_arduino_data(self):
-        if not self.connected or not self.ser:
-            return
-        
-        try:
-            if self.ser.in_waiting > 0:
-                line = self.ser.readline().decode().strip()
-                if line.startswith('<') and line.endswith('>'):
-                    # Parse the received data
-                    data = line[1:-1]  # Remove < and >
-                    pairs = data.split(',')
-                    
-                    for pair in pairs:
-                        if ':' in pair:
-                            name, value = pair.split(':')
-                            if name in self.input_states:
-                                self.input_states[name] = value == '1'
-                                self.update_input_display(name, value == '1')
-                    
-                    print(f"Received: {line}")
-        except serial.SerialException:
-            pass
+    def handle_received_line(self, line):
+        """Handle one complete message from the serial reader"""
+        if isinstance(line, BinaryFrame):
+            requests = REQUEST_CODEC.unpack(line.bits)
+        elif line.startswith('<') and line.endswith('>'):
+            requests, _ = REQUEST_CODEC.decode_text(line)
+        else:
+            return  # Probe replies and bridge chatter carry no requests
+        for name, state in requests.items():
+            self.input_states[name] = state
+            self.update_input_display(name, state)
+    
+    def on_serial_error(self, error):
+        """Posted by the reader thread when the port fails"""
+        print(f"Serial read failed: {error}")
+        if self.connected:
+            self.disconnect_serial()
     
     def update_input_display(self, name, state):
         if name in self.input_labels:
@@ -250,21 +286,19 @@ class ArduinoGUI:
             else:
                 label.config(text=f"{name}: OFF", bg='#f44336')
     
-    def start_reading_thread(self):
-        def read_loop():
-            while True:
-                self.read_arduino_data()
-                time.sleep(0.1)  # Read every 100ms
-        
-        thread = threading.Thread(target=read_loop, daemon=True)
-        thread.start()
-    
     def on_closing(self):
+        self.scheduler.stop()
         self.disconnect_serial()
         self.root.destroy()
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Arduino control panel")
+    parser.add_argument("--impairment", help="link impairment settings JSON file (see link_impairment.py)")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = ArduinoGUI(root)
+    app = ArduinoGUI(root, impairment=load_impairment(args.impairment) if args.impairment else None)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop() 
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Randomized trajectory fuzzing of the airlock control logic.
+
+Each case is a scenario (see scenarios.py) generated from a seed: random
+rover keyframes and serial link delays, run against the control unit model
+with the simulator's sensors and gate state machine. Every case checks the
+safety invariants below. Cases are spread over a multiprocessing pool. A
+failing case is shrunk - keyframes dropped, delays zeroed, numbers rounded -
+while it still breaks the same invariant. It is then written out as a
+scenario file, so scenarios.py can replay it.
+
+    python fuzz.py --cases 100000                  # all cores, seeds 0..99999
+    python fuzz.py --cases 0 --time-limit 28800    # overnight
+    python fuzz.py --reproduce 1234                # rerun, shrink and print one seed
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+try:
+    from .airlock_sim import POLICIES
+    from .scenarios import Scenario, run_scenario
+except ImportError:
+    from airlock_sim import POLICIES
+    from scenarios import Scenario, run_scenario
+
+# Checked at every instant of every case
+INVARIANTS = (
+    {"never_open_together": ["A", "B"]},
+    {"gate": "A", "never_closes_while": "GATE_SAFETY_A"},
+    {"gate": "B", "never_closes_while": "GATE_SAFETY_B"},
+)
+
+ROVER_RANGE = (0.0, 950.0)  # Outside the front to past the back of the airlock
+SETTLE_TIME = 5.0  # Run on after the last keyframe so gates can finish moving
+BATCH_SIZE = 200  # Cases per pool task
+
+
+class FuzzOptions:
+    def __init__(self, controller='control_unit', max_keyframes=6, max_delay=0.3, dt=0.05):
+        self.controller = controller
+        self.max_keyframes = max_keyframes
+        self.max_delay = max_delay  # Seconds, each direction of the link
+        self.dt = dt
+
+
+def generate_case(seed, options):
+    """Scenario data for one seed; values are rounded so the saved JSON is the case that ran"""
+    rng = random.Random(seed)
+    t = 0.0
+    keyframes = [[0.0, round(rng.uniform(*ROVER_RANGE), 1)]]
+    for _ in range(rng.randint(1, options.max_keyframes)):
+        t = round(t + rng.uniform(0.1, 6.0), 2)
+        # Sometimes hold still, which is when gates finish moving onto the rover
+        x = keyframes[-1][1] if rng.random() < 0.2 else round(rng.uniform(*ROVER_RANGE), 1)
+        keyframes.append([t, x])
+    delays = [round(rng.uniform(0.0, options.max_delay), 3) if rng.random() < 0.7 else 0.0
+              for _ in range(2)]
+    return {
+        "name": f"fuzz seed {seed}",
+        "fuzz_seed": seed,
+        "duration": round(t + SETTLE_TIME, 2),
+        "dt": options.dt,
+        "controller": options.controller,
+        "seed": seed,
+        "link": {"sensor_delay": delays[0], "request_delay": delays[1]},
+        "rover": keyframes,
+        "expect": [dict(invariant) for invariant in INVARIANTS],
+    }
+
+
+def failed_invariants(case):
+    return run_scenario(Scenario(case)).failed
+
+
+def _fuzz_batch(job):
+    """Pool task: run a range of seeds; returns (cases run, failure counts, first failing seed per invariant)"""
+    first_seed, count, options = job
+    counts = {}
+    examples = {}
+    for seed in range(first_seed, first_seed + count):
+        for text in failed_invariants(generate_case(seed, options)):
+            counts[text] = counts.get(text, 0) + 1
+            examples.setdefault(text, seed)
+    return count, counts, examples
+
+
+def _candidates(case):
+    """Simpler variants of a case, most aggressive first"""
+    keyframes = case['rover']
+    last_time = keyframes[-1][0]
+    if case['duration'] > last_time + SETTLE_TIME:
+        yield dict(case, duration=round(last_time + SETTLE_TIME, 2))
+    for i in range(len(keyframes) - 1, 0, -1):
+        shorter = keyframes[:i] + keyframes[i + 1:]
+        yield dict(case, rover=shorter, duration=round(shorter[-1][0] + SETTLE_TIME, 2))
+    for name in ('sensor_delay', 'request_delay'):
+        if case['link'][name]:
+            yield dict(case, link=dict(case['link'], **{name: 0.0}))
+    rounded = [[float(round(t)), float(round(x))] for t, x in keyframes]
+    if rounded != keyframes and all(b[0] > a[0] for a, b in zip(rounded, rounded[1:])):
+        yield dict(case, rover=rounded)
+    for i in range(1, len(keyframes)):
+        # Pull a keyframe onto its predecessor's position - removes a leg of the trip
+        if keyframes[i][1] != keyframes[i - 1][1]:
+            yield dict(case, rover=keyframes[:i] + [[keyframes[i][0], keyframes[i - 1][1]]] + keyframes[i + 1:])
+
+
+def shrink(case, invariant_text, max_runs=500):
+    """Greedily simplify a case while it still fails the invariant"""
+    runs = 0
+    improved = True
+    while improved and runs < max_runs:
+        improved = False
+        for candidate in _candidates(case):
+            runs += 1
+            if invariant_text in failed_invariants(candidate):
+                case = candidate
+                improved = True
+                break
+            if runs >= max_runs:
+                break
+    return dict(case, name=f"{case['name']} (shrunk)")
+
+
+def write_case(case, directory, invariant_text):
+    os.makedirs(directory, exist_ok=True)
+    invariant = json.loads(invariant_text)
+    tag = '_'.join(str(value) if not isinstance(value, list) else ''.join(value)
+                   for value in invariant.values()).lower()
+    path = os.path.join(directory, f"seed{case['fuzz_seed']}_{tag}.json")
+    # Keep only the broken invariant so the file reads as one regression test
+    saved = dict(case, expect=[invariant])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(saved, f, indent=2)
+    return path
+
+
+def fuzz(cases, options, first_seed=0, jobs=None, time_limit=None, progress=None):
+    """Run seeds first_seed.. over a process pool.
+
+    cases=0 runs until time_limit. Returns (cases run, failure counts per
+    invariant, first failing seed per invariant). progress(run, counts, elapsed)
+    is called after each finished batch.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    start = time.monotonic()
+    total = 0
+    counts = {}
+    examples = {}
+    next_seed = first_seed
+    end_seed = first_seed + cases if cases else None
+
+    def more():
+        if end_seed is not None and next_seed >= end_seed:
+            return False
+        return time_limit is None or time.monotonic() - start < time_limit
+
+    with multiprocessing.Pool(jobs) as pool:
+        # Keep a few batches in flight per worker rather than queueing every seed up front
+        pending = []
+        while pending or more():
+            while more() and len(pending) < jobs * 2:
+                count = BATCH_SIZE if end_seed is None else min(BATCH_SIZE, end_seed - next_seed)
+                pending.append(pool.apply_async(_fuzz_batch, ((next_seed, count, options),)))
+                next_seed += count
+            ran, batch_counts, batch_examples = pending.pop(0).get()
+            total += ran
+            for text, count in batch_counts.items():
+                counts[text] = counts.get(text, 0) + count
+            for text, seed in batch_examples.items():
+                examples[text] = min(seed, examples.get(text, seed))
+            if progress:
+                progress(total, counts, time.monotonic() - start)
+    return total, counts, examples
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fuzz the airlock control logic with random trajectories")
+    parser.add_argument("--cases", type=int, default=10000, help="number of seeds to run (0 = until --time-limit)")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--time-limit", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--controller", choices=sorted(POLICIES), default='control_unit')
+    parser.add_argument("--max-keyframes", type=int, default=6)
+    parser.add_argument("--max-delay", type=float, default=0.3, help="largest link delay each way, seconds")
+    parser.add_argument("--dt", type=float, default=0.05)
+    parser.add_argument("--out", default="fuzz_failures", help="directory for shrunk failing cases")
+    parser.add_argument("--reproduce", type=int, metavar="SEED", help="run, shrink and print a single seed")
+    args = parser.parse_args()
+
+    if args.cases == 0 and args.time_limit is None:
+        parser.error("--cases 0 needs a --time-limit")
+    options = FuzzOptions(args.controller, args.max_keyframes, args.max_delay, args.dt)
+
+    if args.reproduce is not None:
+        case = generate_case(args.reproduce, options)
+        result = run_scenario(Scenario(case))
+        print(json.dumps(case))
+        for message in result.failures or ["no invariant violated"]:
+            print(f"    {message}")
+        for text in result.failed:
+            print(f"shrunk case: {write_case(shrink(case, text), args.out, text)}")
+        sys.exit(1 if result.failed else 0)
+
+    last_report = [0.0]
+
+    def report(run, counts, elapsed):
+        if elapsed - last_report[0] >= 10.0:
+            last_report[0] = elapsed
+            print(f"{run} cases, {run / elapsed:.0f}/s, {sum(counts.values())} violations")
+
+    total, counts, examples = fuzz(args.cases, options, args.seed, args.jobs, args.time_limit, report)
+    print(f"{total} cases run")
+    for text, count in sorted(counts.items()):
+        seed = examples[text]
+        path = write_case(shrink(generate_case(seed, options), text), args.out, text)
+        print(f"{count:10d} x {text}\n{'':13s}first seed {seed}, shrunk case {path}")
+    sys.exit(1 if counts else 0)
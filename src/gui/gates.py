@@ -0,0 +1,110 @@
+"""
+Gate state machine for any number of gates.
+
+Gate state is stored struct-of-arrays style, one list per field, indexed
+by gate. apply_requests() and step() run the same code for every gate, so
+an airlock with four gates is the same loop as one with two, and a tick
+with no gate moving returns at once. Plain lists are used rather than
+array columns: with a handful of gates, indexing cost dominates and lists
+avoid boxing a new float or int on every read.
+
+A gate is either at rest (open or closed) or moving towards its target.
+A request for the other direction while moving reverses the gate from its
+current position; elapsed is kept as the time a full move would have
+taken to reach that position.
+"""
+
+
+class GateArray:
+    def __init__(self, names, positions, duration=3.0, on_event=None):
+        self.names = tuple(names)  # Gate labels, e.g. ('A', 'B')
+        self.count = len(self.names)
+        self.duration = duration  # Seconds for a full open or close
+        self.on_event = on_event  # Called with (event, index) on transitions
+
+        n = self.count
+        self.x = [float(x) for x in positions]  # Position along the airlock
+        self.progress = [0.0] * n  # 0.0 closed .. 1.0 open
+        self.elapsed = [0.0] * n  # Time into the current move
+        self.target = [False] * n  # Direction last requested, True = open; equals open at rest
+        self.moving = [False] * n
+        self.open = [False] * n  # Rest state once the move finishes
+        self.moving_count = 0
+
+    def request(self, index, want_open):
+        """Apply a request to one gate; starts or reverses a move if needed"""
+        want_open = bool(want_open)
+        if self.target[index] == want_open:
+            return
+        # Start moving, or reverse from the current position
+        if not self.moving[index]:
+            self.moving[index] = True
+            self.moving_count += 1
+        self.target[index] = want_open
+        progress = self.progress[index]
+        self.elapsed[index] = (progress if want_open else 1.0 - progress) * self.duration
+        if self.on_event:
+            self.on_event('opening' if want_open else 'closing', index)
+
+    def apply_requests(self, requests):
+        """requests: one bool (or 0/1) per gate, in gate order"""
+        target = self.target
+        index = 0
+        for want_open in requests:
+            # Most calls change nothing - one list read per gate, no call on that path
+            if target[index] != want_open:
+                self.request(index, want_open)
+            index += 1
+
+    def step(self, dt):
+        """Advance every moving gate by dt seconds; returns True if the visible state changed"""
+        if not self.moving_count:
+            return False
+        changed = False
+        duration = self.duration
+        progress, elapsed, target, moving = self.progress, self.elapsed, self.target, self.moving
+        for index in range(self.count):
+            if not moving[index]:
+                continue
+            time_in_move = elapsed[index] + dt
+            elapsed[index] = time_in_move
+            fraction = time_in_move / duration
+            if fraction < 1.0:
+                new_progress = fraction if target[index] else 1.0 - fraction
+                # Only mark as changed if progress actually changed significantly
+                # (comparisons instead of abs() - this loop runs every tick for every gate)
+                delta = new_progress - progress[index]
+                if delta > 0.02 or delta < -0.02:
+                    changed = True
+                progress[index] = new_progress
+                continue
+
+            self.open[index] = target[index]
+            progress[index] = 1.0 if target[index] else 0.0
+            moving[index] = False
+            self.moving_count -= 1
+            elapsed[index] = 0.0
+            changed = True
+            if self.on_event:
+                self.on_event('opened' if target[index] else 'closed', index)
+        return changed
+
+    def restore(self, index, progress, moving, target):
+        """Set one gate's state directly, e.g. from a recorded snapshot"""
+        target = bool(target)
+        moving = bool(moving)
+        self.moving_count += moving - self.moving[index]
+        self.progress[index] = progress
+        self.moving[index] = moving
+        self.open[index] = progress >= 1.0
+        self.target[index] = target if moving else self.open[index]
+        self.elapsed[index] = (progress if target else 1.0 - progress) * self.duration if moving else 0.0
+
+    def any_moving(self):
+        return self.moving_count > 0
+
+    def state(self, index):
+        """'OPENING', 'CLOSING', 'OPEN' or 'CLOSED'"""
+        if self.moving[index]:
+            return 'OPENING' if self.target[index] else 'CLOSING'
+        return 'OPEN' if self.open[index] else 'CLOSED'
@@ -0,0 +1,275 @@
+"""
+Software stand-in for the HIL_ESP32 bridge firmware.
+
+Reproduces recvWithStartEndMarkers(), executeLogic() and replyToPython()
+from src/firmware/hil_esp32/HIL_ESP32.ino behind a Linux pseudo-terminal,
+so AirlockGUI.connect_serial can open it like a real port. The control unit
+wired to the GPIO pins is modelled by a pluggable gate-request policy.
+
+A pty has no DTR line, so opening the port stands in for the auto-reset
+pulse. pyserial flushes the input queue on open(), which packet mode
+reports on the master side. The emulator then restarts like the board
+after a reset, and prints the ready banner again.
+"""
+
+import fcntl
+import os
+import pty
+import select
+import struct
+import termios
+import threading
+import tty
+
+try:
+    from .airlock_sim import POLICIES, control_unit_logic
+    from .protocol import (BINARY_SYNC, PROTOCOL_PROBE, READY_BANNER, REQUEST_CODEC, SENSOR_CODEC,
+                           decode_binary_frame, encode_binary_frame)
+    from .signals import SENSOR_NAMES, SIGNALS, initial_states
+except ImportError:
+    from airlock_sim import POLICIES, control_unit_logic
+    from protocol import (BINARY_SYNC, PROTOCOL_PROBE, READY_BANNER, REQUEST_CODEC, SENSOR_CODEC,
+                          decode_binary_frame, encode_binary_frame)
+    from signals import SENSOR_NAMES, SIGNALS, initial_states
+
+# Same limits as the firmware buffers
+NUM_CHARS = 256
+VAR_NAME_LEN = 32
+
+# Names handled by the sensorField() switch in executeLogic()
+WRITABLE_PINS = frozenset(SENSOR_NAMES)
+
+
+class HILEmulator:
+    def __init__(self, policy=control_unit_logic, banner=True):
+        # Controller model: policy(io_pins) -> {'GATE_REQUEST_A': bool, 'GATE_REQUEST_B': bool}
+        self.policy = policy
+        self.banner = banner
+
+        # Raw pty pair; the slave path is what the GUI opens
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        tty.setraw(self.master_fd)
+        # Packet mode: reads start with a status byte, which reports flushes of the slave side
+        fcntl.ioctl(self.master_fd, termios.TIOCPKT, struct.pack('i', 1))
+        self.port = os.ttyname(self.slave_fd)
+
+        # Mirrors the IOpins struct
+        self.io_pins = initial_states(signal.name for signal in SIGNALS)
+
+        # recvWithStartEndMarkers() state
+        self.received_chars = bytearray()
+        self.recv_in_progress = False
+        self.new_data = False
+        self._pending = b""
+
+        # Binary frame state (SYNC followed by seq, bits, crc)
+        self.binary_chars = bytearray()
+        self.binary_in_progress = False
+        self.new_binary_data = False
+
+        # Request edges are reported unsolicited once the PC has sent a frame
+        self.link_active = False
+        self.last_frame_binary = False
+        self.last_seq = 0
+        self.last_text_seq = None  # SEQ tag of the last text frame, echoed in text replies
+
+        # Counters for soak tests
+        self.frames_received = 0
+        self.replies_sent = 0
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Run the firmware loop in a background thread; returns the port path"""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(self):
+        """Equivalent of setup() followed by loop() until stopped"""
+        self.setup()
+
+        while self.running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if readable:
+                try:
+                    packet = os.read(self.master_fd, 4097)
+                except OSError:
+                    break
+                if packet[0] == termios.TIOCPKT_DATA:
+                    self._pending += packet[1:]
+                elif packet[0] & termios.TIOCPKT_FLUSHREAD:
+                    self.setup()  # The port was (re)opened - the board would have been reset
+            # One pass of loop() per received frame, like the firmware
+            while True:
+                self.recv_with_start_end_markers()
+                if not (self.new_data or self.new_binary_data):
+                    break
+                self.execute_logic()
+                self.process_pins()
+            self.process_pins()
+
+    def setup(self):
+        """Start over like the firmware after a reset: empty buffers, idle link, banner"""
+        self.received_chars = bytearray()
+        self.recv_in_progress = False
+        self.new_data = False
+        self._pending = b""
+        self.binary_chars = bytearray()
+        self.binary_in_progress = False
+        self.new_binary_data = False
+        self.link_active = False
+        self.last_frame_binary = False
+        self.last_text_seq = None
+        if self.banner:
+            self.write(READY_BANNER.encode() + b"\r\n")
+
+    def write(self, data):
+        try:
+            os.write(self.master_fd, data)
+        except OSError:
+            pass
+
+    def recv_with_start_end_markers(self):
+        """Consume pending bytes until one complete text or binary frame is buffered"""
+        i = 0
+        while i < len(self._pending) and not (self.new_data or self.new_binary_data):
+            rc = self._pending[i]
+            i += 1
+            if self.binary_in_progress:
+                # Payload bytes may equal SYNC, so never resync mid-frame
+                self.binary_chars.append(rc)
+                if len(self.binary_chars) == 4:
+                    self.binary_in_progress = False
+                    self.new_binary_data = True
+            elif rc == BINARY_SYNC:
+                # Binary frame start - also abandons any partial text frame
+                self.recv_in_progress = False
+                self.binary_in_progress = True
+                self.binary_chars = bytearray((rc,))
+            elif self.recv_in_progress:
+                if rc != ord('>'):
+                    # Clamp instead of overrunning receivedChars like the sketch can
+                    if len(self.received_chars) < NUM_CHARS - 1:
+                        self.received_chars.append(rc)
+                else:
+                    self.recv_in_progress = False
+                    self.new_data = True
+            elif rc == ord('<'):
+                self.recv_in_progress = True
+                self.received_chars = bytearray()
+        self._pending = self._pending[i:]
+
+    def execute_logic(self):
+        """Apply the buffered frame to the pins, then reply in the same format"""
+        if self.new_binary_data:
+            frame = decode_binary_frame(self.binary_chars)
+            if frame is not None:
+                self.io_pins.update(SENSOR_CODEC.unpack(frame.bits))
+                self.frames_received += 1
+                self.link_active = True
+                self.last_frame_binary = True
+                self.last_seq = frame.seq
+                self.reply_binary(frame.seq)
+            self.new_binary_data = False
+
+        if not self.new_data:
+            return
+
+        chars = self.received_chars.decode('ascii', errors='replace')
+        if chars == PROTOCOL_PROBE[1:-1]:
+            # Capability probe - acknowledge binary support
+            self.write(PROTOCOL_PROBE.encode() + b"\r\n")
+            self.new_data = False
+            return
+
+        # Parse NAME:VALUE pairs character by character
+        self.last_text_seq = None
+        length = len(chars)
+        i = 0
+        while i < length and chars[i] != '>':
+            # Parse char by char until we hit ':'
+            start = i
+            while i < length and chars[i] != ':' and i - start < VAR_NAME_LEN - 1:
+                i += 1
+            var_name = chars[start:i]
+
+            if i < length and chars[i] == ':':
+                i += 1
+                if var_name == 'SEQ':
+                    # Sequence tag - multi-digit, echoed back in the reply
+                    seq = 0
+                    while i < length and chars[i].isdigit():
+                        seq = seq * 10 + int(chars[i])
+                        i += 1
+                    self.last_text_seq = seq
+                    i += 1  # Skip ','
+                    continue
+                var_value = i < length and chars[i] == '1'
+                if var_name in WRITABLE_PINS:
+                    self.io_pins[var_name] = var_value
+                i += 2  # Skip value and ','
+
+        self.frames_received += 1
+        self.link_active = True
+        self.last_frame_binary = False
+        self.reply_to_python()
+        self.new_data = False
+
+    def process_pins(self):
+        """Sample the controller's request lines and report any edge"""
+        requests = self.policy(self.io_pins)
+        request_a = bool(requests['GATE_REQUEST_A'])
+        request_b = bool(requests['GATE_REQUEST_B'])
+        changed = (request_a != self.io_pins['GATE_REQUEST_A'] or
+                   request_b != self.io_pins['GATE_REQUEST_B'])
+        self.io_pins['GATE_REQUEST_A'] = request_a
+        self.io_pins['GATE_REQUEST_B'] = request_b
+
+        if changed and self.link_active:
+            if self.last_frame_binary:
+                self.reply_binary(self.last_seq)
+            else:
+                self.reply_to_python()
+
+    def reply_to_python(self):
+        reply = REQUEST_CODEC.encode_text(REQUEST_CODEC.pack(self.io_pins), self.last_text_seq)
+        self.write(reply.encode() + b"\r\n")
+        self.replies_sent += 1
+
+    def reply_binary(self, seq):
+        self.write(encode_binary_frame(seq, REQUEST_CODEC.pack(self.io_pins)))
+        self.replies_sent += 1
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Emulate the HIL_ESP32 bridge on a pseudo-terminal")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default='control_unit',
+                        help="gate request policy of the emulated control unit")
+    args = parser.parse_args()
+
+    emulator = HILEmulator(policy=POLICIES[args.policy])
+    print(f"HIL emulator listening on {emulator.start()} (policy: {args.policy})")
+    try:
+        while True:
+            time.sleep(1)
+            print(f"frames received: {emulator.frames_received}, replies sent: {emulator.replies_sent}")
+    except KeyboardInterrupt:
+        emulator.stop()
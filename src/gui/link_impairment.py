@@ -0,0 +1,548 @@
+"""
+Serial link impairment for testing at the edge of the link budget.
+
+ImpairedSerial wraps an open serial port and degrades it in each direction
+independently. It can add:
+
+    latency         fixed one-way delay
+    jitter          extra random delay: uniform 0..jitter, |normal| with
+                    sigma = jitter, or exponential with mean = jitter
+    baudrate        byte-rate cap at 10 bits per byte (8N1); frames queue
+                    behind each other on the wire like on a real UART
+    drop_rate       probability that a whole frame is lost
+    bit_error_rate  probability that each bit is flipped
+
+Frames are never reordered. Outgoing frames are the GUIs' write() calls.
+Incoming bytes are cut at frame boundaries (text frame end, text line end,
+four bytes from a binary SYNC), so a drop removes one frame, not an
+arbitrary chunk. Every random decision comes from a seeded generator per
+direction. The same seed and traffic therefore give the same drops and
+flips, whatever the thread timing. Settings are read on every frame, so
+changing them on a live connection takes effect at once.
+
+Settings files are JSON. Keys at the top level apply to both directions;
+"to_bridge" and "from_bridge" override them per direction:
+
+    {"seed": 1, "latency": 0.02, "jitter": 0.005, "baudrate": 115200,
+     "from_bridge": {"drop_rate": 0.05}}
+
+    python link_impairment.py --loopback settings.json   # check on a loop:// port
+"""
+
+import json
+import math
+import random
+import threading
+import time
+
+import serial
+
+try:
+    from .protocol import BINARY_FRAME_LENGTH, BINARY_SYNC
+except ImportError:
+    from protocol import BINARY_FRAME_LENGTH, BINARY_SYNC
+
+JITTER_DISTRIBUTIONS = ('uniform', 'normal', 'exponential')
+BITS_PER_BYTE = 10  # Start, 8 data and stop bit
+
+
+class ImpairmentSettings:
+    """Impairment of one direction of the link; all zero is a perfect link"""
+
+    FIELDS = ('latency', 'jitter', 'distribution', 'baudrate', 'drop_rate', 'bit_error_rate')
+
+    def __init__(self, latency=0.0, jitter=0.0, distribution='uniform', baudrate=0,
+                 drop_rate=0.0, bit_error_rate=0.0):
+        self.latency = latency  # Seconds
+        self.jitter = jitter  # Seconds, see JITTER_DISTRIBUTIONS
+        self.distribution = distribution
+        self.baudrate = baudrate  # 0 = no rate limit
+        self.drop_rate = drop_rate  # Per frame
+        self.bit_error_rate = bit_error_rate  # Per bit
+        self.validate()
+
+    def validate(self):
+        if self.distribution not in JITTER_DISTRIBUTIONS:
+            raise ValueError(f"unknown jitter distribution {self.distribution!r}")
+        if self.latency < 0 or self.jitter < 0 or self.baudrate < 0:
+            raise ValueError("latency, jitter and baudrate must not be negative")
+        for name in ('drop_rate', 'bit_error_rate'):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+    def to_json(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class LinkImpairment:
+    """Settings for both directions plus the seed of their random generators"""
+
+    def __init__(self, to_bridge=None, from_bridge=None, seed=0, enabled=True):
+        self.to_bridge = to_bridge or ImpairmentSettings()
+        self.from_bridge = from_bridge or ImpairmentSettings()
+        self.seed = seed
+        self.enabled = enabled  # GUIs only wrap new connections while enabled
+
+    def to_json(self):
+        return {'seed': self.seed, 'enabled': self.enabled,
+                'to_bridge': self.to_bridge.to_json(), 'from_bridge': self.from_bridge.to_json()}
+
+    @classmethod
+    def from_json(cls, data):
+        shared = {name: data[name] for name in ImpairmentSettings.FIELDS if name in data}
+        directions = [ImpairmentSettings(**dict(shared, **data.get(key, {})))
+                      for key in ('to_bridge', 'from_bridge')]
+        return cls(directions[0], directions[1], data.get('seed', 0), data.get('enabled', True))
+
+
+def default_impairment():
+    """Disabled settings that cap both directions at the bridge's 115200 baud once enabled"""
+    return LinkImpairment(ImpairmentSettings(baudrate=115200), ImpairmentSettings(baudrate=115200), enabled=False)
+
+
+def load_impairment(path):
+    with open(path, encoding='utf-8') as f:
+        return LinkImpairment.from_json(json.load(f))
+
+
+def save_impairment(impairment, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(impairment.to_json(), f, indent=2)
+
+
+class ImpairedChannel:
+    """One direction of the link, driven by an explicit clock so it can be stepped in tests"""
+
+    def __init__(self, settings, rng):
+        self.settings = settings
+        self.rng = rng
+        self.pending = []  # (delivery time, bytes), in delivery order
+        self.wire_free = 0.0  # When the last queued frame has finished serializing
+        self.last_delivery = 0.0
+
+        self.frames = 0
+        self.dropped = 0
+        self.corrupted = 0
+        self.bits_flipped = 0
+
+    def send(self, frame, now):
+        """Queue one frame sent at time now"""
+        settings = self.settings
+        rng = self.rng
+        self.frames += 1
+        if settings.drop_rate and rng.random() < settings.drop_rate:
+            self.dropped += 1
+            return
+        if settings.bit_error_rate:
+            frame = self._flip_bits(frame, settings.bit_error_rate)
+
+        # Serialize behind whatever is still on the wire, then fly
+        start = max(now, self.wire_free)
+        if settings.baudrate:
+            self.wire_free = start + len(frame) * BITS_PER_BYTE / settings.baudrate
+        else:
+            self.wire_free = start
+        delay = settings.latency
+        if settings.jitter:
+            if settings.distribution == 'uniform':
+                delay += rng.uniform(0.0, settings.jitter)
+            elif settings.distribution == 'normal':
+                delay += abs(rng.gauss(0.0, settings.jitter))
+            else:
+                delay += rng.expovariate(1.0 / settings.jitter)
+        # A serial line keeps order, so jitter can hold a frame back but not overtake
+        self.last_delivery = max(self.wire_free + delay, self.last_delivery)
+        self.pending.append((self.last_delivery, frame))
+
+    def _flip_bits(self, frame, rate):
+        # Jump straight to the next flipped bit: gaps between errors are geometric
+        bits = len(frame) * 8
+        position = -1
+        flipped = None
+        log_keep = math.log1p(-rate) if rate < 1.0 else None
+        while True:
+            if log_keep is None:
+                position += 1
+            else:
+                position += 1 + int(math.log(1.0 - self.rng.random()) / log_keep)
+            if position >= bits:
+                break
+            if flipped is None:
+                flipped = bytearray(frame)
+            flipped[position >> 3] ^= 1 << (position & 7)
+            self.bits_flipped += 1
+        if flipped is None:
+            return frame
+        self.corrupted += 1
+        return bytes(flipped)
+
+    def next_due(self):
+        """Delivery time of the next frame, or None"""
+        return self.pending[0][0] if self.pending else None
+
+    def due(self, now):
+        """Bytes of every frame delivered by time now"""
+        count = 0
+        for when, _ in self.pending:
+            if when > now:
+                break
+            count += 1
+        if not count:
+            return b""
+        data = b"".join(frame for _, frame in self.pending[:count])
+        del self.pending[:count]
+        return data
+
+    def stats_text(self):
+        return f"{self.frames} frames, {self.dropped} dropped, {self.corrupted} corrupted ({self.bits_flipped} bits)"
+
+
+class FrameSplitter:
+    """Cuts a byte stream at frame boundaries without validating the frames"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.binary_left = 0  # Bytes still to come of a binary frame
+
+    def feed(self, data):
+        frames = []
+        buffer = self.buffer
+        for byte in data:
+            buffer.append(byte)
+            if self.binary_left:
+                self.binary_left -= 1
+                if not self.binary_left:
+                    frames.append(bytes(buffer))
+                    buffer.clear()
+            elif byte == BINARY_SYNC:
+                if len(buffer) > 1:
+                    frames.append(bytes(buffer[:-1]))
+                    del buffer[:-1]
+                self.binary_left = BINARY_FRAME_LENGTH - 1
+            elif byte in b'>\n':
+                frames.append(bytes(buffer))
+                buffer.clear()
+        return frames
+
+
+class ImpairedSerial:
+    """Drop-in wrapper for an open serial.Serial with an impaired link in both directions.
+
+    Supports what the GUIs and SerialReader use: write(), read(), in_waiting,
+    cancel_read(), close() and the timeout attribute.
+    """
+
+    def __init__(self, ser, impairment, clock=time.monotonic):
+        self.ser = ser
+        self.impairment = impairment
+        self.clock = clock
+        self.timeout = ser.timeout
+        self.tx = ImpairedChannel(impairment.to_bridge, random.Random(impairment.seed * 2))
+        self.rx = ImpairedChannel(impairment.from_bridge, random.Random(impairment.seed * 2 + 1))
+        self.splitter = FrameSplitter()
+        self.received = bytearray()  # Delivered to the reader but not read yet
+        self.error = None
+        self.cancelled = False
+        self.running = True
+        # One lock for both channels; waiters are woken whenever either queue changes
+        self.condition = threading.Condition()
+
+        # Short port timeout so the pump notices close() promptly even without cancel_read
+        ser.timeout = 0.1
+        self.rx_thread = threading.Thread(target=self._pump_rx, name="impaired link rx", daemon=True)
+        self.tx_thread = threading.Thread(target=self._pump_tx, name="impaired link tx", daemon=True)
+        self.rx_thread.start()
+        self.tx_thread.start()
+
+    @property
+    def port(self):
+        return self.ser.port
+
+    @property
+    def is_open(self):
+        return self.running and self.ser.is_open
+
+    def write(self, data):
+        """Queue one frame for the bridge; returns at once like a buffered port"""
+        if self.error:
+            raise self.error
+        with self.condition:
+            self.tx.send(bytes(data), self.clock())
+            self.condition.notify_all()
+        return len(data)
+
+    def _collect(self):
+        self.received += self.rx.due(self.clock())
+
+    @property
+    def in_waiting(self):
+        with self.condition:
+            self._collect()
+            return len(self.received)
+
+    def read(self, size=1):
+        """Up to size delivered bytes; blocks like the wrapped port, honouring timeout"""
+        deadline = None if self.timeout is None else self.clock() + self.timeout
+        with self.condition:
+            while True:
+                self._collect()
+                if self.received or self.cancelled or not self.running:
+                    break
+                if self.error:
+                    raise self.error
+                wait = None if deadline is None else deadline - self.clock()
+                if wait is not None and wait <= 0:
+                    break
+                due = self.rx.next_due()
+                if due is not None:
+                    until_due = max(due - self.clock(), 0.0)
+                    wait = until_due if wait is None else min(wait, until_due)
+                self.condition.wait(wait)
+            self.cancelled = False
+            data = bytes(self.received[:size])
+            del self.received[:size]
+            return data
+
+    def cancel_read(self):
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    def _pump_rx(self):
+        ser = self.ser
+        while self.running:
+            try:
+                data = ser.read(1)
+                if data and ser.in_waiting:
+                    data += ser.read(ser.in_waiting)
+            except (serial.SerialException, OSError, TypeError) as e:
+                if self.running:
+                    with self.condition:
+                        self.error = serial.SerialException(f"impaired link: {e}")
+                        self.condition.notify_all()
+                return
+            if data:
+                with self.condition:
+                    now = self.clock()
+                    for frame in self.splitter.feed(data):
+                        self.rx.send(frame, now)
+                    self.condition.notify_all()
+
+    def _pump_tx(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    data = self.tx.due(self.clock())
+                    if data:
+                        break
+                    due = self.tx.next_due()
+                    self.condition.wait(None if due is None else max(due - self.clock(), 0.0))
+                else:
+                    return
+            try:
+                self.ser.write(data)
+            except (serial.SerialException, OSError, TypeError) as e:
+                with self.condition:
+                    self.error = serial.SerialException(f"impaired link: {e}")
+                    self.condition.notify_all()
+                return
+
+    def stats_text(self):
+        return f"to bridge: {self.tx.stats_text()}  |  from bridge: {self.rx.stats_text()}"
+
+    def close(self):
+        """Stop both pumps and close the wrapped port; frames still in flight are lost"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if hasattr(self.ser, 'cancel_read'):
+            try:
+                self.ser.cancel_read()
+            except (serial.SerialException, OSError):
+                pass
+        for thread in (self.rx_thread, self.tx_thread):
+            if thread is not threading.current_thread():
+                thread.join(timeout=1)
+        self.ser.close()
+
+
+def wrap_serial(ser, impairment):
+    """ser wrapped in an ImpairedSerial if impairment is set and enabled, else ser itself"""
+    if impairment is None or not impairment.enabled:
+        return ser
+    return ImpairedSerial(ser, impairment)
+
+
+class ImpairmentDialog:
+    """Settings window shared by the GUIs; edits the LinkImpairment in place on Apply.
+
+    Only the dialog needs Tk, so tkinter is imported here and the rest of
+    the module runs headless.
+    """
+
+    # (field, label, scale from the stored value to the shown one)
+    ROWS = (('latency', "Latency (ms)", 1000.0),
+            ('jitter', "Jitter (ms)", 1000.0),
+            ('distribution', "Jitter distribution", None),
+            ('baudrate', "Baud rate (0 = unlimited)", 1),
+            ('drop_rate', "Frame drop rate (%)", 100.0),
+            ('bit_error_rate', "Bit error rate", 1.0))
+
+    def __init__(self, parent, impairment, on_apply=None, bg='#1a1a1a'):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.impairment = impairment
+        self.on_apply = on_apply  # Called after settings were applied
+        self.window = tk.Toplevel(parent)
+        self.window.title("Link Impairment")
+        self.window.configure(bg=bg)
+
+        def label(text, row, column):
+            tk.Label(self.window, text=text, fg='white', bg=bg,
+                     font=('Arial', 10)).grid(row=row, column=column, sticky='w', padx=5, pady=2)
+
+        self.enabled_var = tk.BooleanVar(value=impairment.enabled)
+        tk.Checkbutton(self.window, text="Impair the link", variable=self.enabled_var,
+                       bg=bg, fg='white', selectcolor='#4a4a4a').grid(row=0, column=0, sticky='w', padx=5)
+        label("PC -> bridge", 0, 1)
+        label("bridge -> PC", 0, 2)
+        self.vars = {}
+        for row, (field, text, scale) in enumerate(self.ROWS, start=1):
+            label(text, row, 0)
+            for column, direction in ((1, 'to_bridge'), (2, 'from_bridge')):
+                value = getattr(getattr(impairment, direction), field)
+                var = tk.StringVar(value=value if scale is None else f"{value * scale:g}")
+                if scale is None:
+                    widget = ttk.Combobox(self.window, textvariable=var, values=JITTER_DISTRIBUTIONS,
+                                          width=12, state='readonly')
+                else:
+                    widget = tk.Entry(self.window, textvariable=var, width=14, bg='#333333', fg='white')
+                widget.grid(row=row, column=column, padx=5, pady=2)
+                self.vars[direction, field] = var
+
+        row = len(self.ROWS) + 1
+        label("Seed", row, 0)
+        self.seed_var = tk.StringVar(value=str(impairment.seed))
+        tk.Entry(self.window, textvariable=self.seed_var, width=14,
+                 bg='#333333', fg='white').grid(row=row, column=1, padx=5, pady=2)
+        label("Seed and a new enable apply on the next connect", row, 2)
+
+        buttons = tk.Frame(self.window, bg=bg)
+        buttons.grid(row=row + 1, column=0, columnspan=3, pady=5)
+        for text, command in (("Load...", self.load), ("Save...", self.save), ("Apply", self.apply)):
+            tk.Button(buttons, text=text, command=command, bg='#2196F3', fg='white',
+                      font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+
+    def read_settings(self):
+        """LinkImpairment from the entries; raises ValueError on a bad entry"""
+        directions = {}
+        for direction in ('to_bridge', 'from_bridge'):
+            values = {}
+            for field, text, scale in self.ROWS:
+                raw = self.vars[direction, field].get()
+                if scale is None:
+                    values[field] = raw
+                elif field == 'baudrate':
+                    values[field] = int(raw)
+                else:
+                    values[field] = float(raw) / scale
+            directions[direction] = ImpairmentSettings(**values)
+        return LinkImpairment(directions['to_bridge'], directions['from_bridge'],
+                              int(self.seed_var.get()), self.enabled_var.get())
+
+    def apply(self):
+        from tkinter import messagebox
+
+        try:
+            settings = self.read_settings()
+        except ValueError as e:
+            messagebox.showerror("Link Impairment", str(e), parent=self.window)
+            return
+        # In place, so a connection already wrapped picks the new values up
+        impairment = self.impairment
+        for direction in ('to_bridge', 'from_bridge'):
+            current = getattr(impairment, direction)
+            for field in ImpairmentSettings.FIELDS:
+                setattr(current, field, getattr(getattr(settings, direction), field))
+        impairment.seed = settings.seed
+        impairment.enabled = settings.enabled
+        if self.on_apply:
+            self.on_apply()
+
+    def load(self):
+        from tkinter import filedialog, messagebox
+
+        path = filedialog.askopenfilename(parent=self.window, filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            loaded = load_impairment(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Link Impairment", f"Could not load {path}: {e}", parent=self.window)
+            return
+        for (direction, field), var in self.vars.items():
+            scale = dict((row[0], row[2]) for row in self.ROWS)[field]
+            value = getattr(getattr(loaded, direction), field)
+            var.set(value if scale is None else f"{value * scale:g}")
+        self.seed_var.set(str(loaded.seed))
+        self.enabled_var.set(loaded.enabled)
+
+    def save(self):
+        from tkinter import filedialog, messagebox
+
+        try:
+            settings = self.read_settings()
+        except ValueError as e:
+            messagebox.showerror("Link Impairment", str(e), parent=self.window)
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if path:
+            save_impairment(settings, path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import hashlib
+    import sys
+
+    try:
+        from .protocol import SENSOR_CODEC, encode_binary_frame
+    except ImportError:
+        from protocol import SENSOR_CODEC, encode_binary_frame
+
+    parser = argparse.ArgumentParser(description="Run frames through an impaired loop:// port")
+    parser.add_argument("settings", nargs='?', help="impairment settings JSON file")
+    parser.add_argument("--loopback", action="store_true", help="send frames through a local loopback port")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200.0, help="frames per second")
+    args = parser.parse_args()
+
+    impairment = load_impairment(args.settings) if args.settings else LinkImpairment()
+    if not args.loopback:
+        print(json.dumps(impairment.to_json(), indent=2))
+        sys.exit(0)
+
+    # A loop:// port returns everything written, so both directions apply in turn
+    link = ImpairedSerial(serial.serial_for_url('loop://', timeout=0.1), impairment)
+    sent = []
+    for seq in range(args.frames):
+        frame = encode_binary_frame(seq, seq & 0x7F) if seq % 2 else \
+            SENSOR_CODEC.encode_text(seq & 0x7F, seq).encode()
+        sent.append(frame)
+        link.write(frame)
+        time.sleep(1.0 / args.rate)
+    expected = b"".join(sent)
+    received = bytearray()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline and (link.tx.pending or link.rx.pending or link.in_waiting):
+        received += link.read(max(1, link.in_waiting))
+    received += link.read(link.in_waiting)
+    link.close()
+
+    print(link.stats_text())
+    print(f"sent {len(expected)} bytes, received {len(received)} bytes, "
+          f"{'identical' if bytes(received) == expected else 'different'}")
+    # Same seed and settings give the same digest on every run
+    print(f"received digest {hashlib.sha256(received).hexdigest()[:16]}")
@@ -0,0 +1,115 @@
+"""
+Round-trip latency measurement for the serial link.
+
+Every sensor frame carries a sequence tag that the bridge echoes in its
+GATE_REQUEST reply. LatencyTracker remembers when each tag was sent and
+turns the matching reply into a sample. Samples go into a log-bucketed
+histogram (about 2% resolution from 10 us to 100 s), so percentiles are
+cheap to read every frame and memory stays constant over long runs.
+"""
+
+import json
+import math
+from array import array
+
+MIN_LATENCY = 10e-6  # Seconds; anything faster lands in bucket 0
+BUCKET_GROWTH = 1.02  # Upper bound of each bucket is 2% above the previous
+BUCKET_COUNT = int(math.log(1e7) / math.log(BUCKET_GROWTH)) + 2  # Up to 100 s
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = array('L', [0]) * BUCKET_COUNT
+        self.reset()
+
+    def reset(self):
+        for i in range(BUCKET_COUNT):
+            self.buckets[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def add(self, latency):
+        if latency <= MIN_LATENCY:
+            index = 0
+        else:
+            index = min(BUCKET_COUNT - 1,
+                        int(math.log(latency / MIN_LATENCY) / math.log(BUCKET_GROWTH)) + 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.min = latency if self.min is None else min(self.min, latency)
+
+    def bucket_upper_bound(self, index):
+        return MIN_LATENCY * BUCKET_GROWTH ** index
+
+    def percentile(self, p):
+        """Latency below which p percent of the samples fall (bucket upper bound)"""
+        if not self.count:
+            return 0.0
+        target = math.ceil(self.count * p / 100.0)
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= max(1, target):
+                # Never report more than the largest sample actually seen
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """Percentiles in seconds"""
+        return {
+            'count': self.count,
+            'min': self.min or 0.0,
+            'mean': self.mean(),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+class LatencyTracker:
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.sent_times = {}  # seq -> send timestamp of the last frame with that tag
+        self.unmatched = 0  # Replies whose tag was unknown or already answered
+
+    def reset(self):
+        self.histogram.reset()
+        self.sent_times.clear()
+        self.unmatched = 0
+
+    def sent(self, seq, now):
+        # Reusing a tag after the counter wraps replaces a frame that was never answered
+        self.sent_times[seq] = now
+
+    def received(self, seq, now):
+        """Record the reply for seq; returns the round-trip time or None"""
+        sent = self.sent_times.pop(seq, None)
+        if sent is None:
+            # Unsolicited request edges repeat the last tag
+            self.unmatched += 1
+            return None
+        latency = now - sent
+        self.histogram.add(latency)
+        return latency
+
+    def export(self, path, **context):
+        """Write the summary and the non-empty histogram buckets as JSON"""
+        histogram = self.histogram
+        data = {
+            'summary_ms': {name: value * 1000 if name != 'count' else value
+                           for name, value in histogram.summary().items()},
+            'unmatched_replies': self.unmatched,
+            'buckets': [{'upper_ms': histogram.bucket_upper_bound(index) * 1000, 'count': count}
+                        for index, count in enumerate(histogram.buckets) if count],
+            'context': context
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,301 @@
+"""
+Exhaustive breadth-first model checking of the airlock controller.
+
+The airlock is abstracted to a finite system whose state packs into one int:
+
+    rover region    where along the airlock the rover is. Regions are the
+                    stretches of rover position over which the layout's
+                    sensors and the gates the rover is under do not change,
+                    so moving one region is the smallest observable move
+    gate states     CLOSED, OPENING, OPEN or CLOSING per gate
+    request bits    gate requests last delivered to the bridge
+    view bits       sensor frame last delivered to the control unit
+
+Every interleaving of these events is explored:
+
+    rover forward / back      to the next region; a gate must be OPEN for the
+                              rover to move under it (unless --free-rover)
+    gate X opened / closed    a moving gate finishes, after any delay
+    sensor frame              the control unit sees the current sensor lines
+    request frame             its requests reach the gates, which start,
+                              reverse or hold exactly as GateArray.request does
+
+Timing is left fully nondeterministic, so a state is reachable here if some
+choice of rover speed, gate duration and link latency reaches it. Each state
+is checked for the scenario invariants: the gates are never open together,
+and no gate closes while its safety zone is occupied. Breadth-first order
+makes every reported trace a shortest one. Traces are lists of event labels
+and replay() checks them step by step:
+
+    python model_check.py                          # explore, print the traces
+    python model_check.py --save-traces traces.json
+    python model_check.py --replay traces.json
+"""
+
+import collections
+import json
+import time
+
+try:
+    from .airlock_sim import POLICIES, AirlockSimulator
+    from .protocol import REQUEST_CODEC, SENSOR_CODEC
+    from .signals import SENSOR_NAMES
+except ImportError:
+    from airlock_sim import POLICIES, AirlockSimulator
+    from protocol import REQUEST_CODEC, SENSOR_CODEC
+    from signals import SENSOR_NAMES
+
+CLOSED, OPENING, OPEN, CLOSING = range(4)
+GATE_STATE_NAMES = ('CLOSED', 'OPENING', 'OPEN', 'CLOSING')
+
+
+def _bit(codec, name):
+    return 1 << codec.names.index(name)
+
+
+class AirlockModel:
+    def __init__(self, sim=None, policy=POLICIES['control_unit'], rover_obeys_gates=True):
+        sim = sim if sim is not None else AirlockSimulator()
+        self.gate_names = sim.gates.names
+        self.gate_count = sim.gates.count
+        self.rover_obeys_gates = rover_obeys_gates
+
+        # Control unit as a lookup table: one policy call per possible sensor frame
+        self.policy_table = [REQUEST_CODEC.pack(policy(SENSOR_CODEC.unpack(bits)))
+                             for bits in range(1 << len(SENSOR_NAMES))]
+
+        self.request_bits = [_bit(REQUEST_CODEC, name) for name in sim.gate_request_names]
+        self.moving_bits = [_bit(SENSOR_CODEC, name) for name in sim.gate_moving_names]
+        self.safety_bits = [_bit(SENSOR_CODEC, name) for name in sim.gate_safety_names]
+        self._build_regions(sim)
+
+        # Field layout of a packed state, low bits first
+        self.region_width = max(1, (len(self.regions) - 1).bit_length())
+        self.gates_shift = self.region_width
+        self.requests_shift = self.gates_shift + 2 * self.gate_count
+        self.view_shift = self.requests_shift + len(REQUEST_CODEC.names)
+
+    def _build_regions(self, sim):
+        """Split rover positions into regions of constant sensor lines and gate overlap"""
+        width = sim.rover_width
+        layout = sim.sensor_layout
+        gate_lines = list(sim.gates.x)
+
+        # Positions (rover left edge, layout coordinates) where something starts or stops touching
+        points = sorted({value for element in layout.elements for value in (element.left - width, element.right)} |
+                        {value for x in gate_lines for value in (x - width, x)})
+        # Touching counts, so each breakpoint is a region of its own between two open stretches
+        samples = [points[0] - 10.0] if points else [0.0]
+        for a, b in zip(points, points[1:]):
+            samples += [a, (a + b) / 2]
+        if points:
+            samples += [points[-1], points[-1] + 10.0]
+
+        start_left = sim.rover_x - sim.start_x - width / 2
+        self.regions = []  # (sensor bits, gates under the rover as a mask, rover x)
+        self.start_region = 0
+        best = None
+        for left in samples:
+            states = dict.fromkeys(SENSOR_NAMES, False)
+            states.update(layout.signal_states(layout.hits(left, left + width)))
+            under = sum(1 << i for i, x in enumerate(gate_lines) if left <= x <= left + width)
+            signature = (SENSOR_CODEC.pack(states), under)
+            if not self.regions or self.regions[-1][:2] != signature:
+                self.regions.append(signature + (left + sim.start_x + width / 2,))
+            # The region the simulator's rover starts in
+            if best is None or abs(left - start_left) < best:
+                best = abs(left - start_left)
+                self.start_region = len(self.regions) - 1
+
+    # Packed states ------------------------------------------------------------
+
+    def pack(self, region, gates, requests, view):
+        packed = region | requests << self.requests_shift | view << self.view_shift
+        for index, gate_state in enumerate(gates):
+            packed |= gate_state << (self.gates_shift + 2 * index)
+        return packed
+
+    def unpack(self, state):
+        region = state & ((1 << self.region_width) - 1)
+        gates = [(state >> (self.gates_shift + 2 * index)) & 3 for index in range(self.gate_count)]
+        requests = (state >> self.requests_shift) & ((1 << len(REQUEST_CODEC.names)) - 1)
+        view = state >> self.view_shift
+        return region, gates, requests, view
+
+    def initial_state(self):
+        """Rover at its start position, gates closed, both frames in step with the plant"""
+        region = self.start_region
+        view = self.sensor_bits(region, [CLOSED] * self.gate_count)
+        return self.pack(region, [CLOSED] * self.gate_count, 0, view)
+
+    def sensor_bits(self, region, gates):
+        bits = self.regions[region][0]
+        for index, gate_state in enumerate(gates):
+            if gate_state in (OPENING, CLOSING):
+                bits |= self.moving_bits[index]
+        return bits
+
+    # Transitions --------------------------------------------------------------
+
+    def successors(self, state):
+        """(label, next state) for every event enabled in state"""
+        region, gates, requests, view = self.unpack(state)
+        result = []
+
+        for step, label in ((1, 'rover forward'), (-1, 'rover back')):
+            target = region + step
+            if 0 <= target < len(self.regions):
+                entering = self.regions[target][1] & ~self.regions[region][1]
+                if self.rover_obeys_gates and any(entering >> index & 1 and gates[index] != OPEN
+                                                  for index in range(self.gate_count)):
+                    continue
+                result.append((label, self.pack(target, gates, requests, view)))
+
+        for index, gate_state in enumerate(gates):
+            if gate_state in (OPENING, CLOSING):
+                finished = list(gates)
+                finished[index] = OPEN if gate_state == OPENING else CLOSED
+                label = f"gate {self.gate_names[index]} {'opened' if gate_state == OPENING else 'closed'}"
+                result.append((label, self.pack(region, finished, requests, view)))
+
+        lines = self.sensor_bits(region, gates)
+        if lines != view:
+            result.append(('sensor frame', self.pack(region, gates, requests, lines)))
+
+        wanted = self.policy_table[view]
+        if wanted != requests:
+            moved = [self._react(gate_state, bool(wanted & self.request_bits[index]))
+                     for index, gate_state in enumerate(gates)]
+            result.append(('request frame', self.pack(region, moved, wanted, view)))
+        return result
+
+    @staticmethod
+    def _react(gate_state, want_open):
+        # Same as GateArray.request: start or reverse towards the request, else hold
+        if want_open:
+            return OPENING if gate_state in (CLOSED, CLOSING) else gate_state
+        return CLOSING if gate_state in (OPEN, OPENING) else gate_state
+
+    def violations(self, state):
+        """Invariants broken in state, as short messages"""
+        region, gates, _, _ = self.unpack(state)
+        found = []
+        if self.gate_count > 1 and all(gate_state != CLOSED for gate_state in gates):
+            found.append("gates open together")
+        lines = self.regions[region][0]
+        for index, gate_state in enumerate(gates):
+            if gate_state == CLOSING and lines & self.safety_bits[index]:
+                found.append(f"gate {self.gate_names[index]} closing onto an occupied safety zone")
+        return found
+
+    def describe(self, state):
+        region, gates, requests, view = self.unpack(state)
+        gate_text = ' '.join(f"{name}:{GATE_STATE_NAMES[gate_state]}"
+                             for name, gate_state in zip(self.gate_names, gates))
+        sensors = ','.join(name for name, on in SENSOR_CODEC.unpack(view).items() if on) or '-'
+        asked = ','.join(name for name, on in REQUEST_CODEC.unpack(requests).items() if on) or '-'
+        return f"rover x={self.regions[region][2]:.1f}  {gate_text}  requests {asked}  controller sees {sensors}"
+
+    # Search -------------------------------------------------------------------
+
+    def explore(self, max_states=None):
+        """Breadth-first search of every reachable state; returns an Exploration"""
+        start = time.perf_counter()
+        initial = self.initial_state()
+        parents = {initial: None}  # state -> (previous state, label); doubles as the visited set
+        queue = collections.deque([initial])
+        transitions = 0
+        traces = {}  # violation -> shortest trace reaching it
+        while queue:
+            state = queue.popleft()
+            for violation in self.violations(state):
+                if violation not in traces:
+                    traces[violation] = self._trace(parents, state)
+            for label, successor in self.successors(state):
+                transitions += 1
+                if successor not in parents:
+                    parents[successor] = (state, label)
+                    queue.append(successor)
+            if max_states is not None and len(parents) >= max_states:
+                break
+        return Exploration(len(parents), transitions, traces, time.perf_counter() - start, not queue)
+
+    @staticmethod
+    def _trace(parents, state):
+        labels = []
+        while parents[state] is not None:
+            state, label = parents[state]
+            labels.append(label)
+        return labels[::-1]
+
+    def replay(self, labels):
+        """Follow a trace from the initial state; returns the states visited.
+
+        Raises ValueError at the first event that is not enabled.
+        """
+        state = self.initial_state()
+        states = [state]
+        for step, label in enumerate(labels):
+            successors = dict(self.successors(state))
+            if label not in successors:
+                raise ValueError(f"step {step}: '{label}' is not possible in {self.describe(state)}")
+            state = successors[label]
+            states.append(state)
+        return states
+
+
+class Exploration:
+    def __init__(self, states, transitions, traces, elapsed, complete):
+        self.states = states
+        self.transitions = transitions
+        self.traces = traces  # violation -> list of event labels
+        self.elapsed = elapsed
+        self.complete = complete  # False if max_states cut the search short
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    try:
+        from .sensor_layout import load_layout
+    except ImportError:
+        from sensor_layout import load_layout
+
+    deterministic = sorted(name for name in POLICIES if name != 'random')
+    parser = argparse.ArgumentParser(description="Exhaustively check the airlock controller")
+    parser.add_argument("--controller", choices=deterministic, default='control_unit')
+    parser.add_argument("--layout", help="sensor layout JSON file (see sensor_layout.py)")
+    parser.add_argument("--free-rover", action="store_true", help="let the rover pass closed gates")
+    parser.add_argument("--max-states", type=int, default=None)
+    parser.add_argument("--save-traces", help="write the unsafe traces here as JSON")
+    parser.add_argument("--replay", help="replay traces saved with --save-traces")
+    args = parser.parse_args()
+
+    sim = AirlockSimulator(layout=load_layout(args.layout) if args.layout else None)
+    model = AirlockModel(sim, POLICIES[args.controller], rover_obeys_gates=not args.free_rover)
+
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as f:
+            saved = json.load(f)
+        for violation, labels in saved.items():
+            states = model.replay(labels)
+            reached = violation in model.violations(states[-1])
+            print(f"{violation}: {len(labels)} steps, {'reproduced' if reached else 'NOT reproduced'}")
+            for label, state in zip(['start'] + labels, states):
+                print(f"    {label:16s} {model.describe(state)}")
+        sys.exit(0)
+
+    result = model.explore(args.max_states)
+    print(f"{result.states} states, {result.transitions} transitions, {len(model.regions)} rover regions "
+          f"in {result.elapsed:.2f} s{'' if result.complete else ' (stopped at --max-states)'}")
+    if not result.traces:
+        print("No unsafe state is reachable")
+    for violation, labels in result.traces.items():
+        print(f"\nUNSAFE: {violation} after {len(labels)} steps")
+        for label, state in zip(['start'] + labels, model.replay(labels)):
+            print(f"    {label:16s} {model.describe(state)}")
+    if args.save_traces:
+        with open(args.save_traces, 'w', encoding='utf-8') as f:
+            json.dump(result.traces, f, indent=2)
+    sys.exit(1 if result.traces else 0)
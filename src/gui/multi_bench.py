@@ -0,0 +1,419 @@
+"""
+Multi-bench mode: several airlock testbenches in one process.
+
+Every bench has its own simulator, serial port and link state, but they
+share one Tk main loop, one Scheduler and one SerialMultiplexer thread, so
+adding a rig costs a few objects and a small canvas rather than another
+GUI process. Benches are shown as compact tiles; each rover is driven by a
+slider or by the automatic drive-through.
+
+    python multi_bench.py --benches 3
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import serial
+import serial.tools.list_ports
+
+try:
+    from .airlock_sim import AirlockSimulator
+    from .metrics import LatencyTracker
+    from .protocol import (BinaryFrame, PROTOCOL_PROBE, REQUEST_CODEC, SENSOR_CODEC, SEQ_MODULO,
+                           encode_binary_frame)
+    from .scheduler import Scheduler
+    from .sensor_layout import load_layout
+    from .serial_link import ChangeDrivenTransmitter, SerialMultiplexer, open_serial_async
+    from .sim_clock import SimulationClock
+except ImportError:
+    from airlock_sim import AirlockSimulator
+    from metrics import LatencyTracker
+    from protocol import (BinaryFrame, PROTOCOL_PROBE, REQUEST_CODEC, SENSOR_CODEC, SEQ_MODULO,
+                          encode_binary_frame)
+    from scheduler import Scheduler
+    from sensor_layout import load_layout
+    from serial_link import ChangeDrivenTransmitter, SerialMultiplexer, open_serial_async
+    from sim_clock import SimulationClock
+
+TILE_WIDTH = 360
+TILE_HEIGHT = 90
+
+
+class Bench:
+    """Link and simulation state of one rig - no Tk"""
+
+    def __init__(self, name, layout=None):
+        self.name = name
+        self.sim = AirlockSimulator(layout=layout)
+        self.sim.add_edge_listener(self.on_sensor_edge)
+        self.ser = None
+        self.port = ""
+        self.connected = False
+
+        # Same framing and transmit policy as AirlockGUI
+        self.binary_protocol = False
+        self.tx_seq = 0
+        self.last_frame_size = 0
+        self.transmitter = ChangeDrivenTransmitter(heartbeat_interval=1.0)
+        self.latency = LatencyTracker()
+        self.frames_received = 0
+        self.last_error = ""
+
+        # Automatic drive-through, like airlock_sim.run_cycles
+        self.auto_drive = False
+        self.rover_speed = 100.0  # px per simulated second
+        self.exit_x = self.sim.start_x + self.sim.airlock_width + self.sim.rover_width
+
+    def attach(self, ser, port, use_binary):
+        self.ser = ser
+        self.port = port
+        self.connected = True
+        self.binary_protocol = False
+        self.latency.reset()
+        self.last_error = ""
+        if use_binary:
+            # Older firmware ignores the probe and keeps the text format
+            self.ser.write(PROTOCOL_PROBE.encode())
+        self.transmitter.reset()
+        self.transmit()
+
+    def detach(self):
+        self.connected = False
+        self.binary_protocol = False
+        self.ser = None
+
+    def transmit(self, periodic=False):
+        """Send the sensor frame on change, heartbeat or fixed-rate tick"""
+        if not self.connected:
+            return
+        state = tuple(self.sim.sensor_states.values())
+        now = time.monotonic()
+        if self.transmitter.should_send(state, now, periodic):
+            size = self.send_frame()
+            if size:
+                self.transmitter.record_sent(state, now, size)
+        elif periodic:
+            self.transmitter.record_skipped(self.last_frame_size)
+
+    def on_sensor_edge(self, edge):
+        # Every edge of a swept move gets its own frame, so crossed beams are not lost
+        self.transmit()
+
+    def send_frame(self):
+        seq = self.tx_seq
+        self.tx_seq = (self.tx_seq + 1) % SEQ_MODULO
+        bits = SENSOR_CODEC.pack(self.sim.sensor_states)
+        if self.binary_protocol:
+            frame = encode_binary_frame(seq, bits)
+        else:
+            frame = SENSOR_CODEC.encode_text(bits, seq).encode()
+        try:
+            self.ser.write(frame)
+        except serial.SerialException as e:
+            self.last_error = str(e)
+            return 0
+        self.latency.sent(seq, time.perf_counter())
+        self.last_frame_size = len(frame)
+        return len(frame)
+
+    def handle_message(self, message):
+        """Apply one message from the bridge - runs on the Tk thread"""
+        if isinstance(message, BinaryFrame):
+            requests = REQUEST_CODEC.unpack(message.bits)
+            seq = message.seq
+        elif message == PROTOCOL_PROBE:
+            self.binary_protocol = True
+            return
+        else:
+            requests, seq = REQUEST_CODEC.decode_text(message)
+            if not requests:
+                return  # Banner or debug output
+
+        self.frames_received += 1
+        if seq is not None:
+            self.latency.received(seq, time.perf_counter())
+        self.sim.set_gate_requests(requests)
+        self.transmit()  # GATE_MOVING_* may have just gone high
+
+    def step(self, dt):
+        """One fixed simulation step; returns True if anything visible changed"""
+        changed = False
+        rover_x = None
+        if self.auto_drive:
+            x = self.sim.rover_x + self.rover_speed * dt
+            if x < self.exit_x:
+                rover_x = x  # Driven during the step, so its edges are timed within it
+            else:
+                self.sim.move_rover(50, sweep=False)  # Back to the start, not through the airlock
+            changed = True
+        if self.sim.step(dt, rover_x):
+            changed = True
+        self.transmit()
+        return changed
+
+
+class BenchTile:
+    """Compact view of one bench: port selector, rover slider and a small airlock canvas"""
+
+    def __init__(self, parent, bench, app):
+        self.bench = bench
+        self.app = app
+        self.connecting = False
+        sim = bench.sim
+        self.k = TILE_WIDTH / (2 * sim.start_x + sim.airlock_width)  # sim px -> tile px
+
+        self.frame = tk.LabelFrame(parent, text=bench.name, font=('Arial', 11, 'bold'),
+                                   fg='white', bg='#2a2a2a')
+
+        row = tk.Frame(self.frame, bg='#2a2a2a')
+        row.pack(fill=tk.X, padx=4, pady=2)
+        self.port_var = tk.StringVar()
+        self.port_combo = ttk.Combobox(row, textvariable=self.port_var,
+                                       values=app.get_serial_ports(), width=14)
+        self.port_combo.pack(side=tk.LEFT)
+        self.connect_btn = tk.Button(row, text="Connect", command=self.toggle_connection,
+                                     bg='#4CAF50', fg='white', font=('Arial', 9, 'bold'))
+        self.connect_btn.pack(side=tk.LEFT, padx=4)
+        self.auto_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(row, text="Auto", variable=self.auto_var, command=self.on_auto_toggle,
+                       bg='#2a2a2a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT)
+
+        self.canvas = tk.Canvas(self.frame, width=TILE_WIDTH, height=TILE_HEIGHT,
+                                bg='#1a1a1a', highlightthickness=0)
+        self.canvas.pack(padx=4)
+        self.create_items()
+
+        self.rover_scale = tk.Scale(self.frame, from_=0, to=bench.exit_x, orient=tk.HORIZONTAL,
+                                    showvalue=False, length=TILE_WIDTH, command=self.on_rover_move,
+                                    bg='#2a2a2a', fg='white', highlightthickness=0)
+        self.rover_scale.set(sim.rover_x)
+        self.rover_scale.pack(padx=4)
+
+        self.stats_label = tk.Label(self.frame, text="Disconnected", font=('Consolas', 8),
+                                    fg='#aaaaaa', bg='#2a2a2a', anchor='w')
+        self.stats_label.pack(fill=tk.X, padx=4, pady=(0, 4))
+
+    def create_items(self):
+        """Static airlock outline plus retained items for gates, sensors and rover"""
+        sim, k, c = self.bench.sim, self.k, self.canvas
+        top, bottom = 10, TILE_HEIGHT - 10
+        c.create_rectangle(sim.start_x * k, top, (sim.start_x + sim.airlock_width) * k, bottom,
+                           outline='white')
+        # Beams as lines, safety spans as outlines; lit while the rover overlaps them
+        self.sensor_items = []
+        for element in sim.sensor_layout.elements:
+            left, right = (sim.start_x + element.left) * k, (sim.start_x + element.right) * k
+            if element.left == element.right:
+                self.sensor_items.append((c.create_line(left, top, left, bottom, fill='#444444', dash=(2, 2)),
+                                          'fill', '#00ff00'))
+            else:
+                self.sensor_items.append((c.create_rectangle(left, top, right, bottom, outline='#444444',
+                                                             dash=(2, 2)), 'outline', '#ff0000'))
+        self.lit_sensors = set()
+        self.gate_items = [c.create_rectangle(0, 0, 0, 0, fill='#ff6b35', outline='')
+                           for _ in range(sim.gates.count)]
+        self.rover_item = c.create_rectangle(0, 0, 0, 0, fill='#4CAF50', outline='white')
+
+    def render(self):
+        sim, k, c = self.bench.sim, self.k, self.canvas
+        top, bottom = 10, TILE_HEIGHT - 10
+        hits = set(sim.sensor_hits or ())
+        for index in hits ^ self.lit_sensors:
+            item, option, color = self.sensor_items[index]
+            c.itemconfigure(item, **{option: color if index in hits else '#444444'})
+        self.lit_sensors = hits
+
+        # Gates shrink upwards as they open
+        gates = sim.gates
+        for item, gate_x, progress, moving in zip(self.gate_items, gates.x, gates.progress, gates.moving):
+            x = (sim.start_x + gate_x) * k
+            c.coords(item, x - 2, top, x + 2, bottom - (bottom - top) * progress)
+            c.itemconfigure(item, fill='#ffaa00' if moving else '#ff6b35')
+
+        half = sim.rover_width / 2 * k
+        y = (top + bottom) / 2
+        c.coords(self.rover_item, sim.rover_x * k - half, y - 8, sim.rover_x * k + half, y + 8)
+
+        bench = self.bench
+        if bench.connected:
+            mode = "BIN" if bench.binary_protocol else "TXT"
+            text = f"{bench.port} {mode}  rx {bench.frames_received}  tx {bench.transmitter.frames_sent}"
+            histogram = bench.latency.histogram
+            if histogram.count:
+                text += f"  RTT p95 {histogram.percentile(95) * 1000:.1f} ms"
+            if bench.last_error:
+                text += f"  ! {bench.last_error}"
+        else:
+            text = bench.last_error or "Disconnected"
+        self.stats_label.config(text=text)
+        if bench.auto_drive:
+            self.rover_scale.set(sim.rover_x)
+
+    def on_rover_move(self, value):
+        if not self.bench.auto_drive:
+            self.bench.sim.move_rover(float(value))
+            self.bench.transmit()
+
+    def on_auto_toggle(self):
+        self.bench.auto_drive = self.auto_var.get()
+
+    def toggle_connection(self):
+        if self.connecting:
+            return
+        if self.bench.connected:
+            self.app.disconnect_bench(self)
+        else:
+            self.app.connect_bench(self)
+
+
+class MultiBenchGUI:
+    def __init__(self, root, bench_count=2, columns=2, layout=None):
+        self.root = root
+        self.root.title("Airlock HIL Simulator - Multi-bench")
+        self.root.configure(bg='#1a1a1a')
+        self.columns = columns
+        self.layout = layout  # Sensor layout of every bench; None for the built-in one
+
+        self.benches = []
+        self.tiles = []
+
+        # Shared by every bench: one scheduler on the Tk thread, one I/O thread
+        self.scheduler = Scheduler()
+        self.clock = SimulationClock(tick_rate=100)
+        self.mux = SerialMultiplexer()
+        self.mux.start()
+
+        self.setup_gui()
+        for _ in range(bench_count):
+            self.add_bench()
+
+        self.clock.start()
+        self.scheduler.every(self.clock.dt, self.simulation_tick)
+        self.scheduler.every(0.1, self.periodic_transmit)
+        self.scheduler.every(1 / 30, self.render)
+        self.scheduler.attach(self.root)
+
+    def setup_gui(self):
+        top = tk.Frame(self.root, bg='#1a1a1a')
+        top.pack(fill=tk.X, pady=5)
+        tk.Label(top, text="Airlock HIL Multi-bench", font=('Arial', 16, 'bold'),
+                 fg='white', bg='#1a1a1a').pack(side=tk.LEFT, padx=10)
+        tk.Button(top, text="Add Bench", command=self.add_bench,
+                  bg='#2196F3', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Refresh Ports", command=self.refresh_ports,
+                  bg='#2196F3', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        self.use_binary_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(top, text="Binary protocol", variable=self.use_binary_var,
+                       bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+        self.reset_on_connect_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(top, text="Reset on connect", variable=self.reset_on_connect_var,
+                       bg='#1a1a1a', fg='white', selectcolor='#4a4a4a').pack(side=tk.LEFT, padx=5)
+
+        self.grid_frame = tk.Frame(self.root, bg='#1a1a1a')
+        self.grid_frame.pack(padx=5, pady=5)
+
+    def add_bench(self):
+        bench = Bench(f"Bench {len(self.benches) + 1}", self.layout)
+        tile = BenchTile(self.grid_frame, bench, self)
+        index = len(self.tiles)
+        tile.frame.grid(row=index // self.columns, column=index % self.columns, padx=4, pady=4)
+        self.benches.append(bench)
+        self.tiles.append(tile)
+        return tile
+
+    def get_serial_ports(self):
+        return [port.device for port in serial.tools.list_ports.comports()]
+
+    def refresh_ports(self):
+        ports = self.get_serial_ports()
+        for tile in self.tiles:
+            tile.port_combo['values'] = ports
+
+    def connect_bench(self, tile):
+        port = tile.port_var.get()
+        if not port:
+            messagebox.showerror("Error", "Please select a COM port")
+            return
+        if any(other is not tile and other.bench.port == port and
+               (other.bench.connected or other.connecting) for other in self.tiles):
+            messagebox.showerror("Error", f"{port} is already used by another bench")
+            return
+        # Benches connect in parallel; each waits for its own ready banner
+        tile.connecting = True
+        tile.bench.port = port
+        tile.bench.last_error = "Connecting..."
+        tile.connect_btn.config(text="Connecting...", state=tk.DISABLED)
+        open_serial_async(port,
+                          lambda ser, ready, elapsed: self.scheduler.post(self.on_bench_opened,
+                                                                          tile, ser, ready, elapsed),
+                          lambda error: self.scheduler.post(self.on_connect_failed, tile, error),
+                          reset=self.reset_on_connect_var.get())
+
+    def on_bench_opened(self, tile, ser, ready, elapsed):
+        tile.connecting = False
+        bench = tile.bench
+        # Messages arrive on the multiplexer thread and are handled on the Tk thread
+        self.mux.add(ser,
+                     lambda message: self.scheduler.post(bench.handle_message, message),
+                     lambda error: self.scheduler.post(self.on_bench_error, tile, error))
+        bench.attach(ser, bench.port, self.use_binary_var.get())
+        if not ready and self.reset_on_connect_var.get():
+            bench.last_error = f"no ready banner after {elapsed:.1f} s"
+        tile.connect_btn.config(text="Disconnect", bg='#f44336', state=tk.NORMAL)
+
+    def on_connect_failed(self, tile, error):
+        tile.connecting = False
+        tile.bench.last_error = f"Failed to connect: {error}"
+        tile.connect_btn.config(text="Connect", bg='#4CAF50', state=tk.NORMAL)
+
+    def disconnect_bench(self, tile):
+        bench = tile.bench
+        ser = bench.ser
+        bench.detach()
+        if ser:
+            self.mux.remove(ser)
+            ser.close()
+        tile.connect_btn.config(text="Connect", bg='#4CAF50')
+
+    def on_bench_error(self, tile, error):
+        if tile.bench.connected:
+            self.disconnect_bench(tile)
+        tile.bench.last_error = f"Serial read failed: {error}"
+
+    def simulation_tick(self):
+        for _ in range(self.clock.poll()):
+            for bench in self.benches:
+                bench.step(self.clock.dt)
+
+    def periodic_transmit(self):
+        for bench in self.benches:
+            bench.transmit(periodic=True)
+
+    def render(self):
+        for tile in self.tiles:
+            tile.render()
+
+    def on_closing(self):
+        self.scheduler.stop()
+        for tile in self.tiles:
+            if tile.bench.connected:
+                self.disconnect_bench(tile)
+        self.mux.stop()
+        self.root.destroy()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run several airlock testbenches in one window")
+    parser.add_argument("--benches", type=int, default=2, help="number of benches to start with")
+    parser.add_argument("--columns", type=int, default=2, help="tiles per row")
+    parser.add_argument("--layout", help="sensor layout JSON file (see sensor_layout.py)")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    app = MultiBenchGUI(root, bench_count=args.benches, columns=args.columns,
+                        layout=load_layout(args.layout) if args.layout else None)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    root.mainloop()
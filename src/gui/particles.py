@@ -0,0 +1,71 @@
+"""
+Fixed-capacity particle pool for the gate effects.
+
+Particles are stored struct-of-arrays style in preallocated array('d')
+columns. Live particles are packed at the front; a dead particle is
+replaced by the last live one, so update cost depends only on the live
+count and memory never grows past the capacity.
+"""
+
+import random
+from array import array
+
+
+class ParticlePool:
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.x = array('d', bytes(8 * capacity))
+        self.y = array('d', bytes(8 * capacity))
+        self.vx = array('d', bytes(8 * capacity))
+        self.vy = array('d', bytes(8 * capacity))
+        self.life = array('d', bytes(8 * capacity))
+        self.size = array('d', bytes(8 * capacity))
+        self.count = 0  # Live particles occupy indices [0, count)
+        self.dropped = 0  # Spawns refused because the pool was full
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, x, y, vx, vy, size, life=1.0):
+        """Add a particle; returns False if the pool is full"""
+        if self.count >= self.capacity:
+            self.dropped += 1
+            return False
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.size[i] = size
+        self.count += 1
+        return True
+
+    def spawn_random(self, x, y_min, y_max):
+        """Spawn one slow, small particle around x - the gate effect used by the GUI"""
+        return self.spawn(x + random.uniform(-3, 3),  # Very small spread
+                          random.uniform(y_min, y_max),
+                          random.uniform(-0.3, 0.3),  # Very slow movement
+                          random.uniform(-0.8, -0.2),
+                          random.uniform(1, 1.5))  # Very small particles
+
+    def update(self):
+        """Advance one tick and drop dead particles"""
+        x, y, vx, vy, life, size = self.x, self.y, self.vx, self.vy, self.life, self.size
+        i = 0
+        while i < self.count:
+            x[i] += vx[i]
+            y[i] += vy[i]
+            life[i] -= 0.015  # Very slow fade out
+            size[i] *= 0.998  # Very slow size reduction
+            if life[i] > 0 and size[i] > 0.9:
+                i += 1
+                continue
+            # Move the last live particle into this slot and re-check it
+            last = self.count - 1
+            x[i], y[i], vx[i], vy[i] = x[last], y[last], vx[last], vy[last]
+            life[i], size[i] = life[last], size[last]
+            self.count = last
@@ -0,0 +1,296 @@
+"""
+Serial framing shared by the GUIs and the firmware emulator.
+
+Text frames are delimited by '<' and '>' exactly as recvWithStartEndMarkers()
+in the firmware expects. FrameParser is incremental: it keeps a persistent
+byte buffer across reads and yields every complete frame as soon as its
+end marker arrives.
+
+Binary frames are 4 bytes: SYNC, seq, bits, crc. Every byte after SYNC has
+bit 7 set and carries 7 payload bits, so a binary frame can never contain
+'<', '>' or a newline and both formats can share one stream. The bridge
+answers a frame in the format it was sent in; the PC switches to binary
+only after the bridge acknowledges the <PROTO:BIN> probe, so older
+firmware keeps working with the text format.
+
+FrameCodec is generated from the signal schema in signals.py. Its pack and
+unpack functions are compiled for the schema's names, and every possible
+text frame is precomputed, so encoding a frame or decoding a well-formed
+reply is a table lookup.
+"""
+
+import codecs
+from collections import namedtuple
+
+try:
+    from .signals import REQUEST_NAMES, SENSOR_NAMES, SEQ_FIELD
+except ImportError:
+    from signals import REQUEST_NAMES, SENSOR_NAMES, SEQ_FIELD
+
+# Anything longer is treated as line noise and discarded
+MAX_FRAME_LENGTH = 512
+
+# Binary frame layout
+BINARY_SYNC = 0xA5
+BINARY_FRAME_LENGTH = 4
+SEQ_MODULO = 128
+
+# Capability probe and acknowledgement, sent as ordinary text frames
+PROTOCOL_PROBE = "<PROTO:BIN>"
+
+# Printed by HIL_ESP32 at the end of setup()
+READY_BANNER = "<Arduino is ready>"
+
+# Bit positions in the binary payload, in text frame order
+SENSOR_BITS = SENSOR_NAMES
+REQUEST_BITS = REQUEST_NAMES
+
+BinaryFrame = namedtuple('BinaryFrame', ['seq', 'bits'])
+
+
+def _crc7_table():
+    # CRC-7/MMC, polynomial x^7 + x^3 + 1, kept in the top 7 bits while shifting
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x12) if crc & 0x80 else (crc << 1)
+        table.append(crc & 0xFF)
+    return table
+
+
+CRC7_TABLE = _crc7_table()
+
+
+def crc7(data):
+    """CRC-7/MMC of data as a value in 0..127"""
+    crc = 0
+    for byte in data:
+        crc = CRC7_TABLE[crc ^ byte]
+    return crc >> 1
+
+
+def pack_bits(states, names):
+    """Pack the boolean values of names into an integer, first name = bit 0"""
+    bits = 0
+    for index, name in enumerate(names):
+        if states[name]:
+            bits |= 1 << index
+    return bits
+
+
+def unpack_bits(bits, names):
+    return {name: bool(bits >> index & 1) for index, name in enumerate(names)}
+
+
+def encode_text_frame(states, names, seq=None):
+    """'<NAME:0|1,...>' in the order of names, with the SEQ tag last if given"""
+    parts = [f"{name}:{'1' if states[name] else '0'}" for name in names]
+    if seq is not None:
+        parts.append(f"SEQ:{seq}")
+    return "<" + ",".join(parts) + ">"
+
+
+def parse_text_frame(frame):
+    """Fields of a '<NAME:VALUE,...>' frame as a dict of strings; empty if not a frame"""
+    fields = {}
+    if not (frame.startswith('<') and frame.endswith('>')):
+        return fields
+    for pair in frame[1:-1].split(','):
+        name, sep, value = pair.partition(':')
+        if sep:
+            fields[name] = value
+    return fields
+
+
+class FrameCodec:
+    """Text and bit encodings of one direction of the link, generated for names"""
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.pack = self._compile_pack()  # states dict -> bits
+        self.unpack = self._compile_unpack()  # bits -> new states dict
+
+        # '<NAME:0,...' for every bit combination - the closing '>' follows the optional SEQ
+        self.templates = tuple(encode_text_frame(self.unpack(bits), self.names)[:-1]
+                               for bits in range(1 << len(self.names)))
+        self.template_bits = {template: bits for bits, template in enumerate(self.templates)}
+        self.seq_marker = f",{SEQ_FIELD}:"
+
+    def _compile(self, source, name):
+        namespace = {}
+        exec(source, namespace)
+        return namespace[name]
+
+    def _compile_pack(self):
+        terms = [f"(states[{name!r}] and {1 << index})" for index, name in enumerate(self.names)]
+        return self._compile("def pack(states):\n    return " + " | ".join(terms or ["0"]) + "\n", 'pack')
+
+    def _compile_unpack(self):
+        items = [f"{name!r}: bool(bits & {1 << index})" for index, name in enumerate(self.names)]
+        return self._compile("def unpack(bits):\n    return {" + ", ".join(items) + "}\n", 'unpack')
+
+    def encode_text(self, bits, seq=None):
+        """Text frame for bits, with the SEQ tag last if given"""
+        if seq is None:
+            return self.templates[bits] + ">"
+        return f"{self.templates[bits]}{self.seq_marker}{seq}>"
+
+    def decode_text(self, frame):
+        """(values, seq) of a text frame; values only holds the names present in it.
+
+        Frames in canonical order are one dict lookup; anything else (other
+        field order, missing fields, extra fields) goes through parse_text_frame.
+        """
+        body = frame[:-1]
+        head, marker, seq = body.rpartition(self.seq_marker)
+        if not marker:
+            head, seq = body, ''
+        bits = self.template_bits.get(head)
+        if bits is not None and frame.endswith('>'):
+            # isdigit() alone also accepts digits int() rejects, such as '²'
+            return self.unpack(bits), int(seq) if seq.isascii() and seq.isdigit() else None
+
+        fields = parse_text_frame(frame)
+        values = {name: fields[name] == '1' for name in self.names if name in fields}
+        seq = fields.get(SEQ_FIELD, '')
+        return values, int(seq) if seq.isascii() and seq.isdigit() else None
+
+
+SENSOR_CODEC = FrameCodec(SENSOR_BITS)
+REQUEST_CODEC = FrameCodec(REQUEST_BITS)
+
+
+def encode_binary_frame(seq, bits):
+    seq_byte = 0x80 | (seq % SEQ_MODULO)
+    bits_byte = 0x80 | (bits & 0x7F)
+    return bytes((BINARY_SYNC, seq_byte, bits_byte, 0x80 | crc7((seq_byte, bits_byte))))
+
+
+def decode_binary_frame(frame):
+    """Returns a BinaryFrame, or None if the frame is malformed or fails the CRC"""
+    if len(frame) != BINARY_FRAME_LENGTH or frame[0] != BINARY_SYNC:
+        return None
+    seq_byte, bits_byte, crc_byte = frame[1], frame[2], frame[3]
+    if not (seq_byte & bits_byte & crc_byte & 0x80):
+        return None
+    if crc_byte & 0x7F != crc7((seq_byte, bits_byte)):
+        return None
+    return BinaryFrame(seq_byte & 0x7F, bits_byte & 0x7F)
+
+
+def _decode(raw):
+    return raw.decode('utf-8', errors='replace').strip()
+
+
+def _utf8_prefix(raw):
+    """True if raw is valid UTF-8, possibly cut off inside its last character"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw, False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+class FrameParser:
+    def __init__(self, max_length=MAX_FRAME_LENGTH):
+        self.max_length = max_length
+        self.buffer = bytearray()
+        self.dropped_bytes = 0
+        self.crc_errors = 0
+
+    def reset(self):
+        self.buffer.clear()
+
+    def feed(self, data):
+        """Consume raw bytes; returns a list of complete messages.
+
+        Text frames are returned as str with their markers, e.g. '<GATE_REQUEST_A:1,...>'.
+        Text outside of frames (firmware banners, debug prints) is returned
+        line by line. Bytes that are not valid UTF-8 are replaced, never raised.
+        Binary frames that pass the CRC are returned as BinaryFrame tuples.
+
+        The bridge writes whole messages, so a binary frame only starts at a
+        message boundary. SYNC inside a text frame, or inside a text line that
+        is valid UTF-8 up to it (0xA5 is a UTF-8 continuation byte), is text.
+        Other bytes with bit 7 set at a boundary are the payload of a binary
+        frame that lost its SYNC and are dropped.
+        """
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        pos = 0
+        while pos < len(buffer):
+            # pos is always at a message boundary
+            first = buffer[pos]
+            if first == BINARY_SYNC:
+                if len(buffer) - pos < BINARY_FRAME_LENGTH:
+                    break  # Partial binary frame
+                frame = decode_binary_frame(buffer[pos:pos + BINARY_FRAME_LENGTH])
+                if frame is None:
+                    # Like the firmware, SYNC always takes the next three bytes
+                    self.crc_errors += 1
+                    self.dropped_bytes += BINARY_FRAME_LENGTH
+                else:
+                    messages.append(frame)
+                pos += BINARY_FRAME_LENGTH
+                continue
+            if first & 0x80:
+                self.dropped_bytes += 1
+                pos += 1
+                continue
+
+            if first == 0x3C:  # '<' - a frame right at the boundary, the usual case
+                start = pos
+            else:
+                start = buffer.find(b'<', pos)
+                newline = buffer.find(b'\n', pos)
+                text_end = len(buffer) if start == -1 else start
+                if newline != -1 and newline < text_end:
+                    text_end = newline
+
+                # SYNC in a text line is text while it continues valid UTF-8. Otherwise the
+                # "text" is a binary frame whose SYNC was corrupted, and SYNC starts the next one.
+                if text_end - pos > 1:
+                    sync = buffer.find(BINARY_SYNC, pos + 1, text_end)
+                    while sync != -1 and _utf8_prefix(buffer[pos:sync + 1]):
+                        sync = buffer.find(BINARY_SYNC, sync + 1, text_end)
+                    if sync != -1:
+                        self.dropped_bytes += sync - pos
+                        pos = sync
+                        continue
+
+                # Free text line ahead of the next frame
+                if newline != -1 and (start == -1 or newline < start):
+                    text = _decode(buffer[pos:newline])
+                    if text:
+                        messages.append(text)
+                    pos = newline + 1
+                    continue
+                if start == -1:
+                    break  # Partial text line, wait for more bytes
+
+                # Text without newline directly followed by a frame
+                text = _decode(buffer[pos:start])
+                if text:
+                    messages.append(text)
+                pos = start
+
+            end = buffer.find(b'>', start + 1)
+            if end == -1:
+                break  # Partial frame, wait for the end marker
+
+            # A second start marker means the earlier frame was cut off
+            restart = buffer.rfind(b'<', start + 1, end)
+            if restart != -1:
+                self.dropped_bytes += restart - start
+                start = restart
+
+            messages.append(buffer[start:end + 1].decode('utf-8', errors='replace'))
+            pos = end + 1
+
+        del buffer[:pos]
+        if len(buffer) > self.max_length:
+            self.dropped_bytes += len(buffer)
+            buffer.clear()
+        return messages
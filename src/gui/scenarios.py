@@ -0,0 +1,421 @@
+"""
+Scenario files and a parallel headless regression runner.
+
+A scenario drives the Tk-free simulation core the GUI uses (AirlockSimulator)
+against a controller model, and checks the gates against expectations. It is
+a JSON file (the comments below are explanation, not part of the format):
+
+    {
+      "name": "safety override holds gate A",
+      "duration": 20.0,                 # simulated seconds
+      "dt": 0.05,                       # step size (edges are still exact, see airlock_sim)
+      "controller": "control_unit",     # a name from airlock_sim.POLICIES
+      "seed": 1,                        # for the 'random' controller
+      "layout": "dense_layout.json",    # optional sensor layout, relative to this file
+      "link": {"sensor_delay": 0.02, "request_delay": 0.01},   # optional serial link delays
+      "rover": [[0, 50], [8, 900]],     # keyframes [time, x], linear in between
+      "overrides": [                    # sensor lines forced during [from, to)
+        {"signal": "PRESENCE_FRONT", "value": false, "from": 2.0, "to": 4.0}
+      ],
+      "expect": [
+        {"gate": "A", "never_moves_while": "GATE_SAFETY_A"},
+        {"gate": "B", "never_closes_while": "GATE_SAFETY_B"},
+        {"never_open_together": ["A", "B"]},
+        {"gate": "A", "state": "OPEN", "at": 3.5},
+        {"gate": "B", "event": "opening", "between": [3.0, 9.0]},
+        {"gate": "B", "event": "opened", "count": 0}
+      ]
+    }
+
+Overrides model a stuck or forced sensor line: the controller sees the forced
+value, and so do the never_* checks, which hold at every instant of the run.
+never_open_together fails once none of the listed gates is fully closed. An
+event expectation passes if the gate has at least one such event in the
+window (whole run by default), or exactly "count" of them.
+
+With a link, sensor frames reach the controller sensor_delay seconds after the
+lines change (the PC to bridge hop) and changed gate requests come back after
+request_delay, like the bridge's reply. Deliveries happen at step ends; steps
+are cut short to land on them.
+
+    python scenarios.py scenarios/                       # every *.json below the directory
+    python scenarios.py scenarios/ --jobs 8 --junit results.xml
+"""
+
+import collections
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+try:
+    from .airlock_sim import POLICIES, AirlockSimulator
+    from .sensor_layout import load_layout
+    from .signals import SENSOR_NAMES
+except ImportError:
+    from airlock_sim import POLICIES, AirlockSimulator
+    from sensor_layout import load_layout
+    from signals import SENSOR_NAMES
+
+GATE_EVENTS = ('opening', 'closing', 'opened', 'closed')
+GATE_STATES = ('OPENING', 'CLOSING', 'OPEN', 'CLOSED')
+
+# Times closer than this are the same instant (step boundaries accumulate rounding)
+TIME_EPSILON = 1e-9
+
+
+class ScenarioError(ValueError):
+    """Raised for a scenario file that cannot be run"""
+
+
+class Scenario:
+    def __init__(self, data, path=None):
+        self.path = path
+        self.name = data.get('name') or (os.path.splitext(os.path.basename(path))[0] if path else 'scenario')
+        try:
+            self.duration = float(data['duration'])
+            self.dt = float(data.get('dt', 0.05))
+            self.controller = data.get('controller', 'control_unit')
+            self.seed = data.get('seed', 0)
+            self.layout_file = data.get('layout')
+            link = data.get('link') or {}
+            self.sensor_delay = float(link.get('sensor_delay', 0.0))
+            self.request_delay = float(link.get('request_delay', 0.0))
+            self.keyframes = sorted((float(t), float(x)) for t, x in data['rover'])
+            self.overrides = [(entry['signal'], bool(entry['value']), float(entry.get('from', 0.0)),
+                               float(entry.get('to', self.duration))) for entry in data.get('overrides', [])]
+            self.expectations = [dict(entry) for entry in data.get('expect', [])]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ScenarioError(f"{self.name}: malformed scenario ({e.__class__.__name__}: {e})")
+
+        if self.controller not in POLICIES:
+            raise ScenarioError(f"{self.name}: unknown controller {self.controller!r}")
+        if not self.keyframes:
+            raise ScenarioError(f"{self.name}: the rover needs at least one keyframe")
+        if self.dt <= 0 or self.duration <= 0:
+            raise ScenarioError(f"{self.name}: duration and dt must be positive")
+        if self.sensor_delay < 0 or self.request_delay < 0:
+            raise ScenarioError(f"{self.name}: link delays cannot be negative")
+        for signal, _, _, _ in self.overrides:
+            if signal not in SENSOR_NAMES:
+                raise ScenarioError(f"{self.name}: cannot override unknown sensor {signal!r}")
+
+    def rover_x(self, t):
+        """Rover position at time t, interpolated between keyframes"""
+        keyframes = self.keyframes
+        i = bisect_right(keyframes, (t, float('inf')))
+        if i == 0:
+            return keyframes[0][1]
+        if i == len(keyframes):
+            return keyframes[-1][1]
+        (t0, x0), (t1, x1) = keyframes[i - 1], keyframes[i]
+        return x0 + (x1 - x0) * (t - t0) / (t1 - t0)
+
+    def load_layout(self):
+        if not self.layout_file:
+            return None
+        base = os.path.dirname(self.path) if self.path else '.'
+        return load_layout(os.path.join(base, self.layout_file))
+
+
+def load_scenario(path):
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ScenarioError(f"{path}: not valid JSON ({e})")
+    return Scenario(data, path)
+
+
+def find_scenarios(paths):
+    """Scenario files among the given files and directories, sorted"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, files in os.walk(path):
+                found.extend(os.path.join(directory, name) for name in files if name.endswith('.json'))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+class ScenarioResult:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.failures = []  # Failed expectations, one message each
+        self.failed = []  # The failed expect entries, as JSON text
+        self.error = None  # Scenario could not be loaded or crashed
+        self.checks = 0
+        self.sim_time = 0.0
+        self.elapsed = 0.0  # Wall-clock seconds
+
+    @property
+    def passed(self):
+        return self.error is None and not self.failures
+
+
+class _Expectations:
+    """The expect entries of a scenario, checked while it runs and at the end"""
+
+    def __init__(self, scenario, sim):
+        self.sim = sim
+        self.failures = []
+        self.failed = []
+        self.interlocks = []  # (gate index, signal, closing only, text) - gate must not move while signal is on
+        self.exclusions = []  # (gate indices, text) - one of the gates must be closed at all times
+        self.states = []  # (time, gate index, state, text), sorted by time
+        self.events = []  # (gate, event, start, end, count or None, text)
+        names = sim.gates.names
+        for entry in scenario.expectations:
+            text = json.dumps(entry, sort_keys=True)
+            if 'never_open_together' in entry:
+                gates = entry['never_open_together']
+                if not gates or any(gate not in names for gate in gates):
+                    raise ScenarioError(f"{scenario.name}: unknown gate in {text}")
+                self.exclusions.append((tuple(names.index(gate) for gate in gates), text))
+                continue
+            gate = entry.get('gate')
+            if gate not in names:
+                raise ScenarioError(f"{scenario.name}: unknown gate in {text}")
+            index = names.index(gate)
+            interlock = entry.get('never_moves_while') or entry.get('never_closes_while')
+            if interlock:
+                if interlock not in SENSOR_NAMES:
+                    raise ScenarioError(f"{scenario.name}: unknown signal in {text}")
+                self.interlocks.append((index, interlock, 'never_closes_while' in entry, text))
+            elif 'state' in entry:
+                if entry['state'] not in GATE_STATES or 'at' not in entry:
+                    raise ScenarioError(f"{scenario.name}: a state check needs one of {GATE_STATES} and 'at': {text}")
+                self.states.append((float(entry['at']), index, entry['state'], text))
+            elif 'event' in entry:
+                if entry['event'] not in GATE_EVENTS:
+                    raise ScenarioError(f"{scenario.name}: unknown event in {text}")
+                start, end = entry.get('between', (0.0, scenario.duration))
+                self.events.append((gate, entry['event'], float(start), float(end), entry.get('count'), text))
+            else:
+                raise ScenarioError(f"{scenario.name}: unknown expectation {text}")
+        self.states.sort()
+        self.count = len(self.interlocks) + len(self.exclusions) + len(self.states) + len(self.events)
+        self.violated = set()  # Invariants already reported - one failure each
+
+    def times(self):
+        return [entry[0] for entry in self.states]
+
+    def fail(self, text, message):
+        self.failures.append(f"{text}: {message}")
+        self.failed.append(text)
+
+    def check_invariants(self, lines):
+        """Check the never_* entries against the gates and the sensor lines now"""
+        gates = self.sim.gates
+        moving, target, is_open = gates.moving, gates.target, gates.open
+        for index, signal, closing_only, text in self.interlocks:
+            if moving[index] and lines[signal] and not (closing_only and target[index]) \
+                    and text not in self.violated:
+                self.violated.add(text)
+                self.fail(text, f"gate {'closing' if closing_only else 'moving'} with {signal} on "
+                                f"at t={self.sim.sim_time:.3f}")
+        for indices, text in self.exclusions:
+            # A gate is closed when it is at rest and not open
+            if all(moving[index] or is_open[index] for index in indices) and text not in self.violated:
+                self.violated.add(text)
+                self.fail(text, f"no gate closed at t={self.sim.sim_time:.3f} "
+                                f"({', '.join(gates.state(index) for index in indices)})")
+
+    def check_states(self, now):
+        gates = self.sim.gates
+        while self.states and self.states[0][0] <= now + TIME_EPSILON:
+            at, index, state, text = self.states.pop(0)
+            actual = gates.state(index)
+            if actual != state:
+                self.fail(text, f"gate was {actual} at t={at:.3f}")
+
+    def check_events(self, log):
+        for gate, event, start, end, count, text in self.events:
+            matches = [t for t, g, e in log if g == gate and e == event and start - TIME_EPSILON <= t <= end + TIME_EPSILON]
+            if count is None and not matches:
+                self.fail(text, f"no '{event}' of gate {gate} in [{start}, {end}]")
+            elif count is not None and len(matches) != count:
+                self.fail(text, f"{len(matches)} '{event}' of gate {gate}, expected {count} "
+                                f"(at {', '.join(f'{t:.3f}' for t in matches) or 'no time'})")
+
+
+def run_scenario(scenario):
+    """Run one scenario to completion; returns a ScenarioResult"""
+    result = ScenarioResult(scenario.name, scenario.path)
+    start = time.perf_counter()
+    random.seed(scenario.seed)
+
+    sim = AirlockSimulator(layout=scenario.load_layout())
+    policy = POLICIES[scenario.controller]
+    expectations = _Expectations(scenario, sim)
+    event_log = []
+    sim.add_listener(lambda event, gate: event_log.append((sim.sim_time, gate, event)))
+
+    forced = {}  # Overrides in force now
+    delayed = scenario.sensor_delay > 0 or scenario.request_delay > 0
+    uplink = collections.deque()  # (arrival time, sensor lines) on their way to the controller
+    downlink = collections.deque()  # (arrival time, gate requests) on their way back
+    link = {'sent': None, 'requests': None}  # Last frame sent each way
+
+    def lines_now():
+        return dict(sim.sensor_states, **forced) if forced else sim.sensor_states
+
+    def deliver(now):
+        """Hand over every frame due by now, oldest first"""
+        while True:
+            up = uplink[0][0] if uplink else None
+            down = downlink[0][0] if downlink else None
+            if down is not None and down <= now + TIME_EPSILON and (up is None or down <= up):
+                sim.set_gate_requests(downlink.popleft()[1])
+                expectations.check_invariants(lines_now())
+            elif up is not None and up <= now + TIME_EPSILON:
+                arrival, lines = uplink.popleft()
+                # The control unit reacts at once; the bridge replies only when a request changed
+                requests = policy(lines)
+                if requests != link['requests']:
+                    link['requests'] = requests
+                    downlink.append((arrival + scenario.request_delay, requests))
+            else:
+                return
+
+    def control():
+        lines = lines_now()
+        expectations.check_invariants(lines)
+        if not delayed:
+            sim.set_gate_requests(policy(lines))
+            expectations.check_invariants(lines)
+        elif lines != link['sent']:
+            link['sent'] = dict(lines)
+            uplink.append((sim.sim_time + scenario.sensor_delay, link['sent']))
+            deliver(sim.sim_time)
+
+    # The controller runs at every sensor edge as well as after every step
+    sim.add_edge_listener(lambda edge: control())
+
+    def update_overrides(now):
+        forced.clear()
+        for signal, value, begin, end in scenario.overrides:
+            if begin - TIME_EPSILON <= now < end - TIME_EPSILON:
+                forced[signal] = value
+
+    # Steps end exactly on keyframes, override changes and state checks
+    boundaries = sorted({t for t, _ in scenario.keyframes} |
+                        {t for _, _, begin, end in scenario.overrides for t in (begin, end)} |
+                        set(expectations.times()) | {scenario.duration})
+    boundaries = [t for t in boundaries if 0.0 < t <= scenario.duration]
+
+    sim.move_rover(scenario.rover_x(0.0), sweep=False)
+    update_overrides(0.0)
+    control()
+    expectations.check_states(0.0)
+
+    next_boundary = 0
+    while sim.sim_time < scenario.duration - TIME_EPSILON:
+        now = sim.sim_time
+        while boundaries[next_boundary] <= now + TIME_EPSILON:
+            next_boundary += 1
+        end = min(now + scenario.dt, boundaries[next_boundary])
+        if uplink:
+            end = min(end, max(uplink[0][0], now))
+        if downlink:
+            end = min(end, max(downlink[0][0], now))
+        sim.step(end - now, scenario.rover_x(end))
+        sim.sim_time = end  # Land exactly on the boundary
+        deliver(end)
+        update_overrides(end)
+        control()
+        expectations.check_states(end)
+
+    expectations.check_events(event_log)
+    result.failures = expectations.failures
+    result.failed = expectations.failed
+    result.checks = expectations.count
+    result.sim_time = sim.sim_time
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_file(path):
+    """Load and run one scenario file; load errors and crashes become result.error"""
+    try:
+        scenario = load_scenario(path)
+    except (OSError, ScenarioError) as e:
+        result = ScenarioResult(os.path.splitext(os.path.basename(path))[0], path)
+        result.error = str(e)
+        return result
+    try:
+        return run_scenario(scenario)
+    except Exception as e:  # Report and carry on with the rest of the suite
+        result = ScenarioResult(scenario.name, path)
+        result.error = f"{e.__class__.__name__}: {e}"
+        return result
+
+
+def run_suite(paths, jobs=None):
+    """Run scenario files over a process pool (jobs=1 runs in this process)"""
+    if jobs == 1 or len(paths) <= 1:
+        return [run_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Scenarios are short - hand them out in batches to keep pickling overhead down
+        workers = jobs or os.cpu_count() or 1
+        return list(pool.map(run_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def junit_xml(results, suite_name='airlock scenarios', elapsed=None):
+    """JUnit XML report of the results, as a string"""
+    failures = sum(1 for result in results if result.failures and result.error is None)
+    errors = sum(1 for result in results if result.error is not None)
+    total_time = elapsed if elapsed is not None else sum(result.elapsed for result in results)
+    suites = ElementTree.Element('testsuites')
+    suite = ElementTree.SubElement(suites, 'testsuite', name=suite_name, tests=str(len(results)),
+                                   failures=str(failures), errors=str(errors), time=f"{total_time:.3f}")
+    for result in results:
+        classname = 'scenarios'
+        if result.path:
+            directory = os.path.basename(os.path.dirname(os.path.abspath(result.path)))
+            classname = f"scenarios.{directory}"
+        case = ElementTree.SubElement(suite, 'testcase', classname=classname, name=result.name,
+                                      time=f"{result.elapsed:.3f}")
+        if result.error is not None:
+            ElementTree.SubElement(case, 'error', message=result.error).text = result.error
+        elif result.failures:
+            failure = ElementTree.SubElement(case, 'failure', message=result.failures[0])
+            failure.text = "\n".join(result.failures)
+        ElementTree.SubElement(case, 'system-out').text = \
+            f"{result.checks} checks, {result.sim_time:.2f} s simulated ({result.path})"
+    return ElementTree.tostring(suites, encoding='unicode')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run airlock scenario files headlessly")
+    parser.add_argument("paths", nargs='+', help="scenario files or directories of them")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--junit", help="write a JUnit XML report here")
+    args = parser.parse_args()
+
+    paths = find_scenarios(args.paths)
+    start = time.perf_counter()
+    results = run_suite(paths, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if not result.passed:
+            print(f"FAIL {result.name} ({result.path})")
+            for message in [result.error] if result.error else result.failures:
+                print(f"    {message}")
+    passed = sum(1 for result in results if result.passed)
+    print(f"{len(results)} scenarios, {passed} passed, {len(results) - passed} failed "
+          f"in {elapsed:.2f} s")
+
+    if args.junit:
+        with open(args.junit, 'w', encoding='utf-8') as f:
+            f.write(junit_xml(results, elapsed=elapsed))
+    sys.exit(0 if passed == len(results) else 1)
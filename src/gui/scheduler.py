@@ -0,0 +1,86 @@
+"""
+Single-threaded task scheduler for the GUIs.
+
+Everything that touches the simulator or Tk runs on the thread that calls
+run_pending() - in the GUIs that is the Tk main loop, driven by
+root.after(). Other threads (the serial reader) never call into Tk; they
+post() callbacks into a lock-free SimpleQueue which is drained in arrival
+order before the periodic tasks run.
+"""
+
+import math
+import queue
+import time
+import traceback
+
+
+class PeriodicTask:
+    def __init__(self, interval, callback, next_due):
+        self.interval = interval
+        self.callback = callback
+        self.next_due = next_due
+
+
+class Scheduler:
+    def __init__(self, poll_interval=0.02):
+        self.inbox = queue.SimpleQueue()
+        self.tasks = []  # Run in registration order when due
+        self.poll_interval = poll_interval  # Upper bound on inbox latency
+        self.running = False
+
+    def post(self, callback, *args):
+        """Queue callback(*args) for the scheduler thread; safe from any thread"""
+        self.inbox.put((callback, args))
+
+    def every(self, interval, callback):
+        """Run callback() every interval seconds; returns the task"""
+        task = PeriodicTask(interval, callback, time.monotonic() + interval)
+        self.tasks.append(task)
+        return task
+
+    def run_pending(self):
+        """Run posted callbacks, then due tasks; returns seconds until the next call"""
+        # Posted callbacks first, in the order they arrived
+        while True:
+            try:
+                callback, args = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            self._call(callback, *args)
+
+        now = time.monotonic()
+        for task in self.tasks:
+            if now >= task.next_due:
+                self._call(task.callback)
+                # Skip missed periods instead of bursting to catch up
+                task.next_due += task.interval
+                if task.next_due <= now:
+                    task.next_due = now + task.interval
+
+        wait = self.poll_interval
+        for task in self.tasks:
+            wait = min(wait, task.next_due - now)
+        return max(0.0, wait)
+
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            # One failing callback must not stop the loop
+            traceback.print_exc()
+
+    def attach(self, root):
+        """Drive the scheduler from a Tk main loop"""
+        self.running = True
+
+        def pump():
+            if not self.running:
+                return
+            wait = self.run_pending()
+            # Round up: truncating a wait under 1 ms to after(0) spins the Tk loop until the deadline
+            root.after(math.ceil(wait * 1000), pump)
+
+        root.after(0, pump)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,228 @@
+"""
+Sensor layout of the airlock and the interval index used to evaluate it.
+
+A layout is a list of sensor elements along the airlock, each wired to one
+sensor signal of the schema (see signals.py). A presence beam is a single
+position, a safety curtain a span. Several elements may drive the same
+signal - a signal is high while the rover overlaps any of its elements -
+so a layout can be far more detailed than the seven wires a frame carries.
+
+Positions are in simulator units measured from the front edge of the
+airlock, like GateArray.x. Layout files are JSON:
+
+    {
+      "sensors": [
+        {"signal": "PRESENCE_FRONT", "x": 102, "label": "FRONT"},
+        {"signal": "GATE_SAFETY_A", "from": 174, "to": 234, "label": "Gate A Safety"}
+      ]
+    }
+
+    python sensor_layout.py --default > layout.json    # start from the built-in layout
+    python sensor_layout.py layout.json                # validate a layout file
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+try:
+    from .signals import SENSOR_NAMES
+except ImportError:
+    from signals import SENSOR_NAMES
+
+# left == right for a beam; intervals are closed, so touching counts as overlapping
+SensorElement = namedtuple('SensorElement', ['signal', 'left', 'right', 'label'])
+
+
+class IntervalIndex:
+    """Static index of closed intervals answering overlap queries in O(log n + k).
+
+    An interval overlaps [lo, hi] if it starts inside [lo, hi] - a contiguous
+    run of the intervals sorted by start, found with two bisects - or starts
+    before lo and reaches it. The second set depends only on which gap
+    between endpoints lo falls into, so it is precomputed per gap.
+    """
+
+    def __init__(self, intervals):
+        intervals = [(float(left), float(right)) for left, right in intervals]
+        for left, right in intervals:
+            if right < left:
+                raise ValueError(f"interval ({left}, {right}) ends before it starts")
+        self.count = len(intervals)
+        order = sorted(range(self.count), key=lambda i: intervals[i][0])
+        self.lefts = [intervals[i][0] for i in order]
+        self.ids = tuple(order)
+
+        # Gap j is (points[j-1], points[j]]; covers[j] holds the intervals with
+        # left <= points[j-1] and right >= points[j], in start order
+        self.points = sorted({value for interval in intervals for value in interval})
+        covers = [[] for _ in range(len(self.points) + 1)]
+        for i in order:
+            left, right = intervals[i]
+            for gap in range(bisect_left(self.points, left) + 1, bisect_left(self.points, right) + 1):
+                covers[gap].append(i)
+        self.covers = [tuple(ids) for ids in covers]
+
+    def overlapping(self, lo, hi):
+        """Ids (positions in the input) of intervals overlapping [lo, hi], in start order"""
+        lefts = self.lefts
+        return self.covers[bisect_left(self.points, lo)] + \
+            self.ids[bisect_left(lefts, lo):bisect_right(lefts, hi)]
+
+
+class SensorLayout:
+    def __init__(self, elements):
+        self.elements = tuple(elements)
+        for element in self.elements:
+            if element.signal not in SENSOR_NAMES:
+                raise ValueError(f"unknown sensor signal {element.signal!r}")
+        # Signals this layout drives, in schema order
+        used = {element.signal for element in self.elements}
+        self.signals = tuple(name for name in SENSOR_NAMES if name in used)
+        self.index = IntervalIndex((element.left, element.right) for element in self.elements)
+        self.rights = sorted(element.right for element in self.elements)
+
+    def hits(self, left, right):
+        """Element ids overlapped by [left, right]"""
+        return self.index.overlapping(left, right)
+
+    def sweep(self, left0, left1, width):
+        """Signal edges while a body of this width moves its left edge from left0 to left1.
+
+        Returns (fraction, signal, rising) in the order they happen, fraction
+        running 0..1 along the move. A signal rises when the body first
+        overlaps one of its elements and falls when it leaves the last one,
+        so a sensor crossed within a single move still gives both edges.
+        """
+        lo, hi = (left0, left1) if left0 < left1 else (left1, left0)
+        # Fast path: an overlap can only start or stop where the left edge passes an element's
+        # left - width or right, so a move crossing neither cannot produce an edge
+        lefts, rights = self.index.lefts, self.rights
+        if bisect_left(lefts, lo + width) == bisect_right(lefts, hi + width) and \
+                bisect_left(rights, lo) == bisect_right(rights, hi):
+            return []
+        span = left1 - left0
+        elements = self.elements
+        overlapped = []  # Signals of the elements overlapped at the start
+        events = []
+        for i in self.index.overlapping(min(left0, left1), max(left0, left1) + width):
+            element = elements[i]
+            # Same overlap test as hits(); the body overlaps while its left edge is in [low, high]
+            inside0 = element.left <= left0 + width and element.right >= left0
+            inside1 = element.left <= left1 + width and element.right >= left1
+            if inside0:
+                overlapped.append(element.signal)
+                if inside1:
+                    continue  # Overlapped throughout - the common case for small moves
+            low, high = element.left - width, element.right
+            enter, leave = (low, high) if span > 0 else (high, low)
+            enter = min(max((enter - left0) / span, 0.0), 1.0)
+            if not inside0:
+                events.append((enter, 0, element.signal))
+            if not inside1:
+                leave = min(max((leave - left0) / span, 0.0 if inside0 else enter), 1.0)
+                events.append((leave, 1, element.signal))
+        if not events:
+            return events
+
+        counts = dict.fromkeys(self.signals, 0)  # Elements of each signal currently overlapped
+        for signal in overlapped:
+            counts[signal] += 1
+        # Rising before falling at the same point, so abutting elements of one signal do not glitch
+        events.sort()
+        edges = []
+        for fraction, falling, signal in events:
+            if falling:
+                counts[signal] -= 1
+                if not counts[signal]:
+                    edges.append((fraction, signal, False))
+            else:
+                counts[signal] += 1
+                if counts[signal] == 1:
+                    edges.append((fraction, signal, True))
+        return edges
+
+    def quiet_span(self, left, right):
+        """Bounds within which the body [left, right] can move without an overlap starting or stopping.
+
+        Returns (left_low, left_high, right_low, right_high): while
+        left_low < left < left_high and right_low < right < right_high no
+        element is entered or left, so a move gives no edges and the same
+        hits(). Empty if the body already touches an element's end.
+        """
+        lefts, rights = self.index.lefts, self.rights
+        i = bisect_right(rights, left)
+        j = bisect_right(lefts, right)
+        left_low = rights[i - 1] if i else float('-inf')
+        right_low = lefts[j - 1] if j else float('-inf')
+        if left_low == left or right_low == right:
+            return left, left, right, right
+        return (left_low, rights[i] if i < len(rights) else float('inf'),
+                right_low, lefts[j] if j < len(lefts) else float('inf'))
+
+    def signal_states(self, hits):
+        """State of every signal of the layout for a hits() result"""
+        states = dict.fromkeys(self.signals, False)
+        elements = self.elements
+        for i in hits:
+            states[elements[i].signal] = True
+        return states
+
+    def to_json(self):
+        sensors = []
+        for element in self.elements:
+            entry = {'signal': element.signal}
+            if element.left == element.right:
+                entry['x'] = element.left
+            else:
+                entry['from'], entry['to'] = element.left, element.right
+            if element.label:
+                entry['label'] = element.label
+            sensors.append(entry)
+        return {'sensors': sensors}
+
+    @classmethod
+    def from_json(cls, data):
+        elements = []
+        for entry in data['sensors']:
+            if 'x' in entry:
+                left = right = float(entry['x'])
+            else:
+                left, right = float(entry['from']), float(entry['to'])
+            elements.append(SensorElement(entry['signal'], left, right, entry.get('label', '')))
+        return cls(elements)
+
+
+def load_layout(path):
+    with open(path, encoding='utf-8') as f:
+        return SensorLayout.from_json(json.load(f))
+
+
+def save_layout(layout, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(layout.to_json(), f, indent=2)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check an airlock sensor layout file")
+    parser.add_argument("layout", nargs='?', help="layout JSON file")
+    parser.add_argument("--default", action="store_true", help="print the built-in layout as JSON")
+    args = parser.parse_args()
+
+    if args.default:
+        try:
+            from .airlock_sim import AirlockSimulator
+        except ImportError:
+            from airlock_sim import AirlockSimulator
+        json.dump(AirlockSimulator().sensor_layout.to_json(), sys.stdout, indent=2)
+        print()
+    elif args.layout:
+        layout = load_layout(args.layout)
+        beams = sum(1 for element in layout.elements if element.left == element.right)
+        print(f"{len(layout.elements)} sensors ({beams} beams, {len(layout.elements) - beams} spans) "
+              f"driving {', '.join(layout.signals)}")
+    else:
+        parser.error("give a layout file or --default")
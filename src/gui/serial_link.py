@@ -0,0 +1,295 @@
+"""
+Serial port helpers shared by the GUIs.
+
+SerialReader replaces the old sleep-and-poll loops: it blocks in read()
+until bytes arrive, feeds them to a FrameParser and hands every complete
+message to a callback as soon as it is available.
+
+SerialMultiplexer does the same for any number of ports from a single
+selector thread (POSIX only - it waits on the port file descriptors).
+
+open_serial replaces the fixed two-second sleep after opening a port: it
+returns as soon as the bridge prints its ready banner, and can open the
+port without the DTR pulse that resets most boards.
+"""
+
+import os
+import queue
+import selectors
+import threading
+import time
+import traceback
+
+import serial
+
+try:
+    from .protocol import FrameParser, READY_BANNER
+    from .tracing import tracer
+except ImportError:
+    from protocol import FrameParser, READY_BANNER
+    from tracing import tracer
+
+READY_TIMEOUT = 3.0  # Seconds to wait for the banner after a reset
+
+
+def wait_for_banner(ser, timeout=READY_TIMEOUT):
+    """Read lines until the ready banner arrives; returns False on timeout"""
+    banner = READY_BANNER.encode()
+    deadline = time.monotonic() + timeout
+    original_timeout = ser.timeout
+    line = b""
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ser.timeout = remaining
+            # Stops after the banner's newline, so later frames stay queued for the reader
+            line += ser.readline()
+            if banner in line:
+                return True
+            if line.endswith(b"\n"):
+                line = b""  # Boot messages and noise before the banner
+    finally:
+        ser.timeout = original_timeout
+
+
+def open_serial(port, baudrate=115200, reset=True, ready_timeout=READY_TIMEOUT):
+    """Open port and wait until the bridge is ready; returns (ser, banner_seen).
+
+    With reset=False DTR and RTS are held low while the port opens, so a
+    board with USB auto-reset keeps running and no banner is waited for.
+    """
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baudrate
+    ser.timeout = 1
+    if not reset:
+        ser.dtr = False
+        ser.rts = False
+    ser.open()
+    if not reset:
+        return ser, False
+    try:
+        return ser, wait_for_banner(ser, ready_timeout)
+    except (serial.SerialException, OSError):
+        ser.close()
+        raise
+
+
+def open_serial_async(port, on_open, on_error, **kwargs):
+    """Run open_serial on a worker thread.
+
+    on_open(ser, banner_seen, elapsed) or on_error(exception) is called on
+    that thread, so GUIs post them to their scheduler.
+    """
+    def run():
+        start = time.monotonic()
+        try:
+            ser, ready = open_serial(port, **kwargs)
+        except (serial.SerialException, OSError, ValueError) as e:
+            on_error(e)
+            return
+        on_open(ser, ready, time.monotonic() - start)
+
+    thread = threading.Thread(target=run, name="serial connect", daemon=True)
+    thread.start()
+    return thread
+
+
+class SerialReader:
+    def __init__(self, ser, on_message, on_error=None):
+        self.ser = ser
+        self.on_message = on_message  # Called with each decoded message
+        self.on_error = on_error  # Called with the exception if the port fails
+        self.parser = FrameParser()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.read_loop, name="serial reader", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reader; safe to call before closing the port"""
+        self.running = False
+        if hasattr(self.ser, 'cancel_read'):
+            try:
+                self.ser.cancel_read()
+            except (serial.SerialException, OSError):
+                pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+
+    def read_loop(self):
+        while self.running:
+            try:
+                # Block for the first byte, then drain whatever else is queued
+                data = self.ser.read(1)
+                if not data:
+                    continue  # Port timeout - just check the running flag
+                waiting = self.ser.in_waiting
+                if waiting:
+                    data += self.ser.read(waiting)
+            except (serial.SerialException, OSError, TypeError) as e:
+                # TypeError: pyserial reading from a port closed under it
+                if self.running and self.on_error:
+                    self.on_error(e)
+                break
+
+            tracer.instant('read', 'serial', bytes=len(data))
+            with tracer.span('parse', 'parse'):
+                messages = self.parser.feed(data)
+            for message in messages:
+                try:
+                    self.on_message(message)
+                except Exception:
+                    # A bad message must not take the reader down with it
+                    traceback.print_exc()
+
+
+class _MuxPort:
+    def __init__(self, ser, on_message, on_error):
+        self.ser = ser
+        self.on_message = on_message
+        self.on_error = on_error
+        self.parser = FrameParser()
+
+
+class SerialMultiplexer:
+    """One I/O thread reading many serial ports through a selector"""
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        # Self-pipe so add()/remove() can interrupt a blocking select()
+        self.wake_r, self.wake_w = os.pipe()
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        self.changes = queue.SimpleQueue()
+        self.ports = {}  # fd -> _MuxPort, only touched by the I/O thread
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="serial multiplexer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+
+    def add(self, ser, on_message, on_error=None):
+        """Start reading ser; callbacks run on the I/O thread"""
+        self.changes.put(('add', _MuxPort(ser, on_message, on_error), None))
+        self._wake()
+
+    def remove(self, ser):
+        """Stop reading ser; returns once the I/O thread has let go, so the port can be closed"""
+        done = threading.Event()
+        self.changes.put(('remove', ser, done))
+        self._wake()
+        if self.running and self.thread is not threading.current_thread():
+            done.wait(timeout=1)
+
+    def _wake(self):
+        try:
+            os.write(self.wake_w, b'x')
+        except OSError:
+            pass
+
+    def _apply_changes(self):
+        while True:
+            try:
+                action, item, done = self.changes.get_nowait()
+            except queue.Empty:
+                return
+            if action == 'add':
+                fd = item.ser.fileno()
+                self.ports[fd] = item
+                self.selector.register(fd, selectors.EVENT_READ, item)
+            else:
+                for fd, port in list(self.ports.items()):
+                    if port.ser is item:
+                        self._drop(fd)
+                done.set()
+
+    def _drop(self, fd):
+        self.ports.pop(fd, None)
+        try:
+            self.selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def run(self):
+        while self.running:
+            self._apply_changes()
+            for key, _ in self.selector.select(timeout=1.0):
+                port = key.data
+                if port is None:
+                    os.read(self.wake_r, 512)  # Just a wake-up
+                    continue
+                try:
+                    # Readable, so this returns at once with everything queued
+                    data = port.ser.read(max(1, port.ser.in_waiting))
+                except (serial.SerialException, OSError, TypeError) as e:
+                    self._drop(key.fd)
+                    if port.on_error:
+                        port.on_error(e)
+                    continue
+
+                tracer.instant('read', 'serial', bytes=len(data), fd=key.fd)
+                with tracer.span('parse', 'parse'):
+                    messages = port.parser.feed(data)
+                for message in messages:
+                    try:
+                        port.on_message(message)
+                    except Exception:
+                        # A bad message must not take the other benches down
+                        traceback.print_exc()
+        self._apply_changes()
+
+
+class ChangeDrivenTransmitter:
+    """Edge-triggered transmit decision with a low-rate heartbeat for liveness"""
+
+    def __init__(self, heartbeat_interval=1.0):
+        self.enabled = True  # False falls back to sending on every periodic tick
+        self.heartbeat_interval = heartbeat_interval
+        self.last_state = None
+        self.last_sent_time = 0.0
+
+        # Traffic counters; "saved" is measured against the fixed-rate mode
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_saved = 0
+        self.bytes_saved = 0
+
+    def reset(self):
+        """Forget the last sent state so the next check always transmits"""
+        self.last_state = None
+
+    def should_send(self, state, now, periodic=False):
+        """periodic: called from the fixed-rate transmit task rather than on a state change"""
+        if state != self.last_state:
+            return True
+        if not self.enabled:
+            return periodic  # Fixed-rate mode repeats the frame only on the periodic tick
+        return now - self.last_sent_time >= self.heartbeat_interval
+
+    def is_heartbeat(self, state):
+        return state == self.last_state
+
+    def record_sent(self, state, now, size):
+        self.last_state = state
+        self.last_sent_time = now
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    def record_skipped(self, size):
+        self.frames_saved += 1
+        self.bytes_saved += size
@@ -0,0 +1,243 @@
+"""
+Session recorder and offline replay.
+
+A session file is a short header followed by append-only records:
+
+    header:  b'ALSR', version byte, wall-clock start (double), tick dt (double)
+    record:  kind (byte), time since start in seconds (double), length (uint16), payload
+
+Kinds are TX and RX (raw frame bytes as written to / received from the
+bridge) and SNAPSHOT (rover position, sensor and request bits, gate count,
+then progress and moving/target flags per gate). Timestamps come from
+time.monotonic. A record cut short by a crash is ignored when reading.
+
+SessionReplay feeds the recorded gate requests and rover positions back
+into an AirlockSimulator without a serial port, at any speed, and reports
+how far the replayed gate progress drifts from the recorded snapshots.
+"""
+
+import struct
+import time
+from collections import namedtuple
+
+try:
+    from .airlock_sim import AirlockSimulator
+    from .protocol import BinaryFrame, FrameParser, REQUEST_CODEC, SENSOR_CODEC, encode_binary_frame
+except ImportError:
+    from airlock_sim import AirlockSimulator
+    from protocol import BinaryFrame, FrameParser, REQUEST_CODEC, SENSOR_CODEC, encode_binary_frame
+
+MAGIC = b'ALSR'
+VERSION = 1
+HEADER = struct.Struct('<4sBdd')
+RECORD = struct.Struct('<BdH')
+SNAPSHOT = struct.Struct('<dBBB')  # rover_x, sensor bits, request bits, gate count
+GATE_SNAPSHOT = struct.Struct('<dB')  # progress, GATE_MOVING | GATE_TARGET_OPEN; one per gate after SNAPSHOT
+
+# Gate flags in a snapshot
+GATE_MOVING = 1
+GATE_TARGET_OPEN = 2
+
+# Record kinds
+TX = 1
+RX = 2
+SNAPSHOT_KIND = 3
+
+SessionHeader = namedtuple('SessionHeader', ['version', 'start_time', 'tick_dt'])
+SessionRecord = namedtuple('SessionRecord', ['kind', 'time', 'payload'])
+# gates holds (progress, moving, target_open) per gate
+Snapshot = namedtuple('Snapshot', ['rover_x', 'sensor_bits', 'request_bits', 'gates'])
+
+
+def snapshot_payload(sim):
+    gates = sim.gates
+    parts = [SNAPSHOT.pack(sim.rover_x, SENSOR_CODEC.pack(sim.sensor_states),
+                           REQUEST_CODEC.pack(sim.gate_requests), gates.count)]
+    for index in range(gates.count):
+        flags = (GATE_MOVING if gates.moving[index] else 0) | (GATE_TARGET_OPEN if gates.target[index] else 0)
+        parts.append(GATE_SNAPSHOT.pack(gates.progress[index], flags))
+    return b''.join(parts)
+
+
+def unpack_snapshot(payload):
+    rover_x, sensor_bits, request_bits, count = SNAPSHOT.unpack_from(payload, 0)
+    gates = []
+    for index in range(count):
+        progress, flags = GATE_SNAPSHOT.unpack_from(payload, SNAPSHOT.size + index * GATE_SNAPSHOT.size)
+        gates.append((progress, bool(flags & GATE_MOVING), bool(flags & GATE_TARGET_OPEN)))
+    return Snapshot(rover_x, sensor_bits, request_bits, gates)
+
+
+class SessionRecorder:
+    def __init__(self, path, tick_dt=0.01):
+        self.path = path
+        self.start = time.monotonic()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, time.time(), tick_dt))
+        self.last_snapshot = None
+        self.records = 0
+
+    def record(self, kind, payload, now=None):
+        if self.file is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        self.file.write(RECORD.pack(kind, now - self.start, len(payload)))
+        self.file.write(payload)
+        self.records += 1
+
+    def record_tx(self, data):
+        self.record(TX, bytes(data))
+
+    def record_rx(self, message):
+        """Record a message from FrameParser - text frames and lines, or a BinaryFrame"""
+        if isinstance(message, BinaryFrame):
+            self.record(RX, encode_binary_frame(message.seq, message.bits))
+        else:
+            self.record(RX, message.encode('utf-8', errors='replace'))
+
+    def record_snapshot(self, sim):
+        """Write a snapshot if the rover or gates changed since the last one"""
+        payload = snapshot_payload(sim)
+        if payload == self.last_snapshot:
+            return
+        self.last_snapshot = payload
+        self.record(SNAPSHOT_KIND, payload)
+        self.file.flush()  # Keep what has been recorded if the GUI dies
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read_session(path):
+    """Returns (SessionHeader, list of SessionRecord)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: not a session file")
+    magic, version, start_time, tick_dt = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a session file or unsupported version")
+
+    records = []
+    pos = HEADER.size
+    while pos + RECORD.size <= len(data):
+        kind, timestamp, length = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + length > len(data):
+            break  # Truncated last record
+        records.append(SessionRecord(kind, timestamp, data[pos:pos + length]))
+        pos += length
+    return SessionHeader(version, start_time, tick_dt), records
+
+
+def requests_from_payload(payload):
+    """GATE_REQUEST values in a received frame, or None if it carries none"""
+    for message in FrameParser().feed(payload + b'\n'):
+        if isinstance(message, BinaryFrame):
+            return REQUEST_CODEC.unpack(message.bits)
+        requests, _ = REQUEST_CODEC.decode_text(message)
+        if requests:
+            return requests
+    return None
+
+
+class SessionReplay:
+    def __init__(self, path, sim=None, dt=None):
+        self.header, self.records = read_session(path)
+        self.sim = sim if sim is not None else AirlockSimulator()
+        self.dt = dt or self.header.tick_dt
+        self.duration = self.records[-1].time if self.records else 0.0
+        self.index = 0
+        self.time = 0.0  # Session time the simulator has been stepped to
+        self.initialised = False
+
+        # Results
+        self.rx_frames = 0
+        self.snapshots = 0
+        self.max_progress_error = 0.0  # Largest gate progress difference to a snapshot
+
+        for record in self.records:
+            if record.kind == SNAPSHOT_KIND:
+                gate_count = len(unpack_snapshot(record.payload).gates)
+                if gate_count != self.sim.gates.count:
+                    raise ValueError(f"session has {gate_count} gates, the simulator {self.sim.gates.count}")
+                break
+
+    @property
+    def finished(self):
+        return self.index >= len(self.records)
+
+    def advance_to(self, t):
+        """Apply every record up to session time t, stepping the simulator in fixed dt"""
+        records = self.records
+        while self.index < len(records) and records[self.index].time <= t:
+            record = records[self.index]
+            self._step_to(record.time)
+            self._apply(record)
+            self.index += 1
+        self._step_to(min(t, self.duration))
+
+    def _step_to(self, t):
+        while self.time + self.dt <= t + 1e-9:
+            self.sim.step(self.dt)
+            self.time += self.dt
+
+    def _apply(self, record):
+        sim = self.sim
+        if record.kind == RX:
+            requests = requests_from_payload(record.payload)
+            if requests is not None:
+                self.rx_frames += 1
+                sim.set_gate_requests(requests)
+        elif record.kind == SNAPSHOT_KIND:
+            snapshot = unpack_snapshot(record.payload)
+            self.snapshots += 1
+            if not self.initialised:
+                self._restore(snapshot)
+            else:
+                progress = sim.gates.progress
+                for index, (recorded, _, _) in enumerate(snapshot.gates):
+                    self.max_progress_error = max(self.max_progress_error, abs(progress[index] - recorded))
+            # The rover position is an input, so always take the recorded one
+            sim.move_rover(snapshot.rover_x)
+
+    def _restore(self, snapshot):
+        """Start from the gate state of the first snapshot"""
+        sim = self.sim
+        sim.gate_requests.update(REQUEST_CODEC.unpack(snapshot.request_bits))
+        for index, (progress, moving, target_open) in enumerate(snapshot.gates):
+            sim.gates.restore(index, progress, moving, target_open)
+            sim.sensor_states[sim.gate_moving_names[index]] = moving
+        self.initialised = True
+
+    def run(self, speed=None):
+        """Replay the whole session; speed=None runs as fast as possible"""
+        if speed is None:
+            self.advance_to(self.duration)
+            return
+        start = time.monotonic()
+        while not self.finished:
+            self.advance_to((time.monotonic() - start) * speed)
+            time.sleep(0.005)
+        self.advance_to(self.duration)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded airlock session without a serial port")
+    parser.add_argument("session", help="session file recorded by the airlock GUI")
+    parser.add_argument("--speed", choices=['1', '10', 'max'], default='max',
+                        help="replay speed relative to the recording")
+    args = parser.parse_args()
+
+    replay = SessionReplay(args.session)
+    started = time.perf_counter()
+    replay.run(None if args.speed == 'max' else float(args.speed))
+    elapsed = time.perf_counter() - started
+    print(f"{len(replay.records)} records, {replay.duration:.1f} s session replayed in {elapsed:.3f} s")
+    print(f"{replay.rx_frames} gate request frames, {replay.snapshots} snapshots, "
+          f"max gate progress error {replay.max_progress_error:.3f}")
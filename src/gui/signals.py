@@ -0,0 +1,198 @@
+"""
+Signal schema for the airlock I/O lines.
+
+Every signal between the PC, the HIL_ESP32 bridge and the control unit is
+declared once in SIGNALS. The Python side derives its state dicts, bit
+orders and frame codecs (see protocol.FrameCodec) from it, and this module
+generates a header for each sketch: pin defines, the IOpins struct, binary
+frame bit masks, pin setup and, for the bridge, a switch on the hash of a
+field name that replaces the strcmp chain in executeLogic().
+
+    python signals.py            # regenerate the firmware headers
+    python signals.py --check    # exit 1 if a header is out of date
+"""
+
+import os
+import sys
+from collections import namedtuple
+
+# Direction as seen from the PC
+SENSOR = 'sensor'  # PC -> bridge output -> control unit input
+REQUEST = 'request'  # Control unit output -> bridge input -> PC
+
+Signal = namedtuple('Signal', ['name', 'kind', 'bridge_pin', 'control_pin'])
+
+# Order within each kind is the text frame order and the binary bit order
+SIGNALS = (
+    Signal('PRESENCE_FRONT', SENSOR, 23, 36),
+    Signal('PRESENCE_MIDDLE', SENSOR, 22, 39),
+    Signal('PRESENCE_BACK', SENSOR, 21, 34),
+    Signal('GATE_SAFETY_A', SENSOR, 19, 35),
+    Signal('GATE_SAFETY_B', SENSOR, 18, 32),
+    Signal('GATE_MOVING_A', SENSOR, 2, 26),
+    Signal('GATE_MOVING_B', SENSOR, 15, 27),
+    Signal('GATE_REQUEST_A', REQUEST, 5, 33),
+    Signal('GATE_REQUEST_B', REQUEST, 4, 25),
+)
+
+SENSOR_NAMES = tuple(signal.name for signal in SIGNALS if signal.kind == SENSOR)
+REQUEST_NAMES = tuple(signal.name for signal in SIGNALS if signal.kind == REQUEST)
+
+# Sequence tag field appended to text frames
+SEQ_FIELD = 'SEQ'
+
+# Binary frames carry 7 payload bits per direction
+MAX_SIGNALS_PER_KIND = 7
+
+FIRMWARE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firmware')
+BRIDGE_HEADER = os.path.join(FIRMWARE_DIR, 'hil_esp32', 'airlock_signals.h')
+CONTROL_HEADER = os.path.join(FIRMWARE_DIR, 'control_unit', 'airlock_signals.h')
+
+FNV_OFFSET = 2166136261
+FNV_PRIME = 16777619
+
+
+def initial_states(names):
+    return dict.fromkeys(names, False)
+
+
+def name_hash(name):
+    """32-bit FNV-1a, computed the same way by the bridge while it reads a field name"""
+    h = FNV_OFFSET
+    for byte in name.encode('ascii'):
+        h = ((h ^ byte) * FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+
+def validate():
+    names = [signal.name for signal in SIGNALS] + [SEQ_FIELD]
+    for name in names:
+        # Names become C identifiers and Python dict keys in generated code
+        if not (name.isidentifier() and name.isupper()):
+            raise ValueError(f"signal name {name!r} must be an upper-case identifier")
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate signal names")
+    if len({name_hash(name) for name in names}) != len(names):
+        raise ValueError("signal name hash collision - rename a signal")
+    for names_of_kind in (SENSOR_NAMES, REQUEST_NAMES):
+        if len(names_of_kind) > MAX_SIGNALS_PER_KIND:
+            raise ValueError(f"at most {MAX_SIGNALS_PER_KIND} signals per direction fit in a binary frame")
+
+
+# Firmware headers -----------------------------------------------------------
+
+def _common_header(pin_field, output_kind):
+    lines = [
+        "// Generated by src/gui/signals.py - edit the schema there and rerun it.",
+        "#ifndef AIRLOCK_SIGNALS_H",
+        "#define AIRLOCK_SIGNALS_H",
+        "",
+        "#include <Arduino.h>",
+        "#include <string.h>",
+        "",
+    ]
+    for signal in SIGNALS:
+        lines.append(f"#define {signal.name}_PIN {getattr(signal, pin_field)}")
+    lines += ["", "struct IOpins", "{"]
+    for signal in SIGNALS:
+        lines.append(f"    bool {signal.name}=false;")
+    lines += ["};", ""]
+
+    lines += ["// Outputs of this board are driven, inputs read with pull-ups",
+              "inline void configureSignalPins()", "{"]
+    for signal in SIGNALS:
+        mode = "OUTPUT" if signal.kind == output_kind else "INPUT_PULLUP"
+        lines.append(f"    pinMode({signal.name}_PIN, {mode});")
+    lines += ["}", ""]
+    return lines
+
+
+def _bit_defines():
+    lines = ["// Bit masks in the binary frame payload"]
+    for names in (SENSOR_NAMES, REQUEST_NAMES):
+        for index, name in enumerate(names):
+            lines.append(f"#define {name}_BIT 0x{1 << index:02X}")
+    return lines + [""]
+
+
+def bridge_header():
+    lines = _common_header('bridge_pin', SENSOR)
+    lines += _bit_defines()
+
+    lines += ["// FNV-1a hash of a text frame field name, updated one character at a time",
+              f"#define SIGNAL_HASH_INIT {FNV_OFFSET}UL",
+              "inline uint32_t signalHashStep(uint32_t hash, char c)",
+              "{",
+              f"    return (hash ^ (uint8_t)c) * {FNV_PRIME}UL;",
+              "}",
+              f"#define SIGNAL_HASH_{SEQ_FIELD} 0x{name_hash(SEQ_FIELD):08X}UL",
+              ""]
+
+    lines += ["// Sensor field named name (hash = its signalHashStep hash), or NULL.",
+              "// One switch and one confirming strcmp instead of a strcmp per signal.",
+              "inline bool *sensorField(IOpins &pins, uint32_t hash, const char *name)",
+              "{",
+              "    switch (hash)",
+              "    {"]
+    for name in SENSOR_NAMES:
+        lines.append(f"    case 0x{name_hash(name):08X}UL:")
+        lines.append(f"        return strcmp(name, \"{name}\") == 0 ? &pins.{name} : NULL;")
+    lines += ["    default:", "        return NULL;", "    }", "}", ""]
+
+    lines += ["inline void applySensorBits(IOpins &pins, byte bits)", "{"]
+    for name in SENSOR_NAMES:
+        lines.append(f"    pins.{name} = bits & {name}_BIT;")
+    lines += ["}", ""]
+
+    lines += ["inline byte requestBits(const IOpins &pins)", "{",
+              "    byte bits = 0;"]
+    for name in REQUEST_NAMES:
+        lines.append(f"    if (pins.{name}) bits |= {name}_BIT;")
+    lines += ["    return bits;", "}", ""]
+
+    lines += ["inline void writeSensorPins(const IOpins &pins)", "{"]
+    for name in SENSOR_NAMES:
+        lines.append(f"    digitalWrite({name}_PIN, pins.{name} ? HIGH : LOW);")
+    lines += ["}", "", "#endif", ""]
+    return "\n".join(lines)
+
+
+def control_header():
+    lines = _common_header('control_pin', REQUEST)
+    lines += ["#endif", ""]
+    return "\n".join(lines)
+
+
+def write_headers(check=False):
+    """Write both headers; with check=True only report the stale ones"""
+    validate()
+    stale = []
+    for path, text in ((BRIDGE_HEADER, bridge_header()), (CONTROL_HEADER, control_header())):
+        path = os.path.normpath(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current == text:
+            continue
+        stale.append(path)
+        if not check:
+            with open(path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(text)
+    return stale
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the firmware signal headers from the schema")
+    parser.add_argument("--check", action="store_true", help="only check that the headers are up to date")
+    args = parser.parse_args()
+
+    stale = write_headers(check=args.check)
+    for path in stale:
+        print(f"{'out of date' if args.check else 'wrote'}: {path}")
+    if not stale:
+        print("Firmware headers are up to date")
+    sys.exit(1 if args.check and stale else 0)
@@ -0,0 +1,86 @@
+"""
+Fixed-timestep simulation clock.
+
+The simulator is advanced in steps of exactly 1 / tick_rate seconds, with
+tick deadlines anchored to time.monotonic(). When the caller polls late,
+poll() returns every step that fell due so the simulation catches up
+instead of running slow; a backlog longer than max_catch_up is dropped
+rather than replayed. Lateness of each poll and the number of overruns
+are kept for display.
+"""
+
+import time
+
+MIN_TICK_RATE = 1
+MAX_TICK_RATE = 1000
+
+
+class SimulationClock:
+    def __init__(self, tick_rate=100, max_catch_up=0.25, time_source=time.monotonic):
+        self.time_source = time_source
+        self.max_catch_up = max_catch_up  # Seconds of backlog replayed at most
+        self.set_tick_rate(tick_rate)
+        self.next_tick = None
+        self.ticks = 0
+        self.reset_stats()
+
+    def set_tick_rate(self, tick_rate):
+        """Change the step size; clamped to MIN_TICK_RATE..MAX_TICK_RATE Hz"""
+        self.tick_rate = max(MIN_TICK_RATE, min(MAX_TICK_RATE, tick_rate))
+        self.dt = 1.0 / self.tick_rate
+        self.max_steps = max(1, int(self.max_catch_up * self.tick_rate))
+
+    def reset_stats(self):
+        self.polls = 0  # Polls with at least one step due
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+        self.last_jitter = 0.0
+        self.overruns = 0  # Polls that were late by a full tick or more
+        self.catch_up_steps = 0  # Extra steps run to recover from overruns
+        self.dropped_steps = 0  # Steps skipped because the backlog was too long
+
+    def start(self, now=None):
+        if now is None:
+            now = self.time_source()
+        self.next_tick = now + self.dt
+
+    def poll(self, now=None):
+        """Returns the number of fixed steps of dt seconds that are due now"""
+        if now is None:
+            now = self.time_source()
+        if self.next_tick is None:
+            self.start(now)
+            return 0
+        if now < self.next_tick:
+            return 0
+
+        # How late this tick is relative to its deadline
+        lateness = now - self.next_tick
+        self.polls += 1
+        self.last_jitter = lateness
+        self.jitter_sum += lateness
+        self.jitter_max = max(self.jitter_max, lateness)
+
+        steps = int(lateness / self.dt) + 1
+        if steps > 1:
+            self.overruns += 1
+        if steps > self.max_steps:
+            # Too far behind - replay at most max_steps and forget the rest
+            self.dropped_steps += steps - self.max_steps
+            steps = self.max_steps
+            self.next_tick = now + self.dt
+        else:
+            self.next_tick += steps * self.dt
+        self.catch_up_steps += steps - 1
+        self.ticks += steps
+        return steps
+
+    def time_until_next(self, now=None):
+        if self.next_tick is None:
+            return 0.0
+        if now is None:
+            now = self.time_source()
+        return max(0.0, self.next_tick - now)
+
+    def mean_jitter(self):
+        return self.jitter_sum / self.polls if self.polls else 0.0
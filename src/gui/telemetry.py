@@ -0,0 +1,353 @@
+"""
+Local publish/subscribe telemetry feed of the simulator state.
+
+TelemetryServer listens on a TCP port or a Unix-domain socket and streams
+newline-delimited JSON to any number of subscribers. Each line holds only
+the topics that changed since the client's previous line:
+
+    {"time": 12.34, "sensor_states": {...}, "gates": {"A": {"state": "OPENING", "progress": 0.4}}}
+
+Topics are sensor_states, gate_requests, gates, rover_x, tx_frame and
+rx_frame. publish() only records the value and wakes the I/O thread, so
+it never blocks the caller on a slow client. Every client has its own
+rate limit. Values waiting for a client are kept per topic, latest value
+wins: a client that reads slowly - or not at all - gets fewer and fresher
+lines, never a growing queue. "skipped" counts the values it never saw.
+
+A client may send one JSON line at any time to change its subscription:
+
+    {"topics": ["rover_x", "gates"], "rate": 10}
+
+A new client's first line, the full state, waits for its first request or
+SUBSCRIBE_GRACE seconds, whichever comes first. A request sent right after
+connecting therefore gets only the topics it asked for.
+
+    python telemetry.py --listen 127.0.0.1:7777 --demo   # serve a headless simulation
+    python telemetry.py 127.0.0.1:7777 --rate 5          # print the feed
+    python telemetry.py /tmp/airlock.sock                # Unix socket
+"""
+
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+
+try:
+    from .protocol import BinaryFrame, encode_binary_frame
+except ImportError:
+    from protocol import BinaryFrame, encode_binary_frame
+
+TOPICS = ('sensor_states', 'gate_requests', 'gates', 'rover_x', 'tx_frame', 'rx_frame')
+DEFAULT_RATE = 30.0  # Lines per second per client unless it asks for another rate
+MAX_RATE = 1000.0
+MAX_REQUEST_LENGTH = 4096
+SUBSCRIBE_GRACE = 0.1  # Seconds a new client's initial state waits for its subscription request
+
+
+def parse_address(address):
+    """(family, address) for 'host:port', a bare port number or a Unix socket path"""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[5:]
+    if '/' in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def frame_text(frame):
+    """JSON-friendly form of a frame: text as is, binary as hex"""
+    if isinstance(frame, str):
+        return frame
+    if isinstance(frame, BinaryFrame):
+        frame = encode_binary_frame(frame.seq, frame.bits)
+    frame = bytes(frame)
+    if frame[:1] == b'<':
+        return frame.decode('utf-8', errors='replace')
+    return frame.hex()
+
+
+class _Client:
+    def __init__(self, sock, hold_until=None):
+        self.sock = sock
+        # No topics while the initial state is held, so publish() leaves the client alone
+        self.topics = set() if hold_until is not None else set(TOPICS)
+        self.hold_until = hold_until  # Until then, or the first request, nothing is sent
+        self.interval = 1.0 / DEFAULT_RATE
+        self.next_send = 0.0
+        self.pending = {}  # topic -> latest value not yet sent
+        self.skipped = 0  # Values replaced in pending before they were sent
+        self.outgoing = b""  # Unsent rest of the current line
+        self.incoming = b""
+        self.writing = False  # Registered for EVENT_WRITE
+
+
+class TelemetryServer:
+    """Pub/sub server on one selector thread; publish() may be called from any thread"""
+
+    def __init__(self, address):
+        self.family, self.address = parse_address(address)
+        self.selector = selectors.DefaultSelector()
+        # Self-pipe so publish() can interrupt a blocking select()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        self.lock = threading.Lock()  # Guards latest and every client's pending
+        self.latest = {}  # topic -> last published value, sent to new subscribers
+        self.clients = {}  # socket -> _Client, only added and removed by the I/O thread
+        self.woken = False
+        self.listener = None
+        self.running = False
+        self.thread = None
+        self.start_time = time.monotonic()
+
+    def start(self):
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)  # Left over from a run that did not shut down
+        self.listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, 'listener')
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="telemetry server", daemon=True)
+        self.thread.start()
+        return self.listener.getsockname()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+        for sock in list(self.clients):
+            sock.close()
+        self.clients.clear()
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+            if self.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def publish(self, topic, value):
+        """Record the latest value of a topic; unchanged values are ignored.
+
+        value must not be modified afterwards - pass a copy of mutable state.
+        """
+        with self.lock:
+            if topic in self.latest and self.latest[topic] == value:
+                return
+            self.latest[topic] = value
+            waiting = False
+            for client in self.clients.values():
+                if topic in client.topics:
+                    if topic in client.pending:
+                        client.skipped += 1
+                    client.pending[topic] = value
+                    waiting = True
+            if not waiting or self.woken:
+                return
+            self.woken = True
+        self._wake()
+
+    def publish_simulator(self, sim):
+        """Publish the state topics of an AirlockSimulator"""
+        gates = sim.gates
+        self.publish('sensor_states', dict(sim.sensor_states))
+        self.publish('gate_requests', dict(sim.gate_requests))
+        self.publish('gates', {name: {'state': gates.state(index), 'progress': round(gates.progress[index], 3)}
+                               for index, name in enumerate(gates.names)})
+        self.publish('rover_x', round(sim.rover_x, 1))
+
+    def client_count(self):
+        return len(self.clients)
+
+    def _wake(self):
+        try:
+            os.write(self.wake_w, b'x')
+        except OSError:
+            pass  # Pipe full - a wake-up is already pending
+
+    def run(self):
+        while self.running:
+            timeout = self._send_due()
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    os.read(self.wake_r, 512)
+                    with self.lock:
+                        self.woken = False
+                elif key.data == 'listener':
+                    self._accept()
+                else:
+                    client = key.data
+                    if client.writing and not self._flush(client):
+                        continue
+                    self._read(client)
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        client = _Client(sock, hold_until=time.monotonic() + SUBSCRIBE_GRACE)
+        with self.lock:
+            self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client):
+        with self.lock:
+            self.clients.pop(client.sock, None)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return
+        client.incoming += data
+        while b'\n' in client.incoming:
+            line, client.incoming = client.incoming.split(b'\n', 1)
+            self._subscribe(client, line)
+        if len(client.incoming) > MAX_REQUEST_LENGTH:
+            self._drop(client)
+
+    def _subscribe(self, client, line):
+        try:
+            request = json.loads(line)
+            topics = set(request.get('topics', TOPICS)) & set(TOPICS)
+            rate = min(max(float(request.get('rate', 1.0 / client.interval)), 0.1), MAX_RATE)
+        except (ValueError, TypeError, AttributeError):
+            return  # Not a request - ignore it rather than drop the client
+        with self.lock:
+            # While held, every requested topic counts as added, so pending becomes the initial state
+            added = topics - client.topics
+            client.hold_until = None
+            client.topics = topics
+            client.interval = 1.0 / rate
+            client.pending = {topic: value for topic, value in client.pending.items() if topic in topics}
+            for topic in added:
+                if topic in self.latest:
+                    client.pending[topic] = self.latest[topic]
+
+    def _send_due(self):
+        """Send a line to every client that is due; returns the select() timeout"""
+        now = time.monotonic()
+        timeout = None
+        for client in list(self.clients.values()):
+            if client.writing:
+                continue  # Still draining the previous line; its pending values keep being replaced
+            if client.hold_until is not None:
+                if now < client.hold_until:
+                    wait = client.hold_until - now
+                    timeout = wait if timeout is None else min(timeout, wait)
+                    continue
+                with self.lock:
+                    # No request in time - start the feed with every topic
+                    client.hold_until = None
+                    client.topics = set(TOPICS)
+                    client.pending = dict(self.latest)
+            with self.lock:
+                if not client.pending:
+                    continue
+                if now < client.next_send:
+                    wait = client.next_send - now
+                    timeout = wait if timeout is None else min(timeout, wait)
+                    continue
+                message = dict(client.pending, time=round(now - self.start_time, 3))
+                if client.skipped:
+                    message['skipped'] = client.skipped
+                client.pending = {}
+                client.skipped = 0
+            client.next_send = now + client.interval
+            client.outgoing = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+            self._flush(client)
+        return timeout
+
+    def _flush(self, client):
+        """Send what the socket takes; returns False if the client was dropped"""
+        try:
+            sent = client.sock.send(client.outgoing)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(client)
+            return False
+        client.outgoing = client.outgoing[sent:]
+        writing = bool(client.outgoing)
+        if writing != client.writing:
+            client.writing = writing
+            events = selectors.EVENT_READ | selectors.EVENT_WRITE if writing else selectors.EVENT_READ
+            self.selector.modify(client.sock, events, client)
+        return True
+
+
+def subscribe(address, topics=None, rate=None):
+    """Connect to a server; returns a file object yielding the feed's JSON lines"""
+    family, address = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(address)
+    request = {}
+    if topics is not None:
+        request['topics'] = list(topics)
+    if rate is not None:
+        request['rate'] = rate
+    if request:
+        sock.sendall((json.dumps(request) + '\n').encode())
+    return sock.makefile('r', encoding='utf-8')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Airlock telemetry feed: serve a demo or print a feed")
+    parser.add_argument("address", nargs='?', help="server to subscribe to: host:port, port or socket path")
+    parser.add_argument("--topics", help="comma-separated topics (default: all)")
+    parser.add_argument("--rate", type=float, default=None, help="lines per second")
+    parser.add_argument("--listen", help="serve a headless simulation on this address instead")
+    parser.add_argument("--demo", action="store_true", help="with --listen: drive the rover back and forth")
+    args = parser.parse_args()
+
+    if args.listen:
+        try:
+            from .airlock_sim import POLICIES, AirlockSimulator
+        except ImportError:
+            from airlock_sim import POLICIES, AirlockSimulator
+        server = TelemetryServer(args.listen)
+        print(f"Serving telemetry on {server.start()}")
+        sim = AirlockSimulator()
+        policy = POLICIES['control_unit']
+        dt = 0.01
+        try:
+            while True:
+                x = None
+                if args.demo:
+                    # Drive through the airlock and back every 20 seconds
+                    phase = (sim.sim_time % 20.0) / 10.0
+                    x = 50.0 + 850.0 * (phase if phase < 1.0 else 2.0 - phase)
+                sim.set_gate_requests(policy(sim.sensor_states))
+                sim.step(dt, x)
+                server.publish_simulator(sim)
+                time.sleep(dt)
+        except KeyboardInterrupt:
+            server.stop()
+    elif args.address:
+        try:
+            for line in subscribe(args.address, args.topics.split(',') if args.topics else None, args.rate):
+                print(line, end='')
+        except KeyboardInterrupt:
+            pass
+    else:
+        parser.error("give an address to subscribe to, or --listen")
@@ -0,0 +1,80 @@
+"""
+Message pipeline for the serial terminal panel.
+
+Messages can be posted from any thread. They are formatted once, queued,
+and handed to the Tk thread in batches; the widget side keeps only the
+newest max_lines lines. The complete history can optionally be spooled
+to a log file.
+"""
+
+import collections
+import datetime
+import threading
+
+# msg_type -> (tag, prefix)
+MESSAGE_STYLES = {
+    "SENT": ("sent", ">> "),
+    "RECEIVED": ("received", "<< "),
+    "INFO": ("info", "-- "),
+    "ERROR": ("error", "!! ")
+}
+DEFAULT_STYLE = ("default", "   ")
+
+# Tag colours, configured once on the widget
+TAG_COLORS = {
+    "sent": "#ffff00",
+    "received": "#00ff00",
+    "info": "#00aaff",
+    "error": "#ff0000",
+    "default": "#ffffff"
+}
+
+
+class TerminalBuffer:
+    def __init__(self, max_lines=2000):
+        self.max_lines = max_lines
+        self.pending = collections.deque()
+        self.spool = None
+        self.spool_lock = threading.Lock()
+        self.dropped = 0  # Messages evicted before they were ever shown
+
+    def post(self, message, msg_type="DATA"):
+        """Format and queue a message; safe to call from any thread"""
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        tag, prefix = MESSAGE_STYLES.get(msg_type, DEFAULT_STYLE)
+        line = f"[{timestamp}] {prefix}{message}\n"
+        self.pending.append((line, tag))
+
+        if self.spool:
+            with self.spool_lock:
+                if self.spool:
+                    self.spool.write(line)
+
+    def drain(self):
+        """Take every queued message; returns at most max_lines of the newest"""
+        entries = []
+        while True:
+            try:
+                entries.append(self.pending.popleft())
+            except IndexError:
+                break
+        if len(entries) > self.max_lines:
+            self.dropped += len(entries) - self.max_lines
+            entries = entries[-self.max_lines:]
+        return entries
+
+    def clear(self):
+        self.pending.clear()
+
+    def start_spool(self, path):
+        """Append the full history to path from now on"""
+        with self.spool_lock:
+            if self.spool:
+                self.spool.close()
+            self.spool = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def stop_spool(self):
+        with self.spool_lock:
+            if self.spool:
+                self.spool.close()
+                self.spool = None
@@ -0,0 +1,140 @@
+"""
+Lightweight span tracing with Chrome trace / Perfetto export.
+
+    from tracing import tracer, traced
+
+    with tracer.span('parse', 'serial', bytes=len(data)):
+        ...
+
+    @traced('render', 'render')
+    def _unified_update(self): ...
+
+When the tracer is disabled span() returns a shared no-op context manager
+and traced functions cost one attribute check, so instrumentation can stay
+in the hot path. When enabled, complete spans and instant events are kept
+in a bounded ring buffer and export() writes them as Trace Event JSON that
+chrome://tracing and ui.perfetto.dev open directly.
+
+Set AIRLOCK_TRACE=1 to start with tracing enabled; '', 0, false and no
+leave it off.
+"""
+
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._record('X', self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, capacity=200000, enabled=False):
+        self.enabled = enabled
+        self.events = collections.deque(maxlen=capacity)  # Oldest events drop out first
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.events.clear()
+        self.thread_names.clear()
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, cat='', **args):
+        """Context manager timing the enclosed block"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def instant(self, name, cat='', **args):
+        """Record a point-in-time event"""
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self._record('i', name, cat, now, now, args)
+
+    def _record(self, phase, name, cat, start, end, args):
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.events.append((phase, name, cat, start, end, tid, args))
+
+    def to_chrome_trace(self):
+        """Trace Event Format dict; timestamps in microseconds since the tracer started"""
+        pid = os.getpid()
+        trace_events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                         'args': {'name': thread_name}}
+                        for tid, thread_name in self.thread_names.items()]
+        for phase, name, cat, start, end, tid, args in list(self.events):
+            event = {'name': name, 'cat': cat, 'ph': phase, 'pid': pid, 'tid': tid,
+                     'ts': (start - self.origin) / 1000.0}
+            if phase == 'X':
+                event['dur'] = (end - start) / 1000.0
+            else:
+                event['s'] = 't'  # Thread-scoped instant
+            if args:
+                event['args'] = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                                 for key, value in args.items()}
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+def env_flag(name):
+    """True if environment variable name is set to anything but '', 0, false or no"""
+    return os.environ.get(name, '').strip().lower() not in ('', '0', 'false', 'no')
+
+
+# Process-wide tracer shared by the GUI, the serial reader and the scheduler
+tracer = Tracer(enabled=env_flag('AIRLOCK_TRACE'))
+
+
+def traced(name, cat=''):
+    """Decorator recording each call of the function as a span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, cat, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate